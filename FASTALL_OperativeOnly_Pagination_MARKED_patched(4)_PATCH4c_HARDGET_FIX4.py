@@ -1,9 +1,14 @@
 # ======= FFCR FILE: FASTALL_OperativeOnly_Pagination_MARKED_patched.py =======
 # Purpose: Keep GoldCore frozen; patch modular pagination to be robust (scroll, visibility waits, retries).
 # Logs frozen/modular section SHA256 for forensics.
+# FFCR_XHR_CAPTURE=1 reads each patient's attachment list from the grid's JSON XHRs (DOM pagination as fallback).
+# Operative PDFs stream to disk on FFCR_DOWNLOAD_WORKERS threads while the browser moves on.
 
-import os, time, re, hashlib, requests, pandas as pd
+import os, time, re, hashlib, json, base64, threading, requests, pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
@@ -18,6 +23,14 @@ LOG_PATH = "modmed_patch4_run_log.txt"
 CHROMEDRIVER_PATH = r"C:\\FFCR_Project\\Pair E\\chromedriver-win64\\chromedriver.exe"
 CREDENTIAL_FILE = "counselear_credentials.xlsx"
 PATIENT_FILE = "counselear_patients.xlsx"
+# FFCR_XHR_CAPTURE=1: read each patient's attachment list from the grid's JSON
+# XHR responses (Chrome performance log + CDP) instead of scraping every page.
+XHR_CAPTURE = os.environ.get("FFCR_XHR_CAPTURE", "0") == "1"
+# Concurrent attachment downloads (one pooled HTTP connection per worker), written in chunks.
+DOWNLOAD_WORKERS = max(1, int(os.environ.get("FFCR_DOWNLOAD_WORKERS", "4")))
+DOWNLOAD_CHUNK = 256 * 1024
+# Grid waits resolve once the attachments table has had no DOM mutations for this long.
+TABLE_QUIET_MS = int(os.environ.get("FFCR_TABLE_QUIET_MS", "150"))
 
 # ========= SETUP =========
 os.makedirs(BASE_DIR, exist_ok=True)
@@ -26,9 +39,12 @@ os.makedirs(SCREENSHOT_DIR, exist_ok=True)
 print("=== FASTALL OperativeOnly + Pagination (Patched) ===")
 print(f"OUTPUT_ROOT={BASE_DIR}")
 
+_log_lock = threading.Lock()  # download worker threads log too
+
 def log_msg(f, msg):
-    print(msg)
-    f.write(f"{datetime.now().isoformat()} - {msg}\n")
+    with _log_lock:
+        print(msg)
+        f.write(f"{datetime.now().isoformat()} - {msg}\n")
 
 with open(LOG_PATH, "a", encoding="utf-8") as log:
     log_msg(log, "===== FFCR ModMed OperativeOnly+Pagination (Patched) Start =====")
@@ -52,6 +68,9 @@ with open(LOG_PATH, "a", encoding="utf-8") as log:
         options.add_experimental_option("prefs", prefs)
         options.add_argument("--start-maximized")
         options.add_argument("--incognito")
+        if XHR_CAPTURE:
+            # Network.* events in the performance log feed the XHR capture (MODULAR section).
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=options)
         wait = WebDriverWait(driver, 20)
         # Early checksum log (so partial runs still record forensics)
@@ -177,13 +196,16 @@ with open(LOG_PATH, "a", encoding="utf-8") as log:
             t = (s or "").lower()
             return any(k in t for k in OPERATIVE_KEYWORDS)
 
+        _claimed_paths = set()  # queued downloads whose files do not exist yet
+
         def safe_join(a,b):
             base, ext = os.path.splitext(b)
             i = 2
             out = os.path.join(a, b)
-            while os.path.exists(out):
+            while os.path.exists(out) or out in _claimed_paths:
                 out = os.path.join(a, f"{base} ({i}){ext}")
                 i += 1
+            _claimed_paths.add(out)
             return out
 
         def kill_backdrops():
@@ -211,15 +233,60 @@ with open(LOG_PATH, "a", encoding="utf-8") as log:
             except Exception as e:
                 log_msg(log, f"[DL WARN] setDownloadBehavior failed: {e}")
     
+        # (first row text, last row text, row count) of the attachments grid, computed in the page.
+        TABLE_SIGNATURE_JS = """
+            const rows = document.querySelectorAll('table tbody tr');
+            const text = el => (el.innerText || el.textContent || '').trim();
+            return rows.length ? [text(rows[0]), text(rows[rows.length - 1]), rows.length] : ['', '', 0];
+        """
+
+        # Async wait: a MutationObserver on the grid's container restarts a quiet timer on
+        # every mutation; once the DOM has been quiet for quietMs and the signature differs
+        # from `before` (or, with no `before`, rows exist), the signature is returned.
+        WAIT_TABLE_SETTLED_JS = """
+            const [before, quietMs, timeoutMs, done] = arguments;
+            const text = el => (el.innerText || el.textContent || '').trim();
+            const signature = () => {
+                const rows = document.querySelectorAll('table tbody tr');
+                return rows.length ? [text(rows[0]), text(rows[rows.length - 1]), rows.length] : ['', '', 0];
+            };
+            const changed = sig => before === null ? sig[2] > 0
+                : sig[0] !== before[0] || sig[1] !== before[1] || sig[2] !== before[2];
+            const row = document.querySelector('table tbody tr');
+            const table = row ? row.closest('table') : document.querySelector('table');
+            const root = (table && table.parentElement) || document.body;
+            let quiet = null, deadline = null, observer = null;
+            const finish = () => {
+                observer.disconnect(); clearTimeout(quiet); clearTimeout(deadline);
+                done(signature());
+            };
+            const settle = () => { if (changed(signature())) finish(); };
+            const restart = () => { clearTimeout(quiet); quiet = setTimeout(settle, quietMs); };
+            observer = new MutationObserver(restart);
+            observer.observe(root, {childList: true, subtree: true, characterData: true});
+            deadline = setTimeout(finish, timeoutMs);
+            restart();
+        """
+
         def table_signature():
             try:
-                rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
-                if not rows: return ("", "", 0)
-                return (rows[0].text.strip(), rows[-1].text.strip(), len(rows))
-            except StaleElementReferenceException:
+                return tuple(driver.execute_script(TABLE_SIGNATURE_JS))
+            except (JavascriptException, StaleElementReferenceException):
                 return ("", "", -1)
 
-        def wait_for_table_change(timeout=12, before=None):
+        def wait_for_table_change(timeout=12, before=None, quiet_ms=None):
+            """Signature once the grid has changed from `before` and been quiet for quiet_ms."""
+            quiet_ms = TABLE_QUIET_MS if quiet_ms is None else quiet_ms
+            try:
+                driver.set_script_timeout(timeout + 5)
+                return tuple(driver.execute_async_script(
+                    WAIT_TABLE_SETTLED_JS, list(before) if before is not None else None, quiet_ms, timeout * 1000))
+            except (JavascriptException, TimeoutException) as e:
+                log_msg(log, f"[TABLE WAIT] observer wait failed ({e.__class__.__name__}) → polling")
+                return _poll_table_change(timeout, before)
+
+        def _poll_table_change(timeout=12, before=None):
+            # Pre-observer polling wait, kept as the fallback.
             end = time.time() + timeout
             while time.time() < end:
                 sig = table_signature()
@@ -303,7 +370,39 @@ with open(LOG_PATH, "a", encoding="utf-8") as log:
             # out of attempts
             raise TimeoutException(f"Could not set per-page to 100 after {max_attempts} attempts: {last_err}")
 
-        def collect_attachment_rows():
+        # One execute_script per page instead of a WebDriver call per row/td/selector.
+        # Category and added-on columns are found by their header text.
+        HARVEST_ROWS_JS = """
+            const HREF_CSS = ["a[href*='/ema/secure/fileattachment/']", "a[href*='fileattachment']",
+                              "a[href$='.pdf']", "a[href]"];
+            const text = el => (el ? (el.innerText || el.textContent || '') : '').trim();
+            const out = [];
+            // Direct children only: a nested table's rows are harvested once, by its own table.
+            for (const table of document.querySelectorAll('table')) {
+                const heads = Array.from(table.querySelectorAll(':scope > thead > tr > th')).map(th => text(th).toLowerCase());
+                const catCol = heads.findIndex(h => h.includes('categor'));
+                const addedCol = heads.findIndex(h => h.includes('added') || h.includes('date'));
+                for (const tr of table.querySelectorAll(':scope > tbody > tr')) {
+                    const tds = tr.querySelectorAll(':scope > td');
+                    let href = '';
+                    for (const css of HREF_CSS) {
+                        const a = tr.querySelector(css);
+                        if (a && a.href) { href = a.href; break; }
+                    }
+                    if (!href) continue;
+                    out.push({
+                        title: text(tds.length ? tds[0] : tr),
+                        category: catCol >= 0 && tds[catCol] ? text(tds[catCol]) : '',
+                        added_on: addedCol >= 0 && tds[addedCol] ? text(tds[addedCol]) : '',
+                        href: href,
+                    });
+                }
+            }
+            return out;
+        """
+
+        def _collect_attachment_rows_dom():
+            # Per-element fallback (the pre-harvest path) if the script cannot run.
             rows = driver.find_elements(By.CSS_SELECTOR, "table tbody tr")
             out = []
             for r in rows:
@@ -318,17 +417,138 @@ with open(LOG_PATH, "a", encoding="utf-8") as log:
                             if h: href = h; break
                         except Exception: pass
                     if href:
-                        out.append((title, href))
+                        out.append({"title": title, "category": "", "added_on": "", "href": href})
                 except Exception:
                     continue
             return out
 
-        def click_next_page():
-            before = table_signature()
+        def collect_attachment_rows():
+            """Every row on the current page as {title, category, added_on, href}."""
+            try:
+                rows = driver.execute_script(HARVEST_ROWS_JS)
+                if isinstance(rows, list):
+                    return rows
+            except (JavascriptException, StaleElementReferenceException) as e:
+                log_msg(log, f"[HARVEST WARN] row script failed ({e}); using per-row lookups")
+            return _collect_attachment_rows_dom()
+
+        # --- XHR capture: attachment metadata from the grid's list responses ---
+        ATTACHMENT_XHR_RE = re.compile(r"attachment", re.I)
+        TOTAL_KEYS = ("total", "totalcount", "totalelements", "totalrecords", "count")
+        PAGE_SIZE_RE = re.compile(r"(?:page_?size|per_?page|limit|max_?results|rows|size)[\"']?\s*[=:]\s*\"?(\d+)", re.I)
+
+        def _drain_performance_log():
             try:
-                nxt = driver.find_element(By.CSS_SELECTOR, "a[data-identifier='pagination-next']")
+                return driver.get_log("performance")
+            except Exception:
+                return []
+
+        def _captured_payloads():
+            """(page size requested or None, parsed JSON body) of attachment XHRs since the last drain, oldest first."""
+            payloads = []
+            requests_sent = {}  # requestId -> url + POST body
+            for entry in _drain_performance_log():
+                try:
+                    msg = json.loads(entry["message"])["message"]
+                    params = msg.get("params") or {}
+                    if msg.get("method") == "Network.requestWillBeSent":
+                        req = params["request"]
+                        requests_sent[params["requestId"]] = f"{req.get('url') or ''} {req.get('postData') or ''}"
+                        continue
+                    if msg.get("method") != "Network.responseReceived":
+                        continue
+                    resp = params["response"]
+                    if "json" not in (resp.get("mimeType") or "") or not ATTACHMENT_XHR_RE.search(resp.get("url") or ""):
+                        continue
+                    body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+                    text = base64.b64decode(body["body"]).decode("utf-8") if body.get("base64Encoded") else body["body"]
+                    size = PAGE_SIZE_RE.search(requests_sent.get(params["requestId"]) or resp.get("url") or "")
+                    payloads.append((int(size.group(1)) if size else None, json.loads(text)))
+                except Exception:
+                    continue
+            return payloads
+
+        def _attachment_records(payload):
+            """(records, total): the largest list of objects in a payload, plus a total count next to it if any."""
+            best, total = [], None
+            stack = [payload]
+            while stack:
+                node = stack.pop()
+                if isinstance(node, list):
+                    if node and all(isinstance(x, dict) for x in node) and len(node) > len(best):
+                        best, total = node, None
+                    stack.extend(node)
+                elif isinstance(node, dict):
+                    for v in node.values():
+                        if isinstance(v, list) and v and all(isinstance(x, dict) for x in v) and len(v) > len(best):
+                            best = v
+                            total = next((n for k, n in node.items()
+                                          if str(k).lower() in TOTAL_KEYS and isinstance(n, int)), None)
+                        stack.append(v)
+            return best, total
+
+        def _row_from_record(rec):
+            low = {str(k).lower(): v for k, v in rec.items()}
+            def first(*keys):
+                for k in keys:
+                    v = low.get(k)
+                    if isinstance(v, dict):
+                        v = v.get("name") or v.get("description")
+                    if v not in (None, ""):
+                        return str(v).strip()
+                return ""
+            href = next((v for v in rec.values() if isinstance(v, str) and "fileattachment" in v.lower()), "") \
+                or first("url", "href", "downloadurl", "fileurl", "link")
+            return {
+                "title": first("title", "name", "filename", "documentname", "description"),
+                "category": first("category", "categoryname", "attachmentcategory", "type"),
+                "added_on": first("addedon", "dateadded", "createddate", "created", "uploaddate", "date"),
+                "href": urljoin(driver.current_url, href) if href else "",
+            }
+
+        def capture_attachment_rows(mrn):
+            """All attachment rows from the captured 100-per-page list response, or None for the DOM path.
+
+            The response is used only when it is known to hold every attachment:
+            its record count equals the total it reports, or the grid has no next page.
+            """
+            payloads = _captured_payloads()
+            # The response to the 100-per-page request; one with no page size in its request only if none has one.
+            matching = [p for size, p in payloads if size == 100] or [p for size, p in payloads if size is None]
+            if not matching:
+                log_msg(log, f"[{mrn}] [XHR] no 100-per-page attachment list response captured → DOM pagination")
+                return None
+            records, total = _attachment_records(matching[-1])
+            rows = [r for r in map(_row_from_record, records) if r["href"]]
+            if not rows:
+                log_msg(log, f"[{mrn}] [XHR] {len(records)} records but no attachment links → DOM pagination")
+                return None
+            if total != len(records) and not _next_page_disabled():
+                shown = f"{len(records)}/{total}" if total is not None else f"{len(records)} records, no total"
+                log_msg(log, f"[{mrn}] [XHR] list may be incomplete ({shown}) → DOM pagination")
+                return None
+            log_msg(log, f"[{mrn}] [XHR] {len(rows)} attachments from {len(payloads)} captured response(s)")
+            return rows
+
+        def _next_page_control():
+            try:
+                return driver.find_element(By.CSS_SELECTOR, "a[data-identifier='pagination-next']")
+            except Exception:
+                return None
+
+        def _next_page_disabled():
+            """True only if the grid shows a next-page control and it is disabled."""
+            nxt = _next_page_control()
+            try:
+                return nxt is not None and "disabled" in (nxt.get_attribute("class") or "").lower()
             except Exception:
                 return False
+
+        def click_next_page():
+            before = table_signature()
+            nxt = _next_page_control()
+            if nxt is None:
+                return False
             cls = (nxt.get_attribute("class") or "").lower()
             if "disabled" in cls:
                 return False
@@ -340,18 +560,121 @@ with open(LOG_PATH, "a", encoding="utf-8") as log:
             sig = wait_for_table_change(timeout=10, before=before)
             return sig != before and sig[2] >= 0
 
-        
-        def extract_operatives_all_pages(mrn):
-            # Seed requests session with Selenium cookies
-            cookies = driver.get_cookies()
-            session = requests.Session()
-            for c in cookies:
+        # --- Download stage: the browser queues PDFs per MRN, worker threads stream them ---
+        session = requests.Session()
+        _adapter = HTTPAdapter(pool_connections=4, pool_maxsize=DOWNLOAD_WORKERS, max_retries=2)
+        session.mount("https://", _adapter)
+        session.mount("http://", _adapter)
+        download_pool = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="ffcr-dl")
+        download_queue = {}  # mrn -> [Future -> bool saved]
+        hardclicked = set()  # MRNs the DBG3 fallback has run for
+
+        def seed_session_cookies():
+            # Refresh the shared jar from Selenium; queued downloads keep using it.
+            for c in driver.get_cookies():
                 try:
                     session.cookies.set(c['name'], c['value'], domain=c.get('domain'), path=c.get('path','/'))
                 except Exception:
                     session.cookies.set(c['name'], c['value'])
+
+        def _stream_download(mrn, href, final, timeout, tag):
+            part = final + ".part"
+            name = os.path.basename(final)
+            try:
+                with session.get(href, timeout=timeout, stream=True) as r:
+                    if not r.ok:
+                        log_msg(log, f"[{mrn}] {tag}Failed {name} ({r.status_code})")
+                        return False
+                    size = 0
+                    with open(part, "wb") as f:
+                        for chunk in r.iter_content(DOWNLOAD_CHUNK):
+                            f.write(chunk)
+                            size += len(chunk)
+                if not size:
+                    log_msg(log, f"[{mrn}] {tag}Failed {name} (empty body)")
+                    os.remove(part)
+                    return False
+                os.replace(part, final)
+                log_msg(log, f"[{mrn}] {tag}OP-SAVED {name} ({size} bytes)")
+                return True
+            except Exception as e:
+                log_msg(log, f"[{mrn}] {tag}ERROR {name}: {e}")
+                try:
+                    os.remove(part)
+                except OSError:
+                    pass
+                return False
+            finally:
+                _claimed_paths.discard(final)
+
+        def queue_download(mrn, mrn_dir, href, filename, timeout=60, tag=""):
+            final = safe_join(mrn_dir, filename)
+            download_queue.setdefault(mrn, []).append(
+                download_pool.submit(_stream_download, mrn, href, final, timeout, tag))
+
+        def saved_downloads(mrn):
+            """Wait for this MRN's queued downloads; returns how many were saved."""
+            return sum(1 for fut in download_queue.get(mrn, []) if fut.result())
+
+        def finish_downloads():
+            """Wait for every queued download; returns {mrn: PDFs saved}."""
+            saved = {}
+            try:
+                for mrn, futures in download_queue.items():
+                    saved[mrn] = sum(1 for fut in futures if fut.result())
+                    log_msg(log, f"[{mrn}] Saved {saved[mrn]}/{len(futures)} operative PDFs.")
+            finally:
+                download_pool.shutdown(wait=True)
+                session.close()
+            return saved
+
+        def hardclick_fallback(mrn):
+            """Queue every operative-looking attachment link on the open page; returns how many."""
+            # ===== FFCR DBG3 (Patch4b): Hard-click fallback if normal pass saved 0 =====
+            hardclicked.add(mrn)
+            mrn_dir = os.path.join(BASE_DIR, mrn)
+            queued = 0
+            try:
+                log_msg(log, f"[{mrn}] [FFCR-DBG3] No PDFs saved by normal pass → trying hardclick fallback")
+                from selenium.webdriver.common.by import By
+                try:
+                    force_download_dir(mrn_dir)
+                except Exception as e:
+                    log_msg(log, f"[DL WARN] setDownloadBehavior failed: {e}")
+                before = set([p for p in os.listdir(mrn_dir) if p.lower().endswith(".pdf")])
+                anchors = driver.find_elements(By.CSS_SELECTOR, "a[href*='/fileattachment/']")
+                hits = []
+                for a in anchors:
+                    try:
+                        href = a.get_attribute("href") or ""
+                        txt  = (a.text or "").strip()
+                        if _fallback_hit(txt, href):
+                            hits.append(a)
+                    except Exception:
+                        continue
+                log_msg(log, f"[FFCR-DBG3] Hardclick candidates: {len(hits)}")
+                for a in hits:
+                    try:
+                        href = a.get_attribute("href") or ""
+                        if not href:
+                            continue
+                        fname = href.split("/")[-1].split("?")[0] or f"operative_{int(time.time()*1000)}.pdf"
+                        queue_download(mrn, mrn_dir, href, fname, timeout=90, tag="[FFCR-DBG3] hardget ")
+                        queued += 1
+                    except Exception as e:
+                        log_msg(log, f"[FFCR-DBG3] hardget error: {e}")
+            except Exception as e:
+                log_msg(log, f"[FFCR-DBG3] Fallback error: {e}")
+            # ===== END FFCR DBG3 fallback =====
+            return queued
+
+        def extract_operatives_all_pages(mrn):
+            """Queue this patient's operative PDFs for download; returns how many were queued."""
+            seed_session_cookies()
             mrn_dir = os.path.join(BASE_DIR, mrn); os.makedirs(mrn_dir, exist_ok=True)
-            saved = 0
+            queued = 0
+            if XHR_CAPTURE:
+                _drain_performance_log()  # only this patient's responses count
 
             # Open Attachments and set per-page to 100
             open_attachments_tab()
@@ -360,76 +683,30 @@ with open(LOG_PATH, "a", encoding="utf-8") as log:
             except Exception as e:
                 log_msg(log, f"[WARN] set_per_page_to_100 ultimately failed: {e} (continuing at default page size)")
 
+            captured = capture_attachment_rows(mrn) if XHR_CAPTURE else None
             page = 1
             while True:
-                rows = collect_attachment_rows()
+                rows = captured if captured is not None else collect_attachment_rows()
                 log_msg(log, f"[{mrn}] PAGE {page} rows={len(rows)}")
-                for title, href in rows:
+                for row in rows:
+                    title, href = row["title"], row["href"]
                     if not (is_operative(title) or is_operative(href)):
                         continue
                     if ".pdf" not in (href or "").lower():
                         continue
                     filename = href.split("/")[-1].split("?")[0]
-                    try:
-                        r = session.get(href, timeout=60)
-                        if r.ok:
-                            final = safe_join(mrn_dir, filename)
-                            with open(final, "wb") as f:
-                                f.write(r.content)
-                            saved += 1
-                        else:
-                            log_msg(log, f"[{mrn}] Failed {filename} ({r.status_code})")
-                    except Exception as e:
-                        log_msg(log, f"[{mrn}] ERROR {filename}: {e}")
-                if not click_next_page():
+                    queue_download(mrn, mrn_dir, href, filename)
+                    queued += 1
+                if captured is not None or not click_next_page():
                     break
                 page += 1
 
-            # ===== FFCR DBG3 (Patch4b): Hard-click fallback if normal pass saved 0 =====
-            try:
-                if saved == 0:
-                    log_msg(log, "[FFCR-DBG3] No PDFs saved by normal pass → trying hardclick fallback")
-                    from selenium.webdriver.common.by import By
-                    try:
-                        force_download_dir(mrn_dir)
-                    except Exception as e:
-                        log_msg(log, f"[DL WARN] setDownloadBehavior failed: {e}")
-                    before = set([p for p in os.listdir(mrn_dir) if p.lower().endswith(".pdf")])
-                    anchors = driver.find_elements(By.CSS_SELECTOR, "a[href*='/fileattachment/']")
-                    hits = []
-                    for a in anchors:
-                        try:
-                            href = a.get_attribute("href") or ""
-                            txt  = (a.text or "").strip()
-                            if _fallback_hit(txt, href):
-                                hits.append(a)
-                        except Exception:
-                            continue
-                    log_msg(log, f"[FFCR-DBG3] Hardclick candidates: {len(hits)}")
-                    downloaded = 0
-                    for a in hits:
-                        try:
-                            href = a.get_attribute("href") or ""
-                            if not href:
-                                continue
-                            fname = href.split("/")[-1].split("?")[0] or f"operative_{int(time.time()*1000)}.pdf"
-                            r = session.get(href, timeout=90)
-                            if r.ok and r.content:
-                                final = safe_join(mrn_dir, fname)
-                                with open(final, "wb") as f:
-                                    f.write(r.content)
-                                log_msg(log, f"[FFCR-DBG3] OP-SAVED via hardget: {fname}")
-                                downloaded += 1
-                            else:
-                                log_msg(log, f"[FFCR-DBG3] hardget failed ({r.status_code}) for {fname}")
-                        except Exception as e:
-                            log_msg(log, f"[FFCR-DBG3] hardget error: {e}")
-                    saved += downloaded
-            except Exception as e:
-                log_msg(log, f"[FFCR-DBG3] Fallback error: {e}")
-            # ===== END FFCR DBG3 fallback =====
+            # Nothing queued: hard-click now. Queued downloads that all fail are retried
+            # after the last patient, so the browser never waits on this one's downloads.
+            if queued == 0:
+                queued += hardclick_fallback(mrn)
             # FFCR_POSTPASS_HOOK
-            return saved
+            return queued
 
         # ========= MODULAR END =========
         # ======= FFCR_MODULAR_SECTION_END =======
@@ -466,18 +743,39 @@ with open(LOG_PATH, "a", encoding="utf-8") as log:
                 time.sleep(0.8)
             return False
 # ========= Run =========
-        login()
         summary_rows = []
-        for mrn in mrns:
-            log_msg(log, f"Processing MRN: {mrn}")
+        try:
+            login()
+            for mrn in mrns:
+                log_msg(log, f"Processing MRN: {mrn}")
 
-            if not robust_open_patient(mrn, max_tries=3):
-                log_msg(log, f"[{mrn}] Could not open patient after robust retries.")
-                continue
+                if not robust_open_patient(mrn, max_tries=3):
+                    log_msg(log, f"[{mrn}] Could not open patient after robust retries.")
+                    continue
+
+                cnt = extract_operatives_all_pages(mrn)
+                log_msg(log, f"[{mrn}] Queued {cnt} operative PDFs.")
+                summary_rows.append({"mrn": mrn, "operative_pdfs": cnt, "ts": datetime.now().isoformat(timespec="seconds")})
 
-            cnt = extract_operatives_all_pages(mrn)
-            log_msg(log, f"[{mrn}] Saved {cnt} operative PDFs.")
-            summary_rows.append({"mrn": mrn, "operative_pdfs": cnt, "ts": datetime.now().isoformat(timespec="seconds")})
+            # Patients whose queued PDFs all failed get the hard-click pass now that the rest are done.
+            for mrn in [m for m in download_queue if m not in hardclicked]:
+                if saved_downloads(mrn) == 0 and robust_open_patient(mrn, max_tries=3):
+                    seed_session_cookies()
+                    open_attachments_tab()
+                    try:
+                        set_per_page_to_100()
+                    except Exception as e:
+                        log_msg(log, f"[WARN] set_per_page_to_100 ultimately failed: {e} (continuing at default page size)")
+                    hardclick_fallback(mrn)
+        except BaseException:
+            # Drop downloads not started yet; running ones finish (or remove their .part) before the log closes.
+            download_pool.shutdown(wait=True, cancel_futures=True)
+            session.close()
+            raise
+
+        saved = finish_downloads()
+        for row in summary_rows:
+            row["operative_pdfs"] = saved.get(row["mrn"], 0)
 
         # Write a lightweight summary CSV
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
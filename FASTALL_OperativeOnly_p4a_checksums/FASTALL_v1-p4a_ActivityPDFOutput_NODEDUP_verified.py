@@ -2,6 +2,7 @@
 import os
 import time
 import traceback
+from hashlib import sha256
 import requests
 import pandas as pd
 from datetime import datetime
@@ -19,6 +20,7 @@ CHROMEDRIVER_PATH = r"C:\FFCR_Project\Pair E\chromedriver-win64\chromedriver.exe
 CREDENTIAL_FILE = "counselear_credentials.xlsx"
 PATIENT_FILE = "counselear_patients.xlsx"
 OP_KEYWORDS = []
+DOWNLOAD_CHUNK = 256 * 1024
 
 # ========== SETUP ==========
 os.makedirs(BASE_DIR, exist_ok=True)
@@ -88,6 +90,29 @@ with open(LOG_PATH, "w") as log:
             wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr"))).click()
             wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a.po-visit-date")))
 
+        # ========== DEDUP ==========
+        # mrn_dir -> set of digests already saved there; _digests.txt is read once per folder.
+        digest_index = {}
+
+        def known_digests(mrn_dir):
+            if mrn_dir not in digest_index:
+                seen = set()
+                ledger = os.path.join(mrn_dir, "_digests.txt")
+                if os.path.exists(ledger):
+                    with open(ledger, "r", encoding="utf-8") as lf:
+                        seen = set(x.strip() for x in lf if x.strip())
+                digest_index[mrn_dir] = seen
+            return digest_index[mrn_dir]
+
+        def stream_to_temp(response, tmp_path):
+            # Hash the body while it is written, so the file is never read back.
+            h = sha256()
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK):
+                    h.update(chunk)
+                    f.write(chunk)
+            return h.hexdigest()
+
         def extract_pdfs_from_attachments(mrn):
             try:
                 driver.save_screenshot(os.path.join(SCREENSHOT_DIR, f"{mrn}_attachments_tab.png"))
@@ -109,27 +134,18 @@ with open(LOG_PATH, "w") as log:
                     filename = href.split("/")[-1].split("?")[0]
                     if href and ".pdf" in href.lower():
                         log_msg(f"[{mrn}] Downloading PDF: {filename}")
-                        response = session.get(href)
-                        if response.ok:
-                            mrn_dir = os.path.join(BASE_DIR, mrn)
-                            os.makedirs(mrn_dir, exist_ok=True)
-                            from hashlib import sha256
-                            # write to temp then dedupe
-                            tmp_path = os.path.join(mrn_dir, "__tmp__"+filename)
-                            with open(tmp_path, "wb") as f:
-                                f.write(response.content)
-                            # hash
-                            h=sha256()
-                            with open(tmp_path,"rb") as fh:
-                                for chunk in iter(lambda: fh.read(8192), b""):
-                                    h.update(chunk)
-                            digest = h.hexdigest()
-                            # ledger
+                        with session.get(href, stream=True) as response:
+                            if response.ok:
+                                mrn_dir = os.path.join(BASE_DIR, mrn)
+                                os.makedirs(mrn_dir, exist_ok=True)
+                                # write to temp (hashing as it streams) then dedupe
+                                tmp_path = os.path.join(mrn_dir, "__tmp__"+filename)
+                                digest = stream_to_temp(response, tmp_path)
+                            else:
+                                digest = None
+                        if digest is not None:
                             ledger = os.path.join(mrn_dir, "_digests.txt")
-                            seen = set()
-                            if os.path.exists(ledger):
-                                with open(ledger,"r",encoding="utf-8") as lf:
-                                    seen = set(x.strip() for x in lf if x.strip())
+                            seen = known_digests(mrn_dir)
                             if digest in seen:
                                 os.remove(tmp_path)
                                 log_msg(f"[{mrn}] Duplicate skipped ({digest[:8]}...)")
@@ -144,6 +160,7 @@ with open(LOG_PATH, "w") as log:
                                 os.replace(tmp_path, final)
                                 with open(ledger,"a",encoding="utf-8") as lf:
                                     lf.write(digest+"\n")
+                                seen.add(digest)
                                 saved += 1
                         else:
                             log_msg(f"[{mrn}] Failed to download {filename} (status {response.status_code})")
@@ -6,7 +6,17 @@ import fitz
 from PIL import Image
 from datetime import datetime
 import csv
+import io
 import re
+from bisect import bisect_right
+from itertools import accumulate
+import queue
+import threading
+
+try:
+    import ahocorasick  # pyahocorasick: C automaton for the keyword scan, optional
+except ImportError:
+    ahocorasick = None
 
 KEYWORDS = ["fibrin", "foam", "fibrin foam", "thrombin", "perforation", "graft", "cholesteatoma", "healed", "closure", "cartilage"]
 
@@ -16,12 +26,15 @@ def detect_drive_letter():
             return letter
     return None
 
-def extract_text_from_pdf(path):
+def extract_pages_from_pdf(path):
     try:
         doc = fitz.open(path)
-        return "\n".join(page.get_text() for page in doc)
+        return [page.get_text() for page in doc]
     except Exception as e:
-        return f"[PDF parse failed: {e}]"
+        return [f"[PDF parse failed: {e}]"]
+
+def extract_text_from_pdf(path):
+    return "\n".join(extract_pages_from_pdf(path))
 
 def extract_text_from_image(path):
     try:
@@ -29,14 +42,137 @@ def extract_text_from_image(path):
     except Exception as e:
         return f"[OCR failed: {e}]"
 
-def find_keywords(text):
-    hits = []
-    for kw in KEYWORDS:
-        if kw.lower() in text.lower():
-            lines = [line.strip() for line in text.splitlines() if kw.lower() in line.lower()]
-            hits.extend(lines)
+# --- Keyword scan: one pass over the text for all KEYWORDS.
+# The lowercased page is scanned once for keyword matches: with pyahocorasick
+# installed through an Aho-Corasick automaton, otherwise through a single
+# alternation regex. Only the lines those matches fall in are then checked
+# keyword by keyword, so lines without hits cost nothing in Python.
+KEYWORD_CONTEXT_LINES = 1
+
+def build_keyword_finder(words):
+    """Return matches(low) -> iterator over the offsets of keyword matches, in order."""
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for word in words:
+            automaton.add_word(word, word)
+        automaton.make_automaton()
+        return lambda low: (end for end, _ in automaton.iter(low))
+    pattern = re.compile("|".join(re.escape(w) for w in sorted(words, key=len, reverse=True)))
+    return lambda low: (m.start() for m in pattern.finditer(low))
+
+def _lines_with_keywords(text, words, find):
+    """(line index, lines, keywords in that line) for each line with a hit."""
+    lines = text.splitlines(keepends=True)
+    low = text.lower()
+    if len(low) != len(text):
+        # Lowercasing changed offsets (e.g. "İ"); check line by line instead.
+        for i, line in enumerate(lines):
+            line_low = line.lower()
+            found = [w for w in words if w in line_low]
+            if found:
+                yield i, lines, found
+        return
+    ends = list(accumulate(map(len, lines)))
+    line_end = 0
+    for pos in find(low):
+        if pos < line_end:
+            continue  # this line was already checked
+        i = bisect_right(ends, pos)
+        line_end = ends[i]
+        line_low = lines[i].lower()
+        found = [w for w in words if w in line_low]
+        if found:
+            yield i, lines, found
+
+def _keyword_rows(pages, keywords, context=True):
+    """(keyword, file, page, line number, line text, context) per hit, in keyword order."""
+    words = list(dict.fromkeys(kw.lower() for kw in keywords))
+    find = build_keyword_finder(words)
+    by_word = {w: [] for w in words}
+    for file, page, text in pages:
+        for i, lines, found in _lines_with_keywords(text, words, find):
+            window = ""
+            if context:
+                lo, hi = max(0, i - KEYWORD_CONTEXT_LINES), i + KEYWORD_CONTEXT_LINES + 1
+                window = " / ".join(l.strip() for l in lines[lo:hi] if l.strip())
+            row = (file, page, i + 1, lines[i].strip(), window)
+            for w in found:
+                by_word[w].append(row)
+    for kw in keywords:
+        for row in by_word[kw.lower()]:
+            yield (kw,) + row
+
+def keyword_hits(pages, keywords=KEYWORDS):
+    """Every keyword hit in pages, an iterable of (file, page number, text).
+
+    Each hit is a dict with keyword, file, page, line (1-based within the
+    page), the stripped line text and a context window of
+    KEYWORD_CONTEXT_LINES lines either side. Hits are grouped by keyword in
+    KEYWORDS order, in document order within a keyword.
+    """
+    fields = ("keyword", "file", "page", "line", "text", "context")
+    return [dict(zip(fields, row)) for row in _keyword_rows(pages, keywords)]
+
+def find_keywords(text, keywords=KEYWORDS):
+    hits = [row[4] for row in _keyword_rows([(None, None, text)], keywords, context=False)]
     return hits if hits else ["None found"]
 
+# --- Output sink: each artifact is rendered once, written atomically to the
+# output folder, and mirrored to the backup folders by hardlink, or by a
+# background copy where hardlinks are not possible (e.g. across drives).
+# Writes always go to a new file (temp + rename), so a hardlinked mirror never
+# sees a later write to the output folder.
+_mirror_queue = queue.Queue()
+_mirror_thread = None
+mirror_errors = []
+
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _mirror_worker():
+    while True:
+        item = _mirror_queue.get()
+        if item is None:
+            return
+        dest, text = item
+        try:
+            _write_atomic(dest, text)
+        except Exception as e:
+            mirror_errors.append(f"{dest}: {e}")
+
+def start_mirrors():
+    global _mirror_thread
+    _mirror_thread = threading.Thread(target=_mirror_worker, daemon=True)
+    _mirror_thread.start()
+
+def finish_mirrors():
+    """Wait for queued backup copies to land."""
+    global _mirror_thread
+    if _mirror_thread is not None:
+        _mirror_queue.put(None)
+        _mirror_thread.join()
+        _mirror_thread = None
+
+def emit(name, text, output_path, mirror_paths=()):
+    primary = os.path.join(output_path, name)
+    _write_atomic(primary, text)
+    for mirror in mirror_paths:
+        dest = os.path.join(mirror, name)
+        tmp = dest + ".tmp"
+        try:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            os.link(primary, tmp)
+            os.replace(tmp, dest)
+        except OSError:
+            if _mirror_thread is not None:
+                _mirror_queue.put((dest, text))
+            else:
+                _write_atomic(dest, text)
+
 def extract_fields(text):
     mrn = re.search(r'MRN[:\s]+(\w+)', text)
     dob = re.search(r'DOB[:\s]+(\d{2}/\d{2}/\d{4})', text)
@@ -54,6 +190,7 @@ def extract_fields(text):
 def process_case(case_path, output_path, backup_base, csv_writer):
     log = []
     full_text = ""
+    pages = []
     log.append(f"📁 Processing case: {os.path.basename(case_path)}")
 
     for root, _, files in os.walk(case_path):
@@ -61,12 +198,15 @@ def process_case(case_path, output_path, backup_base, csv_writer):
             path = os.path.join(root, f)
             if f.lower().endswith(".pdf"):
                 log.append(f"🔍 OCR PDF: {f}")
-                text = extract_text_from_pdf(path)
-                full_text += "\n" + text
+                pdf_pages = extract_pages_from_pdf(path)
+                pages.extend((f, n, text) for n, text in enumerate(pdf_pages, 1))
+                # Same layout as the FFCR parsers: a header per file, a form feed after each page.
+                full_text += f"\n--- {f} ---\n" + "".join(page + "\f\n" for page in pdf_pages)
             elif f.lower().endswith((".png", ".jpg", ".jpeg")):
                 log.append(f"🔍 OCR Image: {f}")
                 text = extract_text_from_image(path)
-                full_text += "\n" + text
+                pages.append((f, 1, text))
+                full_text += f"\n--- {f} ---\n" + text + "\f\n"
             else:
                 log.append(f"⏩ Skipped (not PDF/image): {f}")
 
@@ -74,26 +214,29 @@ def process_case(case_path, output_path, backup_base, csv_writer):
     backup_path = os.path.join(backup_base, os.path.basename(case_path))
     os.makedirs(backup_path, exist_ok=True)
 
-    with open(os.path.join(output_path, "full_text.txt"), "w", encoding="utf-8") as ft:
-        ft.write(full_text)
-    with open(os.path.join(backup_path, "full_text.txt"), "w", encoding="utf-8") as bft:
-        bft.write(full_text)
+    mirrors = [backup_path]
+
+    emit("full_text.txt", full_text, output_path, mirrors)
 
-    keywords = find_keywords(full_text)
-    with open(os.path.join(output_path, "case_summary.txt"), "w", encoding="utf-8") as cs:
-        cs.write(f"Case: {os.path.basename(case_path)}\nReviewed: {datetime.now()}\n")
-        cs.write("\n--- Keyword Hits ---\n" + "\n".join(keywords))
-    with open(os.path.join(backup_path, "case_summary.txt"), "w", encoding="utf-8") as bcs:
-        bcs.write(f"Case: {os.path.basename(case_path)}\nReviewed: {datetime.now()}\n")
-        bcs.write("\n--- Keyword Hits ---\n" + "\n".join(keywords))
+    hits = keyword_hits(pages)
+    keywords = [h["text"] for h in hits] or ["None found"]
+    emit("case_summary.txt",
+         f"Case: {os.path.basename(case_path)}\nReviewed: {datetime.now()}\n"
+         + "\n--- Keyword Hits ---\n" + "\n".join(keywords),
+         output_path, mirrors)
 
-    fields = extract_fields(full_text)
+    buf = io.StringIO()
+    hit_writer = csv.DictWriter(buf, fieldnames=["keyword", "file", "page", "line", "text", "context"],
+                                lineterminator="\n")
+    hit_writer.writeheader()
+    hit_writer.writerows(hits)
+    emit("keyword_hits.csv", buf.getvalue(), output_path, mirrors)
+
+    # Page text only, as before the file headers: a file name must not match a field.
+    fields = extract_fields("".join("\n" + text for _, _, text in pages))
     csv_writer.writerow({"Case": os.path.basename(case_path), **fields})
 
-    with open(os.path.join(output_path, "log.txt"), "w", encoding="utf-8") as logf:
-        logf.write("\n".join(log))
-    with open(os.path.join(backup_path, "log.txt"), "w", encoding="utf-8") as blogf:
-        blogf.write("\n".join(log))
+    emit("log.txt", "\n".join(log), output_path, mirrors)
 
 def run():
     print("🩺 Fibrin Foam Chart Review Tool v8.3")
@@ -111,16 +254,23 @@ def run():
     print(f"🔍 Scanning: {incoming}")
 
     fieldnames = ["Case", "MRN", "DOB", "Name", "PTA Right", "PTA Left"]
-    with open(spreadsheet, "a", newline='', encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if f.tell() == 0:
-            writer.writeheader()
-        for case in os.listdir(incoming):
-            cpath = os.path.join(incoming, case)
-            if os.path.isdir(cpath):
-                outpath = os.path.join(results, case)
-                print(f"🚀 Processing: {case}")
-                process_case(cpath, outpath, backups, writer)
+    start_mirrors()
+    try:
+        with open(spreadsheet, "a", newline='', encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            if f.tell() == 0:
+                writer.writeheader()
+            for case in os.listdir(incoming):
+                cpath = os.path.join(incoming, case)
+                if os.path.isdir(cpath):
+                    outpath = os.path.join(results, case)
+                    print(f"🚀 Processing: {case}")
+                    process_case(cpath, outpath, backups, writer)
+    finally:
+        print("⏳ Finishing backup copies...")
+        finish_mirrors()
+    for err in mirror_errors:
+        print(f"⚠️ Backup copy failed: {err}")
 
     print("✅ v8.3 complete.")
 
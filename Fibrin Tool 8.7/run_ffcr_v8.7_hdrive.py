@@ -10,9 +10,37 @@ import pytesseract
 import fitz
 from PIL import Image
 import csv
+import errno
 import re
 import shutil
 from datetime import datetime
+import argparse
+import hashlib
+import json
+import queue
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import tesserocr  # optional: in-process Tesseract API (FFCR_OCR_BACKEND=tesserocr)
+except ImportError:
+    tesserocr = None
+
+try:
+    import numpy as np  # optional: page image preprocessing (FFCR_OCR_PREPROCESS=1)
+except ImportError:
+    np = None
+
+try:
+    # optional: filesystem events for --watch (polling is used without it)
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
 
 INCOMING_DIR = 'H:/Shared drives/FFCR/Incoming Cases'
 VAULT_DIR = 'H:/Shared drives/FFCR/VAULT'
@@ -21,148 +49,1819 @@ ARCHIVE_ROOT = 'H:/Shared drives/FFCR/Processed Archive'
 SPREADSHEET = os.path.join(RESULTS_DIR, 'FFCR_master_spreadsheet.csv')
 LOG_FILE = os.path.join(RESULTS_DIR, 'ffcr_processing_log.txt')
 AUDIT_LOG = os.path.join(RESULTS_DIR, 'raw_hits_audit.txt')
+# Journals of archive moves in flight; see commit_case / recover_pending_commits.
+PENDING_DIR = os.path.join(ARCHIVE_ROOT, '.pending_commits')
+# Cases processed at once. OCR pages from all of them share the OCR worker pool.
+CASE_WORKERS = int(os.environ.get('FFCR_CASE_WORKERS') or 2)
+# SQLite index of processed cases: folder name -> fingerprint of its input files.
+PROCESSED_INDEX = os.environ.get('FFCR_PROCESSED_INDEX') or os.path.join(ARCHIVE_ROOT, '.processed_index.sqlite')
+# Files this script writes into a case folder; they are not part of its inputs.
+CASE_OUTPUTS = ('case_summary.txt',)
 
 FIELDS = [
     'MRN', 'DOB', 'Procedure Date', 'Side', 'Pre-op Diagnosis', 'Post-op Diagnosis',
     'Audiometry Pre', 'Audiometry Post', 'Perforation Size', 'Foam Mention', 'Images Present'
 ]
 
+_log_lock = threading.Lock()
+
 def log(msg):
     os.makedirs(RESULTS_DIR, exist_ok=True)
-    with open(LOG_FILE, 'a', encoding='utf-8') as f:
+    with _log_lock, open(LOG_FILE, 'a', encoding='utf-8') as f:
         f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}\n")
 
-def backup_to_vault(folder_name, folder_path):
-    vault_path = os.path.join(VAULT_DIR, folder_name)
-    if not os.path.exists(vault_path):
-        shutil.copytree(folder_path, vault_path)
+# ========= VAULT =========
+# Content-addressed: every file is stored once as VAULT/blobs/<2 hex>/<sha256>
+# and each case is a manifest VAULT/cases/<case>.json listing its files' hashes.
+# Cases vaulted before this layout stay as plain VAULT/<case> folders.
+VAULT_BLOBS = os.path.join(VAULT_DIR, 'blobs')
+VAULT_CASES = os.path.join(VAULT_DIR, 'cases')
 
-def already_processed(folder):
-    archive_date = datetime.today().strftime('%Y-%m-%d')
-    archive_path = os.path.join(ARCHIVE_ROOT, archive_date, folder)
-    return os.path.exists(archive_path)
+def _blob_path(sha):
+    return os.path.join(VAULT_BLOBS, sha[:2], sha)
 
-def ocr_pdf(path):
-    text = ''
-    doc = fitz.open(path)
-    for page_num in range(len(doc)):
-        pix = doc.load_page(page_num).get_pixmap(dpi=300)
-        img = Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
-        text += pytesseract.image_to_string(img) + '\n'
-    return text
-
-def extract_fields(text, image_files, folder_name):
-    lines = text.splitlines()
-    values = {}
-    matched_lines = []
+def _store_blob(src, sha):
+    """Put src into the blob store; returns 'dedup', 'link' or 'copy'."""
+    blob = _blob_path(sha)
+    if os.path.exists(blob):
+        return 'dedup'
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+    try:
+        # The blob shares the case file's storage; case files are only ever
+        # moved afterwards, never edited in place.
+        os.link(src, blob)
+        return 'link'
+    except FileExistsError:
+        return 'dedup'  # another case thread stored the same file first
+    except OSError:
+        pass  # no hardlinks across volumes or on this filesystem
+    tmp = f"{blob}.{threading.get_ident()}.tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, blob)
+    return 'copy'
 
-    def find(pattern, label, flags=0):
-        for line in lines:
-            if re.search(pattern, line, flags):
-                match = re.search(pattern, line, flags)
-                if match:
-                    matched_lines.append(f"{label}: {line.strip()}")
-                    return match.group(1).strip()
-        matched_lines.append(f"{label}: NOT FOUND")
-        return ''
-
-    values['MRN'] = find(r'MRN[:\s]*?(\d{6,})', 'MRN')
-    values['DOB'] = find(r'DOB[:\s]*?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 'DOB')
-    values['Procedure Date'] = find(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 'Procedure Date')
-    values['Side'] = find(r'\b(left|right|bilateral)\b', 'Side', re.IGNORECASE)
-    values['Pre-op Diagnosis'] = find(r'Pre[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', 'Pre-op Diagnosis', re.IGNORECASE)
-    values['Post-op Diagnosis'] = find(r'Post[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', 'Post-op Diagnosis', re.IGNORECASE)
-    values['Perforation Size'] = find(r'\b(small|medium|large)\b(?=.*perforation)', 'Perforation Size', re.IGNORECASE)
-
-    foam = ''
-    for line in lines:
-        if 'fibrin' in line.lower() or 'foam' in line.lower():
-            foam = line.strip()
-            matched_lines.append(f"Foam Mention: {foam}")
+def hash_case_files(folder_path):
+    """[{'path', 'sha256', 'size'}] for every input file of a case, in a stable order."""
+    files = []
+    for root, dirs, names in os.walk(folder_path):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, folder_path).replace(os.sep, '/')
+            if rel in CASE_OUTPUTS:
+                continue
+            files.append({'path': rel, 'sha256': file_sha256(path), 'size': os.path.getsize(path)})
+    return files
+
+def case_fingerprint(files):
+    digest = hashlib.sha256()
+    for entry in files:
+        digest.update(f"{entry['path']}\0{entry['sha256']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def _read_manifest(folder_name):
+    try:
+        with open(os.path.join(VAULT_CASES, folder_name + '.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def backup_to_vault(folder_name, folder_path, files=None):
+    if files is None:
+        files = hash_case_files(folder_path)
+    manifest = _read_manifest(folder_name)
+    if manifest is not None and manifest['files'] == files:
+        return
+    stored = {'dedup': 0, 'link': 0, 'copy': 0}
+    new_bytes = 0
+    for entry in files:
+        how = _store_blob(os.path.join(folder_path, *entry['path'].split('/')), entry['sha256'])
+        stored[how] += 1
+        if how == 'copy':
+            new_bytes += entry['size']
+    os.makedirs(VAULT_CASES, exist_ok=True)
+    # The manifest is written last, so a case only counts as vaulted once every blob is in place.
+    _write_json_atomic(os.path.join(VAULT_CASES, folder_name + '.json'), {
+        'case': folder_name,
+        'vaulted': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'files': files,
+    })
+    log(f"Vaulted {folder_name}: {len(files)} files, {stored['dedup']} already stored, "
+        f"{stored['link']} hardlinked, {stored['copy']} copied ({new_bytes} new bytes)")
+
+def restore_from_vault(folder_name, dest):
+    """Rebuild a vaulted case folder under dest from its manifest."""
+    manifest = _read_manifest(folder_name)
+    if manifest is None:
+        shutil.copytree(os.path.join(VAULT_DIR, folder_name), os.path.join(dest, folder_name))
+        return
+    for entry in manifest['files']:
+        target = os.path.join(dest, folder_name, *entry['path'].split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(_blob_path(entry['sha256']), target)
+
+# ========= PROCESSED INDEX =========
+_processed_db = None
+_processed_lock = threading.Lock()
+# Archive day folders: 2025-08-14, or "2025-08-14 (2)" for a second run of a case that day.
+ARCHIVE_DAY_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})(?: \((\d+)\))?$')
+
+def _processed_index():
+    global _processed_db
+    with _processed_lock:
+        if _processed_db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(PROCESSED_INDEX)), exist_ok=True)
+            db = sqlite3.connect(PROCESSED_INDEX, check_same_thread=False)
+            # extracted: JSON list of the PDFs whose text went into the case (triage may
+            # skip some); NULL for all of them.
+            db.execute('CREATE TABLE IF NOT EXISTS cases (folder TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, '
+                       'archived TEXT NOT NULL, processed TEXT NOT NULL, extracted TEXT)')
+            if 'extracted' not in [row[1] for row in db.execute('PRAGMA table_info(cases)')]:
+                db.execute('ALTER TABLE cases ADD COLUMN extracted TEXT')
+            _processed_db = db
+    return _processed_db
+
+def processed_entry(folder):
+    """(fingerprint, archived path) of the last run of this case folder, or None."""
+    db = _processed_index()
+    with _processed_lock:
+        return db.execute('SELECT fingerprint, archived FROM cases WHERE folder = ?', (folder,)).fetchone()
+
+def already_processed(folder, fingerprint):
+    entry = processed_entry(folder)
+    return entry is not None and entry[0] == fingerprint
+
+def processed_cases():
+    """[(folder, archived path, extracted PDFs or None for all)] of every indexed case, oldest run first."""
+    db = _processed_index()
+    with _processed_lock:
+        rows = db.execute('SELECT folder, archived, extracted FROM cases ORDER BY processed, folder').fetchall()
+    return [(folder, archived, json.loads(extracted) if extracted else None)
+            for folder, archived, extracted in rows]
+
+def record_processed(folder, fingerprint, archived, when=None, extracted=None):
+    db = _processed_index()
+    with _processed_lock:
+        db.execute('INSERT OR REPLACE INTO cases (folder, fingerprint, archived, processed, extracted) '
+                   'VALUES (?, ?, ?, ?, ?)',
+                   (folder, fingerprint, archived, when or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    json.dumps(extracted) if extracted is not None else None))
+        db.commit()
+
+def close_processed_index():
+    global _processed_db
+    with _processed_lock:
+        if _processed_db is not None:
+            _processed_db.close()
+            _processed_db = None
+
+def _archive_days():
+    days = []
+    for name in os.listdir(ARCHIVE_ROOT):
+        m = ARCHIVE_DAY_RE.match(name)
+        if m and os.path.isdir(os.path.join(ARCHIVE_ROOT, name)):
+            days.append((m.group(1), int(m.group(2) or 1), name))
+    return [name for _, _, name in sorted(days)]
+
+def rebuild_processed_index():
+    """Re-create the index from the case folders under ARCHIVE_ROOT; the latest run of a case wins."""
+    db = _processed_index()
+    with _processed_lock:
+        # The archive does not say which PDFs triage skipped; keep what the index knew.
+        extracted = dict(db.execute('SELECT archived, extracted FROM cases WHERE extracted IS NOT NULL'))
+        db.execute('DELETE FROM cases')
+        db.commit()
+    count = 0
+    for day in _archive_days():
+        day_path = os.path.join(ARCHIVE_ROOT, day)
+        for folder in sorted(os.listdir(day_path)):
+            path = os.path.join(day_path, folder)
+            if not os.path.isdir(path) or folder.endswith('.partial'):
+                continue
+            known = extracted.get(path)
+            record_processed(folder, case_fingerprint(hash_case_files(path)), path,
+                             ARCHIVE_DAY_RE.match(day).group(1), json.loads(known) if known else None)
+            count += 1
+    return count
+
+# ========= OCR ENGINE START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+
+# Number of OCR worker processes. FFCR_OCR_WORKERS=1 keeps everything in-process.
+OCR_WORKERS = int(os.environ.get('FFCR_OCR_WORKERS') or os.cpu_count() or 1)
+OCR_DPI = 300
+# 'hybrid' reads each page's text layer and OCRs only pages without enough text;
+# 'ocr' rasterizes and OCRs every page (the pre-hybrid behaviour).
+OCR_MODE = os.environ.get('FFCR_OCR_MODE', 'hybrid').lower()
+# Fewer non-blank characters than this in the text layer means the page gets OCRed.
+TEXT_LAYER_MIN_CHARS = int(os.environ.get('FFCR_TEXT_LAYER_MIN_CHARS') or 40)
+# Adaptive DPI: OCR at OCR_BASE_DPI first and re-render at the escalation DPIs
+# only when the mean Tesseract word confidence is below OCR_MIN_CONF.
+OCR_ADAPTIVE = os.environ.get('FFCR_OCR_ADAPTIVE', '0') == '1'
+OCR_BASE_DPI = int(os.environ.get('FFCR_OCR_BASE_DPI') or 150)
+OCR_ESCALATE_DPIS = [int(d) for d in (os.environ.get('FFCR_OCR_ESCALATE_DPI') or '300,400').split(',')]
+OCR_MIN_CONF = float(os.environ.get('FFCR_OCR_MIN_CONF') or 80)
+# Render single-channel pixmaps and pipe them to `tesseract stdin` as PGM instead of
+# RGB -> PIL image -> temp file via pytesseract. FFCR_OCR_FAST_RENDER=0 restores the old path.
+OCR_FAST_RENDER = os.environ.get('FFCR_OCR_FAST_RENDER', '1') != '0'
+# 'cli' runs the tesseract executable per page; 'tesserocr' keeps one Tesseract engine
+# alive in each worker and reuses it for every page (falls back to 'cli' if not installed).
+OCR_BACKEND = os.environ.get('FFCR_OCR_BACKEND', 'cli').lower()
+OCR_LANG = os.environ.get('FFCR_OCR_LANG', 'eng')
+# Clean up gray page renders before OCR: adaptive binarization, deskew, margin
+# crop and squeezing of tall blank bands. Needs numpy; applies to the gray
+# render paths (FFCR_OCR_FAST_RENDER=1 and the tesserocr backend).
+OCR_PREPROCESS = os.environ.get('FFCR_OCR_PREPROCESS', '0') == '1'
+# Page-result cache keyed by PDF SHA-256 + page + engine settings. FFCR_OCR_CACHE=off disables it.
+OCR_CACHE_PATH = os.environ.get('FFCR_OCR_CACHE') or os.path.join(
+    os.path.expanduser('~'), '.ffcr', 'ocr_cache.sqlite')
+OCR_CACHE_MAX_MB = float(os.environ.get('FFCR_OCR_CACHE_MB') or 512)
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+# Per-thread open document (see _get_doc) and Tesseract engine (one thread per pool worker).
+_ocr_local = threading.local()
+# PyMuPDF is not thread-safe; serializes in-process use when cases run on threads.
+# Held for MuPDF calls only (open, load, text layer, render), never while Tesseract runs.
+_fitz_lock = threading.RLock()
+_ocr_cache_db = None
+_ocr_cache_lock = threading.Lock()
+_tesseract_version = None
+ocr_cache_stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+
+def _ocr_settings():
+    return {'OCR_DPI': OCR_DPI, 'OCR_MODE': OCR_MODE,
+            'TEXT_LAYER_MIN_CHARS': TEXT_LAYER_MIN_CHARS,
+            'OCR_ADAPTIVE': OCR_ADAPTIVE, 'OCR_BASE_DPI': OCR_BASE_DPI,
+            'OCR_ESCALATE_DPIS': OCR_ESCALATE_DPIS, 'OCR_MIN_CONF': OCR_MIN_CONF,
+            'OCR_FAST_RENDER': OCR_FAST_RENDER, 'OCR_BACKEND': OCR_BACKEND,
+            'OCR_LANG': OCR_LANG, 'OCR_PREPROCESS': OCR_PREPROCESS}
+
+def _init_ocr_worker(settings):
+    global _fitz_lock
+    # Spawned workers re-import this module, so carry over the parent's settings.
+    globals().update(settings)
+    # A forked worker may inherit the lock mid-acquire from a case thread.
+    _fitz_lock = threading.RLock()
+    # One Tesseract thread per worker; the pool supplies the parallelism.
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+def _get_doc(path):
+    """This thread's open document for path, reopened if the file was replaced
+    (keyed on path, mtime and size). Close it with _release_doc()."""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    if getattr(_ocr_local, 'doc_key', None) != key:
+        _release_doc()
+        _ocr_local.doc = fitz.open(path)
+        _ocr_local.doc_key = key
+    return _ocr_local.doc
+
+def _release_doc():
+    doc = getattr(_ocr_local, 'doc', None)
+    _ocr_local.doc = _ocr_local.doc_key = None
+    if doc is not None:
+        doc.close()
+
+def _pooled(func, arg):
+    # Pool workers close the document after every task, so no worker keeps a
+    # case's PDFs open (and locked on Windows) once the case is done.
+    try:
+        return func(arg)
+    finally:
+        _release_doc()
+
+def _has_text_layer(text):
+    return len(''.join(text.split())) >= TEXT_LAYER_MIN_CHARS
+
+def _render(page, dpi, clip=None):
+    with _fitz_lock:
+        pix = page.get_pixmap(dpi=dpi, clip=clip)
+        return Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
+
+def _render_pgm(page, dpi, clip=None):
+    """Render a gray, alpha-free page (or the clip rect of it) as binary PGM: a
+    few header bytes in front of the raw samples, which tesseract reads
+    straight from stdin."""
+    if OCR_PREPROCESS and np is not None:
+        samples, width, height = _preprocess(page, dpi, clip)
+        return b'P5\n%d %d\n255\n' % (width, height) + samples
+    with _fitz_lock:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+        return b'P5\n%d %d\n255\n' % (pix.width, pix.height) + pix.samples_mv
+
+# Preprocessing knobs, in inches where they depend on resolution.
+DESKEW_MAX_DEGREES = 5.0
+DESKEW_STEP_DEGREES = 0.25
+DESKEW_MIN_DEGREES = 0.3
+BINARIZE_WINDOW_INCHES = 0.12
+BINARIZE_OFFSET = 0.15
+INK_MAX_GRAY = 140
+CROP_PAD_INCHES = 0.1
+BLANK_GAP_INCHES = 0.25
+
+def _gray_array(pix):
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+def _estimate_skew(gray):
+    """Skew angle in degrees from the row profile of a downsampled page.
+
+    Text lines give the sharpest row profile when sheared level, so each
+    candidate angle shears the dark pixels and scores the profile by the sum
+    of squared differences between neighbouring rows.
+    """
+    step = max(1, gray.shape[1] // 600)
+    small = gray[::step, ::step]
+    ys, xs = np.nonzero(small < 128)
+    if len(ys) < 100:
+        return 0.0
+    angles = np.arange(-DESKEW_MAX_DEGREES, DESKEW_MAX_DEGREES + 1e-9, DESKEW_STEP_DEGREES)
+    best_angle, best_score = 0.0, -1.0
+    for angle in angles:
+        rows = np.round(ys + xs * np.tan(np.radians(angle))).astype(np.int64)
+        profile = np.bincount(rows - rows.min())
+        score = float(np.sum(np.diff(profile).astype(np.float64) ** 2))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+def _box_mean(a, half):
+    """Mean over the (2*half+1)-square window around each cell, edges clamped."""
+    padded = np.pad(a, half, mode='edge')
+    size = 2 * half + 1
+    for axis in (0, 1):
+        c = np.cumsum(padded, axis=axis, dtype=np.float64)
+        c = np.insert(c, 0, 0, axis=axis)
+        if axis == 0:
+            padded = c[size:] - c[:-size]
+        else:
+            padded = c[:, size:] - c[:, :-size]
+    return padded / (size * size)
+
+def _binarize(gray, dpi):
+    """Bradley-Roth adaptive threshold: a pixel is ink when it is darker than its
+    local mean by BINARIZE_OFFSET and darker than INK_MAX_GRAY, so the edge of a
+    shaded band on the page does not turn into a line of ink. Local means are
+    taken over 4x4 blocks, which is plenty for a window a tenth of an inch wide."""
+    block = 4
+    h, w = gray.shape
+    hb, wb = -(-h // block), -(-w // block)
+    padded = np.pad(gray, ((0, hb * block - h), (0, wb * block - w)), mode='edge')
+    blocks = padded.reshape(hb, block, wb, block).sum(axis=(1, 3), dtype=np.uint16) / (block * block)
+    half = max(1, int(dpi * BINARIZE_WINDOW_INCHES) // (2 * block))
+    threshold = (_box_mean(blocks, half) * (1 - BINARIZE_OFFSET)).astype(np.uint8)
+    threshold = threshold.repeat(block, 0).repeat(block, 1)[:h, :w]
+    return (gray < threshold) & (gray < INK_MAX_GRAY)
+
+def _preprocess(page, dpi, clip=None):
+    with _fitz_lock:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+        gray = _gray_array(pix)
+    angle = _estimate_skew(gray)
+    if abs(angle) >= DESKEW_MIN_DEGREES:
+        # Re-render rotated rather than rotating our raster: one resampling pass, done by MuPDF.
+        matrix = fitz.Matrix(dpi / 72, dpi / 72).prerotate(angle)
+        with _fitz_lock:
+            pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+            gray = _gray_array(pix)
+    ink = _binarize(gray, dpi)
+    # Margin crop: keep the box around rows/columns holding ink, plus a little padding.
+    rows = np.flatnonzero(ink.sum(1) > 1)
+    cols = np.flatnonzero(ink.sum(0) > 1)
+    if len(rows) == 0 or len(cols) == 0:
+        blank = np.full((dpi // 4, dpi // 4), 255, dtype=np.uint8)
+        return blank.tobytes(), blank.shape[1], blank.shape[0]
+    pad = int(dpi * CROP_PAD_INCHES)
+    ink = ink[max(0, rows[0] - pad):rows[-1] + pad + 1, max(0, cols[0] - pad):cols[-1] + pad + 1]
+    # Squeeze blank bands taller than BLANK_GAP_INCHES down to that height.
+    gap = int(dpi * BLANK_GAP_INCHES)
+    blank_rows = ~ink.any(1)
+    run_start = np.maximum.accumulate(np.where(blank_rows, 0, np.arange(1, len(blank_rows) + 1)))
+    keep = ~blank_rows | (np.arange(len(blank_rows)) - run_start < gap)
+    out = np.where(ink[keep], 0, 255).astype(np.uint8)
+    return out.tobytes(), out.shape[1], out.shape[0]
+
+def _tesseract_stdin(image, dpi, *args):
+    cmd = [pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout', '-l', OCR_LANG, '--dpi', str(dpi), *args]
+    proc = subprocess.run(cmd, input=image, capture_output=True,
+                          creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    if proc.returncode:
+        raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode('utf-8', 'replace'))
+    return proc.stdout.decode('utf-8')
+
+def ocr_backend():
+    return 'tesserocr' if OCR_BACKEND == 'tesserocr' and tesserocr is not None else 'cli'
+
+def ocr_backend_note():
+    note = f"OCR backend: {ocr_backend()}"
+    if OCR_BACKEND == 'tesserocr' and tesserocr is None:
+        note += ' (tesserocr not installed, using the tesseract CLI)'
+    return note
+
+def _api_recognize(page, dpi, clip=None):
+    """Run the worker's long-lived Tesseract engine over a gray render of page."""
+    api = getattr(_ocr_local, 'tess_api', None)
+    if api is None:
+        api = _ocr_local.tess_api = tesserocr.PyTessBaseAPI(lang=OCR_LANG)
+    if OCR_PREPROCESS and np is not None:
+        samples, width, height = _preprocess(page, dpi, clip)
+        api.SetImageBytes(samples, width, height, 1, width)
+    else:
+        with _fitz_lock:
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+            api.SetImageBytes(pix.samples, pix.width, pix.height, 1, pix.stride)
+    api.SetSourceResolution(dpi)
+    api.Recognize()
+    return api
+
+# GetTSVText() returns rows only; the tesseract CLI adds this header itself.
+TSV_HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext'
+
+def _tsv_to_data(tsv):
+    """Parse tesseract TSV output into the dict shape of image_to_data(Output.DICT)."""
+    rows = [line.split('\t') for line in tsv.splitlines() if line]
+    header = rows[0]
+    data = {column: [] for column in header}
+    for row in rows[1:]:
+        row += [''] * (len(header) - len(row))
+        for column, value in zip(header, row):
+            data[column].append(value)
+    return data
+
+def _image_to_string(page, dpi, clip=None):
+    if ocr_backend() == 'tesserocr':
+        return _api_recognize(page, dpi, clip).GetUTF8Text()
+    if OCR_FAST_RENDER:
+        return _tesseract_stdin(_render_pgm(page, dpi, clip), dpi)
+    return pytesseract.image_to_string(_render(page, dpi, clip), lang=OCR_LANG)
+
+def _image_to_data(page, dpi):
+    if ocr_backend() == 'tesserocr':
+        return _tsv_to_data(TSV_HEADER + '\n' + _api_recognize(page, dpi).GetTSVText(0))
+    if OCR_FAST_RENDER:
+        return _tsv_to_data(_tesseract_stdin(_render_pgm(page, dpi), dpi, 'tsv'))
+    return pytesseract.image_to_data(_render(page, dpi), lang=OCR_LANG, output_type=pytesseract.Output.DICT)
+
+def _mean_conf(data):
+    confs = [float(c) for c, word in zip(data['conf'], data['text'])
+             if float(c) >= 0 and word.strip()]
+    return sum(confs) / len(confs) if confs else 0.0
+
+def _data_to_text(data):
+    """Rebuild page text from image_to_data words: one line per OCR line,
+    a blank line between paragraphs."""
+    lines = []
+    last_line = last_par = None
+    for i, word in enumerate(data['text']):
+        if not word.strip():
+            continue
+        par = (data['block_num'][i], data['par_num'][i])
+        line = par + (data['line_num'][i],)
+        if line != last_line:
+            if last_par is not None and par != last_par:
+                lines.append('')
+            lines.append(word)
+        else:
+            lines[-1] += ' ' + word
+        last_line, last_par = line, par
+    return '\n'.join(lines) + '\n'
+
+def _ocr_adaptive(page):
+    best = None
+    tried = []
+    for dpi in [OCR_BASE_DPI] + [d for d in OCR_ESCALATE_DPIS if d > OCR_BASE_DPI]:
+        data = _image_to_data(page, dpi)
+        conf = _mean_conf(data)
+        tried.append(f"{dpi}:{conf:.1f}")
+        if best is None or conf > best[1]:
+            best = (dpi, conf, data)
+        if conf >= OCR_MIN_CONF:
             break
-    values['Foam Mention'] = foam
+    dpi, conf, data = best
+    return {'text': _data_to_text(data), 'dpi': dpi, 'conf': round(conf, 1),
+            'tried': ','.join(tried)}
+
+def _ocr_page(task):
+    """Extract one page; returns {'page', 'source', 'text'}.
+
+    source is 'text' when the PDF's own text layer was used, 'ocr' otherwise.
+    Adaptive OCR also reports the chosen dpi, its mean confidence and every
+    dpi:confidence attempt.
+    """
+    path, page_num = task
+    with _fitz_lock:
+        page = _get_doc(path).load_page(page_num)
+        if OCR_MODE == 'hybrid':
+            text = page.get_text()
+            if _has_text_layer(text):
+                return {'page': page_num, 'source': 'text', 'text': text}
+    # The renders take _fitz_lock themselves; Tesseract runs without it.
+    if OCR_ADAPTIVE:
+        return dict(_ocr_adaptive(page), page=page_num, source='ocr')
+    text = _image_to_string(page, OCR_DPI)
+    return {'page': page_num, 'source': 'ocr', 'text': text}
+
+# Header block for triage OCR: the first TRIAGE_HEADER_LINES lines of text,
+# found in a cheap low-resolution render, never more than TRIAGE_MAX_FRACTION of the page.
+TRIAGE_HEADER_LINES = int(os.environ.get('FFCR_TRIAGE_LINES') or 12)
+TRIAGE_MAX_FRACTION = 0.4
+TRIAGE_PROBE_DPI = 72
+
+def _header_clip(page):
+    with _fitz_lock:
+        pix = page.get_pixmap(dpi=TRIAGE_PROBE_DPI, colorspace=fitz.csGRAY, alpha=False)
+        samples = pix.samples
+    limit = int(pix.height * TRIAGE_MAX_FRACTION)
+    bottom = limit
+    lines = 0
+    inked_before = False
+    for row in range(limit):
+        start = row * pix.stride
+        inked = min(samples[start:start + pix.width]) < 160
+        if inked and not inked_before:
+            lines += 1
+        elif not inked and inked_before and lines >= TRIAGE_HEADER_LINES:
+            bottom = row
+            break
+        inked_before = inked
+    rect = page.rect
+    height = min(rect.height, (bottom + 4) * 72 / TRIAGE_PROBE_DPI)
+    return fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y0 + height)
+
+def _ocr_header(path):
+    """Text of the header block of a PDF's first page: {'source', 'text', 'clip'}.
+
+    A page with a text layer (in hybrid mode) gives its whole text for free;
+    otherwise only the header block is OCRed, and clip is its height in points.
+    """
+    with _fitz_lock:
+        doc = _get_doc(path)
+        if len(doc) == 0:
+            return {'source': 'empty', 'text': '', 'clip': 0}
+        page = doc.load_page(0)
+        if OCR_MODE == 'hybrid':
+            text = page.get_text()
+            if _has_text_layer(text):
+                return {'source': 'text', 'text': text, 'clip': round(page.rect.height)}
+        clip = _header_clip(page)
+    return {'source': 'ocr', 'text': _image_to_string(page, OCR_DPI, clip),
+            'clip': round(clip.height)}
+
+def ocr_headers(paths):
+    """_ocr_header() for each path, in order, spread over the OCR pool."""
+    pool = get_ocr_pool()
+    if pool:
+        return list(pool.map(_pooled, [_ocr_header] * len(paths), paths))
+    try:
+        return [_ocr_header(path) for path in paths]
+    finally:
+        _release_doc()
+
+def get_ocr_pool():
+    global _ocr_pool
+    # Case threads ask for the pool concurrently; only one of them may create it.
+    with _ocr_pool_lock:
+        if _ocr_pool is None and OCR_WORKERS > 1:
+            _ocr_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS,
+                                            initializer=_init_ocr_worker,
+                                            initargs=(_ocr_settings(),))
+        return _ocr_pool
+
+def start_ocr_engine():
+    """Look up the engine version and launch the OCR worker processes from the
+    main thread, before any case thread exists. The workers are forked on
+    Linux; one forked while a case thread is starting tesseract keeps that
+    subprocess's exec pipe open, and the case thread then waits on it forever."""
+    _engine_signature()
+    pool = get_ocr_pool()
+    if pool is not None:
+        # With fork, the first submit launches every worker at once.
+        pool.submit(os.getpid).result()
+
+def shutdown_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        pool, _ocr_pool = _ocr_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _ocr_cache():
+    global _ocr_cache_db
+    with _ocr_cache_lock:
+        if _ocr_cache_db is None and OCR_CACHE_PATH.lower() != 'off':
+            os.makedirs(os.path.dirname(os.path.abspath(OCR_CACHE_PATH)), exist_ok=True)
+            # Opened by whichever thread runs the first case (see watch_incoming).
+            db = sqlite3.connect(OCR_CACHE_PATH, check_same_thread=False)
+            db.execute('CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, record TEXT NOT NULL, '
+                       'size INTEGER NOT NULL, used REAL NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS pages_used ON pages (used)')
+            _ocr_cache_db = db
+        return _ocr_cache_db
+
+def _engine_signature():
+    global _tesseract_version
+    if _tesseract_version is None:
+        try:
+            if ocr_backend() == 'tesserocr':
+                _tesseract_version = tesserocr.tesseract_version().split('\n')[0]
+            else:
+                _tesseract_version = str(pytesseract.get_tesseract_version())
+        except Exception:
+            _tesseract_version = 'unknown'
+    return f"{ocr_backend()}={_tesseract_version};" + json.dumps(_ocr_settings(), sort_keys=True)
+
+def _cache_lookup(db, key):
+    with _ocr_cache_lock:
+        row = db.execute('SELECT record FROM pages WHERE key = ?', (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def _cache_flush(db, hits, fresh):
+    """Mark hit keys as recently used, store fresh (key, record) pairs and
+    evict least-recently-used pages down to 90% of the size limit."""
+    with _ocr_cache_lock:
+        _cache_flush_locked(db, hits, fresh)
+
+def _cache_flush_locked(db, hits, fresh):
+    now = time.time()
+    db.executemany('UPDATE pages SET used = ? WHERE key = ?', [(now, key) for key in hits])
+    rows = []
+    for key, record in fresh:
+        blob = json.dumps(record)
+        rows.append((key, blob, len(blob.encode('utf-8')), now))
+    db.executemany('INSERT OR REPLACE INTO pages (key, record, size, used) VALUES (?, ?, ?, ?)', rows)
+    ocr_cache_stats['hits'] += len(hits)
+    ocr_cache_stats['misses'] += len(fresh)
+    limit = int(OCR_CACHE_MAX_MB * 1024 * 1024)
+    total = db.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+    if total > limit:
+        doomed = []
+        for key, size in db.execute('SELECT key, size FROM pages ORDER BY used'):
+            if total <= limit * 0.9:
+                break
+            doomed.append((key,))
+            total -= size
+        db.executemany('DELETE FROM pages WHERE key = ?', doomed)
+        ocr_cache_stats['evicted'] += len(doomed)
+    db.commit()
+    hits.clear()
+    fresh.clear()
+
+def ocr_cache_summary():
+    stats = ocr_cache_stats
+    return f"OCR cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evicted']} evicted"
+
+def close_ocr_cache():
+    global _ocr_cache_db
+    with _ocr_cache_lock:
+        if _ocr_cache_db is not None:
+            _ocr_cache_db.close()
+            _ocr_cache_db = None
+
+def _page_tasks(paths, db):
+    for index, path in enumerate(paths):
+        digest = file_sha256(path) if db else None
+        with _fitz_lock, fitz.open(path) as doc:
+            page_count = len(doc)
+        for page_num in range(page_count):
+            key = f"{digest}:{page_num}:{_engine_signature()}" if db else None
+            yield index, (path, page_num), key
 
-    pre_audio = ''
-    post_audio = ''
+def iter_pdf_pages(paths):
+    """Yield (index into paths, page record) in file/page order.
+
+    Pages of every PDF are spread over the worker pool, but at most
+    OCR_WORKERS * 2 are in flight at once, so memory stays at a handful of
+    pages however large the case is. Pages already in the OCR cache are
+    served from it (marked cache=hit) without touching the pool.
+    """
+    db = _ocr_cache()
+    pool = get_ocr_pool()
+    limit = OCR_WORKERS * 2 if pool else 0
+    pending = deque()
+    hits = []
+    fresh = []
+
+    def finish():
+        index, key, item, cached = pending.popleft()
+        record = item.result() if isinstance(item, Future) else item
+        if db and not cached:
+            fresh.append((key, record))
+        return index, record
+
+    try:
+        for index, task, key in _page_tasks(paths, db):
+            record = _cache_lookup(db, key) if db else None
+            if record is not None:
+                hits.append(key)
+                pending.append((index, key, dict(record, cache='hit'), True))
+            elif pool:
+                pending.append((index, key, pool.submit(_pooled, _ocr_page, task), False))
+            else:
+                pending.append((index, key, _ocr_page(task), False))
+            while len(pending) > limit:
+                yield finish()
+                if db and len(hits) + len(fresh) >= 32:
+                    _cache_flush(db, hits, fresh)
+        while pending:
+            yield finish()
+    finally:
+        _release_doc()
+        if db:
+            _cache_flush(db, hits, fresh)
+
+def extract_pdf_pages(paths):
+    """Return one list of page records (see _ocr_page) per path, in order."""
+    pages = [[] for _ in paths]
+    for index, record in iter_pdf_pages(paths):
+        pages[index].append(record)
+    return pages
+
+def iter_case_text(paths, page_audit, on_page=None):
+    """Yield a case's full_text.txt as chunks: a '--- file ---' header per PDF
+    followed by its pages, each ending with a form feed line (Tesseract output
+    already ends in one). Each chunk ends with a newline. One audit line per
+    page is appended to page_audit as the pages arrive, and on_page(file,
+    page number, text) is called for each page if given."""
+    files = [os.path.basename(path) for path in paths]
+    started = 0
+    for index, record in iter_pdf_pages(paths):
+        while started <= index:
+            yield f"\n--- {files[started]} ---\n"
+            started += 1
+        page_audit.extend(page_audit_lines(files[index], [record]))
+        if on_page is not None:
+            on_page(files[index], record['page'] + 1, record['text'])
+        text = record['text']
+        yield (text if text.endswith('\f') else text + '\f') + '\n'
+    for file in files[started:]:
+        yield f"\n--- {file} ---\n"
+
+def iter_lines(chunks, out=None):
+    """Split newline-terminated chunks into lines, writing each chunk to out."""
+    for chunk in chunks:
+        if out is not None:
+            out.write(chunk)
+        yield from chunk.splitlines()
+
+def pages_to_text(pages):
+    return ''.join(record['text'] + '\n' for record in pages)
+
+def page_audit_lines(file, pages):
+    """One audit line per page saying how its text was obtained."""
+    lines = []
+    for record in pages:
+        extra = ''.join(f" {k}={v}" for k, v in record.items()
+                        if k not in ('page', 'source', 'text'))
+        lines.append(f"Page {record['page'] + 1} [{file}]: {record['source']}{extra}")
+    return lines
+
+def ocr_pdfs(paths):
+    return [pages_to_text(pages) for pages in extract_pdf_pages(paths)]
+
+def ocr_pdf(path):
+    return ocr_pdfs([path])[0]
+
+# ========= OCR ENGINE END =========
+
+# ========= FIELD SCAN START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+
+FIELD_PATTERNS = [
+    ('MRN', r'MRN[:\s]*?(\d{6,})', 0),
+    ('DOB', r'DOB[:\s]*?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 0),
+    ('Procedure Date', r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 0),
+    ('Side', r'\b(left|right|bilateral)\b', re.IGNORECASE),
+    ('Pre-op Diagnosis', r'Pre[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', re.IGNORECASE),
+    ('Post-op Diagnosis', r'Post[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', re.IGNORECASE),
+    ('Perforation Size', r'\b(small|medium|large)\b(?=.*perforation)', re.IGNORECASE),
+]
+SCAN_LABELS = [label for label, _, _ in FIELD_PATTERNS] + [
+    'Foam Mention', 'Audiometry Pre', 'Audiometry Post']
+
+# (tokens, lower_tokens) a line must contain before a field's pattern can match: tokens are
+# checked as-is, lower_tokens against line.lower(). Lowercasing agrees with the
+# patterns' IGNORECASE only for ASCII, so other lines skip the prefilter.
+_FIELD_PREFILTERS = {
+    'MRN': (('MRN',), ()),
+    'DOB': (('DOB',), ()),
+    'Procedure Date': (('/', '-'), ()),
+    'Side': ((), ('left', 'right', 'bilateral')),
+    'Pre-op Diagnosis': ((), ('diagnosis',)),
+    'Post-op Diagnosis': ((), ('diagnosis',)),
+    'Perforation Size': ((), ('perforation',)),
+}
+_FIELD_RULES = [(label, re.compile(pattern, flags).search) + _FIELD_PREFILTERS[label]
+                for label, pattern, flags in FIELD_PATTERNS]
+
+def _may_match(rule, line, low):
+    if low is None:
+        return True
+    for token in rule[2]:
+        if token in line:
+            return True
+    for token in rule[3]:
+        if token in low:
+            return True
+    return False
+
+def scan_fields(lines):
+    """Walk the case text once, line by line, without holding it in memory.
+
+    Returns (values, hits), both keyed by SCAN_LABELS: the extracted value and
+    the stripped line it came from ('' when nothing matched). Each pattern
+    takes its first matching line, Foam Mention the first fibrin/foam line,
+    and Audiometry Pre/Post the first two lines with both '500' and 'dB'.
+    Once every field is filled the rest of lines is drained unread, so a tee
+    like iter_lines() still sees the whole text.
+    """
+    values = dict.fromkeys(SCAN_LABELS, '')
+    hits = dict.fromkeys(SCAN_LABELS, '')
+    pending = list(_FIELD_RULES)
+    foam = False
+    audio = 0
+    lines = iter(lines)
     for line in lines:
-        if '500' in line and 'dB' in line:
-            if not pre_audio:
-                pre_audio = line.strip()
-                matched_lines.append(f"Audiometry Pre: {pre_audio}")
-            elif not post_audio:
-                post_audio = line.strip()
-                matched_lines.append(f"Audiometry Post: {post_audio}")
-    values['Audiometry Pre'] = pre_audio
-    values['Audiometry Post'] = post_audio
+        low = line.lower()
+        if pending:
+            prefilter_low = low if line.isascii() else None
+            matched = None
+            for rule in pending:
+                if not _may_match(rule, line, prefilter_low):
+                    continue
+                match = rule[1](line)
+                if match:
+                    hits[rule[0]] = line.strip()
+                    values[rule[0]] = match.group(1).strip()
+                    matched = matched or []
+                    matched.append(rule)
+            if matched:
+                pending = [rule for rule in pending if rule not in matched]
+        if not foam and ('fibrin' in low or 'foam' in low):
+            foam = True
+            hits['Foam Mention'] = values['Foam Mention'] = line.strip()
+        if audio < 2 and '500' in line and 'dB' in line:
+            label = 'Audiometry Post' if audio else 'Audiometry Pre'
+            audio += 1
+            hits[label] = values[label] = line.strip()
+        if not pending and foam and audio == 2:
+            deque(lines, maxlen=0)
+    return values, hits
+
+# ========= FIELD SCAN END =========
+
+# ========= TRIAGE START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+# FFCR_TRIAGE=1: before any full OCR, read only the header block of each PDF's
+# first page, where MRN, DOB, procedure date and side sit. Full extraction runs
+# only for cases whose headers give every FFCR_TRIAGE_REQUIRE field, and only
+# for the PDFs whose header mentions one of FFCR_TRIAGE_KEYWORDS (all PDFs when
+# unset). Other cases are deferred and left for a later run. triage_deferred.csv
+# gets a row when a case's triage status changes, not on every run.
+TRIAGE = os.environ.get('FFCR_TRIAGE', '0') == '1'
+TRIAGE_FIELDS = ['MRN', 'DOB', 'Procedure Date', 'Side']
+TRIAGE_REQUIRE = [f.strip() for f in (os.environ.get('FFCR_TRIAGE_REQUIRE') or 'MRN').split(',') if f.strip()]
+TRIAGE_KEYWORDS = [k.strip().lower() for k in (os.environ.get('FFCR_TRIAGE_KEYWORDS') or '').split(',') if k.strip()]
+TRIAGE_LOG = os.path.join(RESULTS_DIR, 'triage_deferred.csv')
+
+TRIAGE_PASSED = 'passed triage'
+
+_triage_log_lock = threading.Lock()
+# {case: (reason, header field values)} of each case's latest TRIAGE_LOG row.
+_triage_status = None
+
+def triage_case(paths):
+    """Header-only pass over a case's PDFs.
+
+    Returns (fields, relevant, audit, deferred): the TRIAGE_FIELDS values read
+    from the headers, the paths worth a full extraction, one audit line per
+    PDF, and the reason to defer the case ('' when it passes).
+    """
+    headers = ocr_headers(paths)
+    values, _ = scan_fields(line for header in headers for line in header['text'].splitlines())
+    fields = {label: values[label] for label in TRIAGE_FIELDS}
+    relevant = []
+    audit = []
+    for path, header in zip(paths, headers):
+        low = header['text'].lower()
+        keep = not TRIAGE_KEYWORDS or any(keyword in low for keyword in TRIAGE_KEYWORDS)
+        if keep:
+            relevant.append(path)
+        audit.append(f"Triage [{os.path.basename(path)}]: header {header['source']} "
+                     f"{header['clip']}pt, {'full extraction' if keep else 'skipped, no keyword in header'}")
+    missing = [label for label in TRIAGE_REQUIRE if not values.get(label)]
+    if missing:
+        deferred = f"no {', '.join(missing)} in page 1 headers"
+    elif paths and not relevant:
+        deferred = 'no PDF header mentions a triage keyword'
+    else:
+        deferred = ''
+    return fields, relevant, audit, deferred
+
+def _last_triage_status():
+    global _triage_status
+    if _triage_status is None:
+        _triage_status = {}
+        if os.path.exists(TRIAGE_LOG):
+            with open(TRIAGE_LOG, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    _triage_status[row['Case']] = (row['Reason'],
+                                                   tuple(row.get(label) or '' for label in TRIAGE_FIELDS))
+    return _triage_status
+
+def record_deferred(case, fields, reason):
+    """Log a case's triage outcome to TRIAGE_LOG if it changed; returns True if logged.
+
+    A deferral is logged the first time and again only when its reason or
+    header fields differ from the case's last row. A pass (reason '') is
+    logged only for a case whose last row was a deferral.
+    """
+    status = (reason or TRIAGE_PASSED, tuple(fields.get(label, '') for label in TRIAGE_FIELDS))
+    with _triage_log_lock:
+        last = _last_triage_status().get(case)
+        if last == status or (not reason and (last is None or last[0] == TRIAGE_PASSED)):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(TRIAGE_LOG)), exist_ok=True)
+        new = not os.path.exists(TRIAGE_LOG)
+        with open(TRIAGE_LOG, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new:
+                writer.writerow(['When', 'Case', 'Reason'] + TRIAGE_FIELDS)
+            writer.writerow([time.strftime('%Y-%m-%d %H:%M:%S'), case, status[0]] + list(status[1]))
+        _triage_status[case] = status
+    return True
+
+# ========= TRIAGE END =========
+
+# ========= RE-EXTRACT START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+# --reextract reruns the field scan over page text that is already on disk, so a
+# change to FIELD_PATTERNS reaches every case summary and the spreadsheet
+# without OCRing anything. Page text comes from the case's full_text.txt, else
+# from the OCR cache (entries made under any OCR settings, current ones first).
+REEXTRACT_WORKERS = int(os.environ.get('FFCR_REEXTRACT_WORKERS') or os.cpu_count() or 1)
+
+def cached_pdf_pages(path):
+    """Page records of a PDF from the OCR cache, or None unless every page is there."""
+    db = _ocr_cache()
+    if db is None:
+        return None
+    digest = file_sha256(path)
+    with _fitz_lock, fitz.open(path) as doc:
+        page_count = len(doc)
+    current = _engine_signature()
+    with _ocr_cache_lock:
+        # Keys are "<sha256>:<page>:<engine signature>"; ';' sorts right after ':'.
+        rows = db.execute('SELECT key, record FROM pages WHERE key > ? AND key < ? ORDER BY used DESC',
+                          (digest + ':', digest + ';')).fetchall()
+    pages = {}
+    preferred = set()
+    for key, record in rows:
+        _, page, signature = key.split(':', 2)
+        page = int(page)
+        if page in preferred or (page in pages and signature != current):
+            continue
+        pages[page] = json.loads(record)
+        if signature == current:
+            preferred.add(page)
+    if any(page not in pages for page in range(page_count)):
+        return None
+    return [pages[page] for page in range(page_count)]
+
+def stored_case_text(folder_path, pdf_files):
+    """(text, source) of a case without OCR: its full_text.txt, else its PDFs'
+    pages from the OCR cache in full_text.txt layout. (None, reason) if neither
+    has all of it."""
+    fulltext_path = os.path.join(folder_path, 'full_text.txt')
+    if os.path.exists(fulltext_path):
+        with open(fulltext_path, encoding='utf-8', errors='replace') as f:
+            return f.read(), 'full_text.txt'
+    chunks = []
+    for file in pdf_files:
+        records = cached_pdf_pages(os.path.join(folder_path, file))
+        if records is None:
+            return None, f"{file} is not fully in the OCR cache"
+        chunks.append(f"\n--- {file} ---\n")
+        for record in records:
+            text = record['text']
+            chunks.append((text if text.endswith('\f') else text + '\f') + '\n')
+    return ''.join(chunks), 'OCR cache'
+
+def kept_audit_lines(lines):
+    """Audit lines the field scan did not write (page sources, triage notes)."""
+    labels = tuple(f"{label}:" for label in SCAN_LABELS + ['Images Present'])
+    return [line for line in lines if line.strip() and not line.startswith(labels)]
+
+def read_summary(path):
+    """A case_summary.txt as {field: value}; {} if there is none."""
+    fields = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                key, sep, value = line.rstrip('\n').partition(': ')
+                if sep:
+                    fields[key] = value
+    except OSError:
+        pass
+    return fields
+
+def read_rows(path):
+    """A CSV file's rows as dicts; [] if there is none."""
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    except OSError:
+        return []
+
+def backup_file(path):
+    """Copy path to '<path>.<time>.bak' before it is rewritten; returns the copy, or None."""
+    if not os.path.exists(path):
+        return None
+    backup = f"{path}.{time.strftime('%Y%m%d-%H%M%S')}.bak"
+    shutil.copy2(path, backup)
+    return backup
+
+def write_rows_atomic(path, fieldnames, rows):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+def run_reextract(work, tasks):
+    """Yield work(task) for each task, in order, spread over REEXTRACT_WORKERS processes."""
+    if REEXTRACT_WORKERS <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield work(task)
+        return
+    with ProcessPoolExecutor(max_workers=REEXTRACT_WORKERS, initializer=_init_ocr_worker,
+                             initargs=(_ocr_settings(),)) as pool:
+        yield from pool.map(work, tasks, chunksize=4)
+
+# ========= RE-EXTRACT END =========
+
+# ========= WATCH FOLDER START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+
+# A case folder is queued once its files have not changed for this long.
+WATCH_SETTLE_SECONDS = float(os.environ.get('FFCR_WATCH_SETTLE') or 30)
+WATCH_POLL_SECONDS = float(os.environ.get('FFCR_WATCH_POLL') or 5)
+# Files the parsers write into a case folder themselves; they never make a case look changed.
+WATCH_IGNORE = {'case_summary.txt', 'full_text.txt', 'raw_hits_audit.txt', 'desktop.ini'}
+
+def folder_signature(folder_path):
+    """Sorted (relative path, size, mtime) of every input file in a case folder."""
+    entries = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            if file in WATCH_IGNORE:
+                continue
+            full_path = os.path.join(root, file)
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                continue  # vanished mid-scan; the next poll catches up
+            entries.append((os.path.relpath(full_path, folder_path), st.st_size, st.st_mtime_ns))
+    return tuple(sorted(entries))
+
+def _start_change_events(incoming_dir, wake):
+    """Cut the poll wait short on filesystem events when watchdog is installed."""
+    if Observer is None:
+        return None
+    handler = FileSystemEventHandler()
+    handler.on_any_event = lambda event: wake.set()
+    observer = Observer()
+    try:
+        observer.schedule(handler, incoming_dir, recursive=True)
+        observer.start()
+    except Exception:
+        return None  # e.g. a network drive without change notifications
+    return observer
+
+def watch_incoming(process, report=print, incoming_dir=INCOMING_DIR, workers=1):
+    """Feed new or changed case folders under incoming_dir to process(path) until Ctrl+C.
+
+    A folder is queued once its files have been stable for WATCH_SETTLE_SECONDS,
+    and queued again only if its files change after it was processed. Folders
+    that are queued or being processed are not rescanned, so a case is never
+    handled twice at once, however many worker threads drain the queue.
+    Ctrl+C drops the queue and waits for the cases in progress to finish.
+    """
+    work = queue.Queue()
+    lock = threading.Lock()
+    busy = set()
+    done = {}
+
+    def worker():
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            folder, signature = item
+            try:
+                process(os.path.join(incoming_dir, folder))
+            except Exception as e:
+                report(f"[WATCH] {folder} failed: {e}")
+            with lock:
+                done[folder] = signature
+                busy.discard(folder)
+
+    threads = [threading.Thread(target=worker, name=f'ffcr-watch-worker-{n}', daemon=True)
+               for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    wake = threading.Event()
+    observer = _start_change_events(incoming_dir, wake)
+    report(f"[WATCH] Watching {incoming_dir} (settle {WATCH_SETTLE_SECONDS:g}s, "
+           f"poll {WATCH_POLL_SECONDS:g}s, {'filesystem events' if observer else 'polling only'})")
+    seen = {}
+    try:
+        while True:
+            now = time.time()
+            present = {f for f in os.listdir(incoming_dir) if os.path.isdir(os.path.join(incoming_dir, f))}
+            with lock:
+                skip = set(busy)
+            for folder in sorted(present - skip):
+                signature = folder_signature(os.path.join(incoming_dir, folder))
+                if not signature:
+                    continue
+                if folder not in seen or seen[folder][0] != signature:
+                    seen[folder] = (signature, now)
+                    continue
+                with lock:
+                    if now - seen[folder][1] >= WATCH_SETTLE_SECONDS and done.get(folder) != signature:
+                        busy.add(folder)
+                        work.put((folder, signature))
+                        report(f"[WATCH] Queued {folder}")
+            with lock:
+                for folder in set(seen) - present:
+                    del seen[folder]
+                for folder in set(done) - present - busy:
+                    del done[folder]
+            wake.wait(WATCH_POLL_SECONDS)
+            wake.clear()
+    except KeyboardInterrupt:
+        report("[WATCH] Stopping after the cases in progress...")
+    finally:
+        if observer:
+            observer.stop()
+        while True:
+            try:
+                work.get_nowait()
+            except queue.Empty:
+                break
+        for thread in threads:
+            work.put(None)
+        for thread in threads:
+            thread.join()
+
+# ========= WATCH FOLDER END =========
+
+# ========= TEXT INDEX START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+# Cross-case inverted index: term -> (case, file, page, line, position), built
+# from the page text as cases are processed. A case's postings are replaced only
+# when its page text changed. Query it with --search. FFCR_TEXT_INDEX=off disables it.
+TEXT_INDEX_PATH = os.environ.get('FFCR_TEXT_INDEX') or os.path.join(RESULTS_DIR, 'ffcr_text_index.sqlite')
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+QUERY_RE = re.compile(r'"([^"]*)"|(\()|(\))|([^\s()"]+)')
+
+_text_index_db = None
+_text_index_lock = threading.Lock()
+
+def _text_index():
+    global _text_index_db
+    with _text_index_lock:
+        if _text_index_db is None and TEXT_INDEX_PATH.lower() != 'off':
+            os.makedirs(os.path.dirname(os.path.abspath(TEXT_INDEX_PATH)), exist_ok=True)
+            db = sqlite3.connect(TEXT_INDEX_PATH, check_same_thread=False)
+            db.execute('CREATE TABLE IF NOT EXISTS cases (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, '
+                       'fingerprint TEXT NOT NULL, indexed TEXT NOT NULL)')
+            # hits: space-separated "line,position" pairs; positions count tokens through the page.
+            db.execute('CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, case_id INTEGER NOT NULL, '
+                       'file TEXT NOT NULL, page INTEGER NOT NULL, hits TEXT NOT NULL, '
+                       'PRIMARY KEY (term, case_id, file, page)) WITHOUT ROWID')
+            db.execute('CREATE INDEX IF NOT EXISTS postings_case ON postings (case_id)')
+            _text_index_db = db
+        return _text_index_db
+
+def close_text_index():
+    global _text_index_db
+    with _text_index_lock:
+        if _text_index_db is not None:
+            _text_index_db.close()
+            _text_index_db = None
+
+def case_index_entry():
+    """Collects one case's postings as its pages arrive; see index_page()."""
+    return {'digest': hashlib.sha256(), 'postings': {}}
+
+def index_page(entry, file, page, text):
+    entry['digest'].update(f"{file}\0{page}\0{text}\0".encode('utf-8'))
+    postings = entry['postings']
+    position = 0
+    for line_no, line in enumerate(text.splitlines(), 1):
+        for term in TOKEN_RE.findall(line.lower()):
+            postings.setdefault((term, file, page), []).append(f"{line_no},{position}")
+            position += 1
+
+def commit_case_index(case, entry):
+    """Store a case's postings unless its page text is unchanged; returns True if written."""
+    db = _text_index()
+    if db is None:
+        return False
+    fingerprint = entry['digest'].hexdigest()
+    with _text_index_lock:
+        row = db.execute('SELECT id, fingerprint FROM cases WHERE name = ?', (case,)).fetchone()
+        if row is not None and row[1] == fingerprint:
+            return False
+        with db:
+            if row is None:
+                case_id = db.execute('INSERT INTO cases (name, fingerprint, indexed) VALUES (?, ?, ?)',
+                                     (case, fingerprint, time.strftime('%Y-%m-%d %H:%M:%S'))).lastrowid
+            else:
+                case_id = row[0]
+                db.execute('DELETE FROM postings WHERE case_id = ?', (case_id,))
+                db.execute('UPDATE cases SET fingerprint = ?, indexed = ? WHERE id = ?',
+                           (fingerprint, time.strftime('%Y-%m-%d %H:%M:%S'), case_id))
+            db.executemany('INSERT INTO postings (term, case_id, file, page, hits) VALUES (?, ?, ?, ?, ?)',
+                           [(term, case_id, file, page, ' '.join(hits))
+                            for (term, file, page), hits in entry['postings'].items()])
+    return True
+
+def _parse_query(query):
+    """Parse 'thrombin AND "cartilage graft" OR (foam NOT fibrin)' into a tree.
+
+    Terms and "quoted phrases" are leaves ('phrase', [terms]); AND (also
+    implied between neighbours), OR and NOT combine them, NOT binding
+    tightest and OR loosest. Parentheses group.
+    """
+    if query.count('"') % 2:
+        raise ValueError(f"unbalanced quote in {query!r}")
+    tokens = []
+    for phrase, lparen, rparen, word in QUERY_RE.findall(query):
+        if lparen or rparen:
+            tokens.append(lparen or rparen)
+        elif word in ('AND', 'OR', 'NOT'):
+            tokens.append(word)
+        else:
+            terms = TOKEN_RE.findall((phrase or word).lower())
+            if terms:
+                tokens.append(('phrase', terms))
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or():
+        node = parse_and()
+        while peek() == 'OR':
+            take()
+            node = ('or', node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() not in (None, 'OR', ')'):
+            if peek() == 'AND':
+                take()
+            node = ('and', node, parse_not())
+        return node
+
+    def parse_not():
+        if peek() == 'NOT':
+            take()
+            return ('not', parse_not())
+        if peek() == '(':
+            take()
+            node = parse_or()
+            if peek() == ')':
+                take()
+            return node
+        token = take() if peek() is not None else None
+        if not isinstance(token, tuple):
+            raise ValueError(f"unexpected {token or 'end of query'!r} in {query!r}")
+        return token
+
+    if not tokens:
+        raise ValueError(f"empty query: {query!r}")
+    tree = parse_or()
+    if peek() is not None:
+        raise ValueError(f"unexpected {peek()!r} in {query!r}")
+    return tree
+
+def _parse_hits(hits):
+    return [tuple(map(int, hit.split(','))) for hit in hits.split()]
+
+def _phrase_matches(db, terms):
+    """{case_id: [(file, page, line), ...]} where the terms appear consecutively."""
+    rows = {}
+    for term in dict.fromkeys(terms):
+        found = {}
+        for case_id, file, page, hits in db.execute(
+                'SELECT case_id, file, page, hits FROM postings WHERE term = ?', (term,)):
+            found[(case_id, file, page)] = hits
+        rows[term] = found
+    pages = set(rows[terms[0]])
+    for term in terms[1:]:
+        pages &= rows[term].keys()
+    matches = {}
+    for key in sorted(pages):
+        case_id, file, page = key
+        first = _parse_hits(rows[terms[0]][key])
+        later = [{p for _, p in _parse_hits(rows[term][key])} for term in terms[1:]]
+        for line, position in first:
+            if all(position + n + 1 in positions for n, positions in enumerate(later)):
+                matches.setdefault(case_id, []).append((file, page, line))
+    return matches
+
+def _evaluate(db, node, all_cases):
+    kind = node[0]
+    if kind == 'phrase':
+        return _phrase_matches(db, node[1])
+    if kind == 'not':
+        excluded = _evaluate(db, node[1], all_cases)
+        return {case_id: [] for case_id in all_cases if case_id not in excluded}
+    left = _evaluate(db, node[1], all_cases)
+    right = _evaluate(db, node[2], all_cases)
+    if kind == 'and':
+        return {case_id: left[case_id] + right[case_id] for case_id in left if case_id in right}
+    merged = dict(left)
+    for case_id, locations in right.items():
+        merged[case_id] = merged.get(case_id, []) + locations
+    return merged
+
+def search_text_index(query):
+    """[(case, [(file, page, line), ...]), ...] for the cases matching query, by case name.
+
+    Raises ValueError for a malformed query. The index is opened read-only;
+    without one there are no matches.
+    """
+    tree = _parse_query(query)
+    if TEXT_INDEX_PATH.lower() == 'off' or not os.path.exists(TEXT_INDEX_PATH):
+        return []
+    db = sqlite3.connect(f"file:{os.path.abspath(TEXT_INDEX_PATH)}?mode=ro", uri=True)
+    try:
+        names = dict(db.execute('SELECT id, name FROM cases'))
+        matches = _evaluate(db, tree, names)
+    finally:
+        db.close()
+    return sorted((names[case_id], sorted(set(locations))) for case_id, locations in matches.items())
+
+SEARCH_USAGE = ('Terms next to each other must all match; AND, OR, NOT, parentheses and '
+                '"quoted phrases" also work, e.g. thrombin AND "cartilage graft" OR (foam NOT fibrin)')
+
+def print_search(query):
+    """Print the matches for query; returns False for a malformed query, else True."""
+    try:
+        _parse_query(query)
+    except ValueError as e:
+        print(f"Bad query: {e}\n{SEARCH_USAGE}")
+        return False
+    if TEXT_INDEX_PATH.lower() == 'off':
+        print("The text index is turned off (FFCR_TEXT_INDEX=off).")
+        return True
+    if not os.path.exists(TEXT_INDEX_PATH):
+        print(f"No text index at {TEXT_INDEX_PATH} yet; it is built as cases are processed.")
+        return True
+    started = time.perf_counter()
+    results = search_text_index(query)
+    elapsed = (time.perf_counter() - started) * 1000
+    for case, locations in results:
+        print(case)
+        for file, page, line in locations:
+            print(f"    {file}  page {page}  line {line}")
+    print(f"{len(results)} case(s) match {query!r} ({elapsed:.1f} ms)")
+    return True
+
+# ========= TEXT INDEX END =========
+
+def extract_fields(lines, image_files, folder_name, page_audit=()):
+    """lines is any iterable of text lines; a whole text string also works.
+
+    Returns the field values and the case's raw_hits_audit.txt block.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    values, hits = scan_fields(lines)
+    matched_lines = []
+
+    for label, _, _ in FIELD_PATTERNS:
+        matched_lines.append(f"{label}: {hits[label] or 'NOT FOUND'}")
+    for label in ('Foam Mention', 'Audiometry Pre', 'Audiometry Post'):
+        if hits[label]:
+            matched_lines.append(f"{label}: {hits[label]}")
 
     values['Images Present'] = 'Yes' if image_files else 'No'
-    
-    with open(AUDIT_LOG, 'a', encoding='utf-8') as f:
-        f.write(f"--- {folder_name} ---\n")
-        for line in matched_lines:
-            f.write(f"{line}\n")
-        f.write("\n")
 
-    return values
+    audit_block = f"--- {folder_name} ---\n"
+    for line in list(matched_lines) + list(page_audit):
+        audit_block += f"{line}\n"
+    audit_block += "\n"
 
-def process_case_folder(folder_path):
-    folder_name = os.path.basename(folder_path)
-    if already_processed(folder_name):
-        log(f"Skipping already archived case: {folder_name}")
+    return values, audit_block
+
+# ========= RESULT WRITER =========
+# One thread owns SPREADSHEET and AUDIT_LOG; case threads only queue rows for it.
+_result_queue = queue.Queue()
+_result_thread = None
+
+def _result_writer():
+    while True:
+        item = _result_queue.get()
+        if item is None:
+            return
+        entry, journal = item
+        try:
+            with open(AUDIT_LOG, 'a', encoding='utf-8') as f:
+                f.write(entry['audit'])
+            new_sheet = not os.path.exists(SPREADSHEET)
+            with open(SPREADSHEET, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                if new_sheet:
+                    writer.writeheader()
+                writer.writerow(entry['fields'])
+            record_processed(entry['case'], entry['fingerprint'], entry['dst'], extracted=entry.get('extracted'))
+            if journal:
+                os.remove(journal)
+        except Exception as e:
+            log(f"[WRITER ERROR] {e}")
+
+def start_result_writer():
+    global _result_thread
+    _result_thread = threading.Thread(target=_result_writer, name='ffcr-result-writer')
+    _result_thread.start()
+
+def submit_result(entry, journal=None):
+    """Queue a committed case: entry holds case, fingerprint, dst, fields and audit."""
+    _result_queue.put((entry, journal))
+
+def stop_result_writer():
+    global _result_thread
+    if _result_thread is not None:
+        _result_queue.put(None)
+        _result_thread.join()
+        _result_thread = None
+
+# ========= ARCHIVE COMMIT =========
+def _write_json_atomic(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+def _move_dir_atomic(src, dst):
+    """Move src to dst so that dst appears complete or not at all.
+
+    Only a move to another volume (EXDEV) falls back to copy + delete; any other
+    rename failure (a locked file, no permission) is raised untouched. So is a
+    failure to delete the copied source, which leaves the commit unfinished.
+    """
+    try:
+        os.rename(src, dst)  # same volume: a single atomic rename
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    partial = dst + '.partial'
+    if os.path.exists(partial):
+        shutil.rmtree(partial)
+    shutil.copytree(src, partial)
+    os.rename(partial, dst)
+    shutil.rmtree(src)
+
+def _archive_destination(folder_name):
+    today = datetime.today().strftime('%Y-%m-%d')
+    day, n = today, 1
+    # A case whose inputs changed is archived again; keep the earlier run.
+    while os.path.exists(os.path.join(ARCHIVE_ROOT, day, folder_name)):
+        n += 1
+        day = f"{today} ({n})"
+    return os.path.join(ARCHIVE_ROOT, day, folder_name)
+
+def commit_case(folder_name, folder_path, fingerprint, fields, audit_block, extracted=None):
+    """Archive a processed case all-or-nothing, then queue its spreadsheet row.
+
+    A journal in PENDING_DIR holds the row, audit block and fingerprint until
+    the writer has recorded them, so recover_pending_commits() can finish the
+    commit or roll it back after an interruption.
+    """
+    final_path = _archive_destination(folder_name)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.makedirs(PENDING_DIR, exist_ok=True)
+    journal = os.path.join(PENDING_DIR, folder_name + '.json')
+    entry = {'case': folder_name, 'src': folder_path, 'dst': final_path,
+             'fingerprint': fingerprint, 'fields': fields, 'audit': audit_block, 'extracted': extracted}
+    _write_json_atomic(journal, entry)
+    try:
+        _move_dir_atomic(folder_path, final_path)
+    except OSError:
+        if not os.path.exists(final_path):
+            # Nothing was archived: roll back and leave the case in Incoming Cases.
+            shutil.rmtree(final_path + '.partial', ignore_errors=True)
+            os.remove(journal)
+        # Otherwise the archive is complete but the incoming copy is not gone; the
+        # journal stays and recover_pending_commits() finishes the commit next run.
+        raise
+    submit_result(entry, journal)
+
+def recover_pending_commits():
+    """Finish or roll back archive commits that an interrupted run left behind.
+
+    If the archived folder is complete, the leftover incoming copy is removed
+    and the journaled row is written. Otherwise any partial copy is deleted
+    and the case stays in Incoming Cases to be processed again.
+    """
+    if not os.path.isdir(PENDING_DIR):
         return
+    for name in sorted(os.listdir(PENDING_DIR)):
+        journal = os.path.join(PENDING_DIR, name)
+        if not name.endswith('.json'):
+            os.remove(journal)  # a journal write cut short; its move never started
+            continue
+        with open(journal, encoding='utf-8') as f:
+            entry = json.load(f)
+        if os.path.exists(entry['dst']):
+            if os.path.exists(entry['src']):
+                try:
+                    shutil.rmtree(entry['src'])
+                except OSError as e:
+                    log(f"[ARCHIVE WARN] {name[:-5]} is archived but its incoming copy could not be "
+                        f"removed ({e}); will retry next run")
+                    continue
+            submit_result(entry, journal)
+            log(f"Recovered archive commit: {name[:-5]}")
+        else:
+            partial = entry['dst'] + '.partial'
+            if os.path.exists(partial):
+                shutil.rmtree(partial)
+            os.remove(journal)
+            log(f"Rolled back interrupted archive of {name[:-5]}; it will be reprocessed")
 
+def _audit_blocks(path):
+    """({case: its last block in AUDIT_LOG}, [case of every block, in file order]);
+    blocks start with a '--- case ---' line."""
+    blocks = {}
+    order = []
+    case = None
+    if os.path.exists(path):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                header = re.match(r'^--- (.+) ---$', line.rstrip('\n'))
+                if header:
+                    case = header.group(1)
+                    blocks[case] = ''
+                    order.append(case)
+                if case is not None:
+                    blocks[case] += line
+    return blocks, order
+
+def _rows_by_case(rows, order):
+    """({case: its last spreadsheet row}, rows matched to no case). The writer
+    appends one row and one audit block per case, so rows pair with blocks by
+    position; if the counts differ, no row is matched."""
+    rows = [{k: row.get(k) or '' for k in FIELDS} for row in rows]
+    if len(rows) != len(order):
+        log(f"[REEXTRACT WARN] {len(rows)} spreadsheet rows vs {len(order)} audit blocks; "
+            "rows cannot be paired with cases")
+        return {}, rows
+    return dict(zip(order, rows)), []
+
+def reextract_case(task):
+    """Rerun extract_fields over an archived case's stored page text and rewrite
+    its case_summary.txt. Only the PDFs the case was extracted from count
+    (extracted, None for all). Returns (case, fields, audit block), fields None
+    if the text is not on disk, and a note."""
+    folder_name, path, page_audit, extracted = task
+    if not os.path.isdir(path):
+        return folder_name, None, None, f"skipped, {path} is missing"
+    image_files = []
+    pdf_files = []
+    for file in os.listdir(path):
+        if file.lower().endswith('.pdf'):
+            pdf_files.append(file)
+        elif file.lower().endswith(('.jpg', '.jpeg', '.png')):
+            image_files.append(file)
+    if extracted is not None:
+        pdf_files = [file for file in extracted if file in pdf_files]
+    text, source = stored_case_text(path, pdf_files)
+    if text is None:
+        return folder_name, None, None, f"skipped, {source}"
+    fields, audit_block = extract_fields(text, image_files, folder_name, page_audit)
+    with open(os.path.join(path, 'case_summary.txt'), 'w', encoding='utf-8') as f:
+        for k, v in fields.items():
+            f.write(f"{k}: {v}\n")
+    return folder_name, fields, audit_block, f"from {source}"
+
+def reextract_archive():
+    """--reextract: every case in the processed index, then SPREADSHEET and
+    AUDIT_LOG rewritten in processing order. Cases whose page text is not on
+    disk keep their archived summary (else their old row) and their last audit
+    block; cases in the old files but not in the index are carried over first,
+    as are rows that cannot be paired with a case, unless they equal the
+    archived summary of a case being re-extracted. Both files are backed up
+    before they are rewritten."""
+    started = time.perf_counter()
+    cases = processed_cases()
+    archived = {folder: path for folder, path, _ in cases}
+    old_blocks, order = _audit_blocks(AUDIT_LOG)
+    old_rows, unmatched = _rows_by_case(read_rows(SPREADSHEET), order)
+    tasks = [(folder, path, kept_audit_lines(old_blocks.get(folder, '').splitlines()[1:]), extracted)
+             for folder, path, extracted in cases]
+    rows = []
+    blocks = []
+    if unmatched:
+        # Summaries are read before re-extraction rewrites them.
+        previous = set()
+        for path in archived.values():
+            summary = read_summary(os.path.join(path, 'case_summary.txt'))
+            previous.add(tuple(summary.get(k, '') for k in FIELDS))
+        rows = [row for row in unmatched if tuple(row.values()) not in previous]
+        log(f"[REEXTRACT WARN] {len(rows)} unpaired row(s) carried over unchanged")
+    for folder in dict.fromkeys(order):
+        if folder not in archived:
+            if folder in old_rows:
+                rows.append(old_rows[folder])
+            blocks.append(old_blocks[folder])
+    carried = len(blocks)
+    done = 0
+    for folder, fields, audit_block, note in run_reextract(reextract_case, tasks):
+        log(f"Re-extract {folder}: {note}")
+        if fields is None:
+            fields = (read_summary(os.path.join(archived[folder], 'case_summary.txt'))
+                      or old_rows.get(folder))
+            audit_block = old_blocks.get(folder)
+        else:
+            done += 1
+        if fields:
+            rows.append({k: fields.get(k, '') for k in FIELDS})
+        if audit_block:
+            blocks.append(audit_block)
     os.makedirs(RESULTS_DIR, exist_ok=True)
-    os.makedirs(ARCHIVE_ROOT, exist_ok=True)
+    for path in (SPREADSHEET, AUDIT_LOG):
+        backup = backup_file(path)
+        if backup:
+            log(f"Previous {os.path.basename(path)} saved as {backup}")
+    write_rows_atomic(SPREADSHEET, FIELDS, rows)
+    with open(AUDIT_LOG + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(''.join(blocks))
+    os.replace(AUDIT_LOG + '.tmp', AUDIT_LOG)
+    log(f"Re-extracted {done} of {len(cases)} archived cases in {time.perf_counter() - started:.1f}s; "
+        f"{carried} case(s) not in the processed index carried over")
 
-    backup_to_vault(folder_name, folder_path)
+def process_case_folder(folder_path):
+    folder_name = os.path.basename(folder_path)
+    if os.path.exists(os.path.join(PENDING_DIR, folder_name + '.json')):
+        # Already archived; only the leftover incoming copy is waiting to be removed.
+        log(f"Skipping {folder_name}: archive commit pending (see recover_pending_commits)")
+        return
+    files = hash_case_files(folder_path)
+    fingerprint = case_fingerprint(files)
+    if already_processed(folder_name, fingerprint):
+        log(f"Skipping already archived case: {folder_name}")
+        return
+    previous = processed_entry(folder_name)
+    if previous is not None:
+        log(f"Inputs of {folder_name} changed since {previous[1]}; reprocessing")
 
-    full_text = ''
     image_files = []
+    pdf_files = []
+    page_audit = []
+    index_entry = case_index_entry()
     for file in os.listdir(folder_path):
-        full_path = os.path.join(folder_path, file)
         if file.lower().endswith('.pdf'):
-            full_text += f"\n--- {file} ---\n" + ocr_pdf(full_path)
+            pdf_files.append(file)
         elif file.lower().endswith(('.jpg', '.jpeg', '.png')):
             image_files.append(file)
 
-    fields = extract_fields(full_text, image_files, folder_name)
+    pdf_paths = [os.path.join(folder_path, file) for file in pdf_files]
+    if TRIAGE:
+        # Deferred cases stay in Incoming, unarchived and out of the processed index.
+        header_fields, pdf_paths, triage_audit, deferred = triage_case(pdf_paths)
+        if record_deferred(folder_name, header_fields, deferred) and deferred:
+            log(f"Deferred {folder_name} after header triage: {deferred}")
+        if deferred:
+            return
+        page_audit.extend(triage_audit)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    os.makedirs(ARCHIVE_ROOT, exist_ok=True)
+
+    backup_to_vault(folder_name, folder_path, files)
+
+    # Pages stream into the field scan as they are extracted; no case-sized string.
+    chunks = iter_case_text(pdf_paths, page_audit,
+                            lambda file, page, text: index_page(index_entry, file, page, text))
+    fields, audit_block = extract_fields(iter_lines(chunks), image_files, folder_name, page_audit)
+    commit_case_index(folder_name, index_entry)
 
     with open(os.path.join(folder_path, 'case_summary.txt'), 'w', encoding='utf-8') as f:
         for k, v in fields.items():
             f.write(f"{k}: {v}\n")
 
-    if not os.path.exists(SPREADSHEET):
-        with open(SPREADSHEET, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=FIELDS)
-            writer.writeheader()
-
-    with open(SPREADSHEET, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDS)
-        writer.writerow(fields)
-
-    today = datetime.today().strftime('%Y-%m-%d')
-    archive_path = os.path.join(ARCHIVE_ROOT, today)
-    os.makedirs(archive_path, exist_ok=True)
-    shutil.move(folder_path, os.path.join(archive_path, folder_name))
+    # Re-extraction rebuilds the text from these PDFs only; triage may have skipped others.
+    extracted = [os.path.basename(path) for path in pdf_paths] if TRIAGE else None
+    commit_case(folder_name, folder_path, fingerprint, fields, audit_block, extracted)
     log(f"Processed and archived case: {folder_name}")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FFCR v8.7 H: drive OCR parser')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and process case folders as they arrive in INCOMING_DIR')
+    parser.add_argument('--restore', nargs=2, metavar=('CASE', 'DEST'),
+                        help='rebuild CASE from the VAULT into DEST and exit')
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help='rebuild the processed-case index from ARCHIVE_ROOT and exit')
+    parser.add_argument('--search', metavar='QUERY',
+                        help='search the text index, e.g. \'thrombin AND "cartilage graft"\', and exit')
+    parser.add_argument('--reextract', action='store_true',
+                        help='rerun field extraction for archived cases over their cached page text '
+                             '(no OCR), rewrite the spreadsheet and audit log, and exit')
+    args = parser.parse_args()
+
+    if args.search:
+        raise SystemExit(0 if print_search(args.search) else 2)
+
+    if args.restore:
+        restore_from_vault(*args.restore)
+        raise SystemExit(0)
+    if args.rebuild_index:
+        print(f"Indexed {rebuild_processed_index()} archived cases in {PROCESSED_INDEX}")
+        close_processed_index()
+        raise SystemExit(0)
+    if args.reextract:
+        if not os.path.exists(PROCESSED_INDEX) and os.path.isdir(ARCHIVE_ROOT):
+            log(f"Built processed-case index from the archive: {rebuild_processed_index()} cases")
+        try:
+            # Finish interrupted commits first so their rows are in the rewritten files.
+            start_result_writer()
+            try:
+                recover_pending_commits()
+            finally:
+                stop_result_writer()
+            reextract_archive()
+        finally:
+            close_processed_index()
+            close_ocr_cache()
+        raise SystemExit(0)
+
     log("FFCR v8.5c started")
-    for folder in os.listdir(INCOMING_DIR):
-        folder_path = os.path.join(INCOMING_DIR, folder)
-        if os.path.isdir(folder_path):
-            process_case_folder(folder_path)
+    log(ocr_backend_note())
+    if not os.path.exists(PROCESSED_INDEX) and os.path.isdir(ARCHIVE_ROOT):
+        log(f"Built processed-case index from the archive: {rebuild_processed_index()} cases")
+    try:
+        start_ocr_engine()
+        start_result_writer()
+        recover_pending_commits()
+        if args.watch:
+            watch_incoming(process_case_folder, report=log, workers=CASE_WORKERS)
+        else:
+            cases = ThreadPoolExecutor(max_workers=CASE_WORKERS)
+            try:
+                running = []
+                for folder in os.listdir(INCOMING_DIR):
+                    folder_path = os.path.join(INCOMING_DIR, folder)
+                    if os.path.isdir(folder_path):
+                        running.append((folder, cases.submit(process_case_folder, folder_path)))
+                for folder, future in running:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        log(f"[ERROR] {folder}: {e}")
+            finally:
+                # On Ctrl+C, cases not yet started stay in Incoming Cases for the next run.
+                cases.shutdown(cancel_futures=True)
+    finally:
+        stop_result_writer()
+        close_processed_index()
+        close_text_index()
+        shutdown_ocr_pool()
+        close_ocr_cache()
+    log(ocr_cache_summary())
     log("FFCR v8.5c completed")
 
-# --- FFCR v8.6d Enhancements: Logging + Print ---
-try:
-    log_path = r"H:\Shared drives\FFCR\Processed Results\ffcr_processing_log.txt"
-    with open(log_path, 'a') as log:
-        log.write("[INFO] Log path active.\n")
-    print(f"[LOG] Written to: {log_path}")
-except Exception as e:
-    fallback_path = r"C:\FFCR_Fallback\ffcr_processing_log.txt"
-    os.makedirs(os.path.dirname(fallback_path), exist_ok=True)
-    with open(fallback_path, 'a') as log:
-        log.write(f"[FALLBACK LOG] {str(e)}\n")
-    print(f"[FALLBACK] Log written to: {fallback_path}")
+    # --- FFCR v8.6d Enhancements: Logging + Print ---
+    # Kept under the main guard so spawned OCR workers do not re-run it on import.
+    try:
+        log_path = r"H:\Shared drives\FFCR\Processed Results\ffcr_processing_log.txt"
+        with open(log_path, 'a') as log:
+            log.write("[INFO] Log path active.\n")
+        print(f"[LOG] Written to: {log_path}")
+    except Exception as e:
+        fallback_path = r"C:\FFCR_Fallback\ffcr_processing_log.txt"
+        os.makedirs(os.path.dirname(fallback_path), exist_ok=True)
+        with open(fallback_path, 'a') as log:
+            log.write(f"[FALLBACK LOG] {str(e)}\n")
+        print(f"[FALLBACK] Log written to: {fallback_path}")
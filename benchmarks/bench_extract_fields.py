@@ -0,0 +1,118 @@
+"""Benchmark the single-pass extract_fields() against the original per-field scan.
+
+Generates a synthetic OCR corpus (full_text.txt-shaped cases, some with
+fields missing), runs both extractors over every case, checks that the
+rendered case_summary.txt and raw_hits_audit.txt are byte-identical, and
+reports throughput.
+
+    python benchmarks/bench_extract_fields.py [--cases 300] [--pages 20]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import run_ffcr_local as ffcr  # noqa: E402
+from synthetic_fixtures import case_full_text  # noqa: E402
+
+
+def legacy_extract_fields(text, image_files):
+    """extract_fields() as it was before the single-pass scan, kept verbatim."""
+    lines = text.splitlines()
+    audit_log = {}
+    def find(pattern, label, flags=0):
+        for line in lines:
+            if re.search(pattern, line, flags):
+                audit_log[label] = line.strip()
+                match = re.search(pattern, line, flags)
+                return match.group(1).strip() if match else ''
+        audit_log[label] = ''
+        return ''
+
+    mrn = find(r'MRN[:\s]*?(\d{6,})', 'MRN')
+    dob = find(r'DOB[:\s]*?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 'DOB')
+    procedure_date = find(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 'Procedure Date')
+    side = find(r'\b(left|right|bilateral)\b', 'Side', re.IGNORECASE)
+    pre_dx = find(r'Pre[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', 'Pre-op Diagnosis', re.IGNORECASE)
+    post_dx = find(r'Post[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', 'Post-op Diagnosis', re.IGNORECASE)
+    perforation_size = find(r'\b(small|medium|large)\b(?=.*perforation)', 'Perforation Size', re.IGNORECASE)
+
+    foam_line = ''
+    for line in lines:
+        if 'fibrin' in line.lower() or 'foam' in line.lower():
+            foam_line = line.strip()
+            audit_log['Foam Mention'] = foam_line
+            break
+    if not foam_line:
+        audit_log['Foam Mention'] = ''
+
+    pre_audio = ''
+    post_audio = ''
+    for line in lines:
+        if '500' in line and 'dB' in line:
+            if not pre_audio:
+                pre_audio = line.strip()
+            elif not post_audio:
+                post_audio = line.strip()
+    audit_log['Audiometry Pre'] = pre_audio
+    audit_log['Audiometry Post'] = post_audio
+
+    image_presence = 'Yes' if image_files else 'No'
+    audit_log['Images Present'] = ', '.join(image_files) if image_files else ''
+
+    return {
+        'MRN': mrn,
+        'DOB': dob,
+        'Procedure Date': procedure_date,
+        'Side': side,
+        'Pre-op Diagnosis': pre_dx,
+        'Post-op Diagnosis': post_dx,
+        'Audiometry Pre': pre_audio,
+        'Audiometry Post': post_audio,
+        'Perforation Size': perforation_size,
+        'Foam Mention': foam_line,
+        'Images Present': image_presence
+    }, audit_log
+
+
+def render(fields, audit):
+    """case_summary.txt + raw_hits_audit.txt exactly as process_case_folder writes them."""
+    summary = ''.join(f"{k}: {v}\n" for k, v in fields.items())
+    return summary, ''.join(f"{k}: {v}\n" for k, v in audit.items())
+
+
+def run(extract, corpus):
+    start = time.perf_counter()
+    out = [render(*extract(text, images)) for text, images in corpus]
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', type=int, default=300)
+    parser.add_argument('--pages', type=int, default=20, help='pages per PDF (2 PDFs per case)')
+    args = parser.parse_args()
+
+    corpus = [(case_full_text(pages=args.pages, seed=i), ['photo1.jpg'] if i % 3 else [])
+              for i in range(args.cases)]
+    megabytes = sum(len(text) for text, _ in corpus) / 2**20
+    print(f"{args.cases} cases, {megabytes:.1f} MB of OCR text")
+
+    legacy_s, legacy_out = run(legacy_extract_fields, corpus)
+    new_s, new_out = run(ffcr.extract_fields, corpus)
+    print(f"{'extractor':>12} {'seconds':>9} {'MB/s':>8}")
+    print(f"{'legacy':>12} {legacy_s:>9.3f} {megabytes / legacy_s:>8.1f}")
+    print(f"{'single-pass':>12} {new_s:>9.3f} {megabytes / new_s:>8.1f}   {legacy_s / new_s:.1f}x")
+
+    differing = sum(1 for old, new in zip(legacy_out, new_out) if old != new)
+    print(f"case_summary/audit identical: {len(corpus) - differing}/{len(corpus)}")
+    if differing:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
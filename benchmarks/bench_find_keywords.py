@@ -0,0 +1,91 @@
+"""Benchmark the one-pass keyword scan against the original find_keywords().
+
+Builds a multi-megabyte synthetic OCR text, runs the original per-keyword
+scan and the new scanner (regex fallback, plus the Aho-Corasick automaton
+when pyahocorasick is installed) with the Fibrin tool's KEYWORDS and with a
+longer keyword list, checks that the hit lists are identical, and reports
+throughput.
+
+    python benchmarks/bench_find_keywords.py [--cases 150] [--pages 20] [--extra 40]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_fixtures import FILLER, case_full_text  # noqa: E402
+
+spec = importlib.util.spec_from_file_location(
+    'fibrin_review', os.path.join(ROOT, 'Fibrin Tool 8.3', 'fibrin_review_chunked_v8_3.py'))
+fibrin = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fibrin)
+
+
+def legacy_find_keywords(text, keywords):
+    """find_keywords() as it was before the one-pass scan, kept verbatim."""
+    hits = []
+    for kw in keywords:
+        if kw.lower() in text.lower():
+            lines = [line.strip() for line in text.splitlines() if kw.lower() in line.lower()]
+            hits.extend(lines)
+    return hits if hits else ["None found"]
+
+
+def extra_keywords(n):
+    """Words from the synthetic filler text, so a longer list still has hits."""
+    words = sorted({w.strip('.,').lower() for line in FILLER for w in line.split() if len(w) > 5})
+    return words[:n]
+
+
+def timed(find, text, keywords):
+    start = time.perf_counter()
+    out = find(text, keywords)
+    return time.perf_counter() - start, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', type=int, default=150, help='synthetic cases concatenated into one text')
+    parser.add_argument('--pages', type=int, default=20, help='pages per PDF (2 PDFs per case)')
+    parser.add_argument('--extra', type=int, default=40, help='size of the longer keyword list')
+    args = parser.parse_args()
+
+    text = ''.join(case_full_text(pages=args.pages, seed=i) for i in range(args.cases))
+    megabytes = len(text) / 2**20
+    print(f"{megabytes:.1f} MB of OCR text, {text.count(chr(10))} lines")
+
+    scanners = [('regex', None)]
+    if fibrin.ahocorasick is not None:
+        scanners.append(('aho-corasick', fibrin.ahocorasick))
+    else:
+        print("pyahocorasick not installed; timing the regex scanner only")
+
+    failed = False
+    extra = extra_keywords(args.extra)
+    for label, keywords in (('KEYWORDS', fibrin.KEYWORDS),
+                            (f'KEYWORDS + {len(extra)} filler words', fibrin.KEYWORDS + extra)):
+        legacy_s, legacy_out = timed(legacy_find_keywords, text, keywords)
+        print(f"\n{label} ({len(keywords)} keywords)")
+        print(f"{'scanner':>14} {'seconds':>9} {'MB/s':>8}")
+        print(f"{'legacy':>14} {legacy_s:>9.3f} {megabytes / legacy_s:>8.1f}")
+        for name, module in scanners:
+            fibrin.ahocorasick = module
+            new_s, new_out = timed(fibrin.find_keywords, text, keywords)
+            same = new_out == legacy_out
+            failed |= not same
+            print(f"{name:>14} {new_s:>9.3f} {megabytes / new_s:>8.1f}   {legacy_s / new_s:.1f}x"
+                  f"   {'identical' if same else 'DIFFERENT'} ({len(new_out)} hits)")
+            hits_s, _ = timed(fibrin.keyword_hits, [(None, None, text)], keywords)
+            print(f"{'+ context':>14} {hits_s:>9.3f} {megabytes / hits_s:>8.1f}   keyword_hits(): page, line, context")
+        fibrin.ahocorasick = scanners[-1][1]
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
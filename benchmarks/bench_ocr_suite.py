@@ -0,0 +1,255 @@
+"""OCR throughput suite: synthetic fixtures x extraction variants, saved as JSON.
+
+Generates deterministic op-report PDFs (text-layer, image-only scans at
+several DPIs, and mixed), then runs every extraction variant over every
+fixture, each in a fresh process, and records:
+  - pages/s and wall time for page extraction
+  - per-page latency of each stage: render, OCR, other (PDF open, text
+    layer, bookkeeping) and extract_fields
+  - peak RSS of the process
+  - field agreement: extract_fields() on the extracted text vs on the text
+    the fixture was generated from
+  - mean Tesseract word confidence, for the adaptive variants
+
+    python benchmarks/bench_ocr_suite.py [--variants hybrid ocr fibrin-8.3] [--fixtures digital-5 scan200-5]
+                                         [--out results.json] [--compare previous.json]
+
+Variants run with one OCR worker so every stage is timed in-process; see
+bench_ocr_workers.py for pool scaling. The OCR page cache is off.
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import run_ffcr_local as ffcr  # noqa: E402
+from synthetic_fixtures import (make_digital_pdf, make_mixed_pdf,  # noqa: E402
+                                make_scanned_pdf, op_report_pages)
+
+# name -> (builder, pages, scan dpi)
+FIXTURES = {
+    'digital-5': (make_digital_pdf, 5, None),
+    'digital-30': (make_digital_pdf, 30, None),
+    'scan150-5': (make_scanned_pdf, 5, 150),
+    'scan200-5': (make_scanned_pdf, 5, 200),
+    'scan300-5': (make_scanned_pdf, 5, 300),
+    'scan200-20': (make_scanned_pdf, 20, 200),
+    'mixed-10': (make_mixed_pdf, 10, 200),
+    'skewed200-5': (make_scanned_pdf, 5, 200),
+}
+# Extra builder arguments: tilted scans with a shaded lower half, for FFCR_OCR_PREPROCESS.
+FIXTURE_OPTIONS = {
+    'skewed200-5': {'skew': 2.0, 'shade': 0.3},
+}
+
+# name -> run_ffcr_local settings; 'fibrin-8.3' is the Fibrin reviewer's text-layer-only read.
+VARIANTS = {
+    'hybrid': {'OCR_MODE': 'hybrid'},
+    'ocr': {'OCR_MODE': 'ocr'},
+    'ocr-rgb-pil': {'OCR_MODE': 'ocr', 'OCR_FAST_RENDER': False},
+    'adaptive': {'OCR_MODE': 'ocr', 'OCR_ADAPTIVE': True},
+    'preprocess': {'OCR_MODE': 'ocr', 'OCR_PREPROCESS': True},
+    'adaptive-preprocess': {'OCR_MODE': 'ocr', 'OCR_ADAPTIVE': True, 'OCR_PREPROCESS': True},
+    'tesserocr': {'OCR_MODE': 'ocr', 'OCR_BACKEND': 'tesserocr'},
+    'fibrin-8.3': None,
+}
+DEFAULT_VARIANTS = ['hybrid', 'ocr', 'fibrin-8.3']
+# Stage each timed function is billed to.
+RENDER_FUNCS = ['_render', '_render_pgm']
+OCR_FUNCS = ['_tesseract_stdin', '_api_recognize']
+PYTESSERACT_FUNCS = ['image_to_string', 'image_to_data']
+
+
+def load_fibrin_reviewer():
+    spec = importlib.util.spec_from_file_location(
+        'fibrin_review', os.path.join(ROOT, 'Fibrin Tool 8.3', 'fibrin_review_chunked_v8_3.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil  # Windows: peak working set
+        return round(psutil.Process().memory_info().peak_wset / 2**20, 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def _timed(module, name, stage, clock):
+    func = getattr(module, name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            clock[stage] += time.perf_counter() - start
+    setattr(module, name, wrapper)
+
+
+def field_agreement(fields, truth):
+    keys = [k for k in truth if k != 'Images Present']
+    wrong = [k for k in keys if fields.get(k) != truth[k]]
+    return round(1 - len(wrong) / len(keys), 3), wrong
+
+
+def run_one(path, pages, seed, variant, out):
+    """Child process: extract one fixture with one variant and put the result on out."""
+    clock = {'render': 0.0, 'ocr': 0.0}
+    truth, _ = ffcr.extract_fields('\n'.join(op_report_pages(pages, seed)), [])
+    start = time.perf_counter()
+    if VARIANTS[variant] is None:
+        text = load_fibrin_reviewer().extract_text_from_pdf(path)
+        sources = {}
+        confs = []
+    else:
+        settings = dict(VARIANTS[variant], OCR_WORKERS=1, OCR_CACHE_PATH='off')
+        for name, value in settings.items():
+            setattr(ffcr, name, value)
+        if settings.get('OCR_BACKEND') == 'tesserocr' and ffcr.ocr_backend() != 'tesserocr':
+            out.put({'skipped': 'tesserocr not installed'})
+            return
+        if settings.get('OCR_PREPROCESS') and ffcr.np is None:
+            out.put({'skipped': 'numpy not installed'})
+            return
+        for name in RENDER_FUNCS:
+            _timed(ffcr, name, 'render', clock)
+        for name in OCR_FUNCS:
+            _timed(ffcr, name, 'ocr', clock)
+        for name in PYTESSERACT_FUNCS:
+            _timed(ffcr.pytesseract, name, 'ocr', clock)
+        start = time.perf_counter()
+        records = ffcr.extract_pdf_pages([path])[0]
+        text = ffcr.pages_to_text(records)
+        sources = {}
+        for record in records:
+            sources[record['source']] = sources.get(record['source'], 0) + 1
+        confs = [record['conf'] for record in records if 'conf' in record]
+    extract_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fields, _ = ffcr.extract_fields(text, [])
+    fields_s = time.perf_counter() - start
+    agreement, wrong = field_agreement(fields, truth)
+    per_page = 1000 / pages
+    out.put({
+        'seconds': round(extract_s, 4),
+        'pages_per_s': round(pages / extract_s, 2),
+        'stage_ms_per_page': {
+            'render': round(clock['render'] * per_page, 2),
+            'ocr': round(clock['ocr'] * per_page, 2),
+            'other': round((extract_s - clock['render'] - clock['ocr']) * per_page, 2),
+            'fields': round(fields_s * per_page, 3),
+        },
+        'page_sources': sources,
+        'peak_rss_mb': peak_rss_mb(),
+        'field_agreement': agreement,
+        'fields_wrong': wrong,
+        'mean_conf': round(sum(confs) / len(confs), 1) if confs else None,
+    })
+
+
+def run_isolated(path, pages, seed, variant):
+    ctx = multiprocessing.get_context('spawn')
+    out = ctx.Queue()
+    proc = ctx.Process(target=run_one, args=(path, pages, seed, variant, out))
+    proc.start()
+    try:
+        result = out.get()
+    except KeyboardInterrupt:
+        proc.terminate()
+        raise
+    proc.join()
+    return result
+
+
+def metadata():
+    meta = {'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'when': time.strftime('%Y-%m-%d %H:%M:%S')}
+    try:
+        meta['commit'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                        capture_output=True, text=True).stdout.strip()
+    except OSError:
+        pass
+    try:
+        meta['tesseract'] = str(ffcr.pytesseract.get_tesseract_version())
+    except Exception:
+        meta['tesseract'] = None
+    return meta
+
+
+def compare(results, previous_path):
+    with open(previous_path, encoding='utf-8') as f:
+        previous = {(r['fixture'], r['variant']): r for r in json.load(f)['results'] if 'seconds' in r}
+    print(f"\nvs {previous_path}")
+    print(f"{'fixture':>12} {'variant':>19} {'pages/s':>18} {'agreement':>14}")
+    for r in results:
+        old = previous.get((r['fixture'], r['variant']))
+        if old is None or 'seconds' not in r:
+            continue
+        print(f"{r['fixture']:>12} {r['variant']:>19} "
+              f"{old['pages_per_s']:>8.2f} -> {r['pages_per_s']:<7.2f} "
+              f"{old['field_agreement']:>5.2f} -> {r['field_agreement']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', nargs='+', default=list(FIXTURES), choices=list(FIXTURES))
+    parser.add_argument('--variants', nargs='+', default=DEFAULT_VARIANTS, choices=list(VARIANTS))
+    parser.add_argument('--out', help='JSON results file (default benchmarks/results/ocr_suite-<time>.json)')
+    parser.add_argument('--compare', metavar='JSON', help='print the change against an earlier results file')
+    args = parser.parse_args()
+    out_path = args.out or os.path.join(ROOT, 'benchmarks', 'results',
+                                        f"ocr_suite-{time.strftime('%Y%m%d-%H%M%S')}.json")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'fixture':>12} {'variant':>19} {'pages/s':>8} {'render':>8} {'ocr':>8} {'other':>8} "
+              f"{'fields':>7} {'RSS MB':>7} {'agree':>6} {'conf':>5}   (stage times in ms/page)")
+        for seed, name in enumerate(args.fixtures):
+            build, pages, scan_dpi = FIXTURES[name]
+            path = os.path.join(tmp, f'{name}.pdf')
+            if scan_dpi is None:
+                build(path, pages=pages, seed=seed)
+            else:
+                build(path, pages=pages, seed=seed, scan_dpi=scan_dpi, **FIXTURE_OPTIONS.get(name, {}))
+            for variant in args.variants:
+                result = dict(fixture=name, pages=pages, scan_dpi=scan_dpi, variant=variant,
+                              **run_isolated(path, pages, seed, variant))
+                results.append(result)
+                if 'skipped' in result:
+                    print(f"{name:>12} {variant:>19}   skipped: {result['skipped']}")
+                    continue
+                stage = result['stage_ms_per_page']
+                print(f"{name:>12} {variant:>19} {result['pages_per_s']:>8.2f} {stage['render']:>8.1f} "
+                      f"{stage['ocr']:>8.1f} {stage['other']:>8.1f} {stage['fields']:>7.2f} "
+                      f"{result['peak_rss_mb'] or 0:>7.1f} {result['field_agreement']:>6.2f} "
+                      f"{result['mean_conf'] if result['mean_conf'] is not None else '-':>5}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': metadata(), 'results': results}, f, indent=1)
+    print(f"\nSaved {out_path}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark ocr_pdfs() in run_ffcr_local.py at 1/2/4/8 OCR workers.
+
+Builds a synthetic scanned case (several image-only PDFs), OCRs it once per
+worker count and checks every run returns exactly the single-worker text.
+The OCR page cache is off, so every run does its own OCR.
+
+    python benchmarks/bench_ocr_workers.py [--pages 40] [--pdfs 3] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import run_ffcr_local as ffcr  # noqa: E402
+from synthetic_fixtures import make_scanned_pdf  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=40, help='pages per PDF')
+    parser.add_argument('--pdfs', type=int, default=3, help='PDFs per case')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    # Otherwise every run after the first is served from the cache (and the
+    # benchmark would fill the user's real one).
+    ffcr.OCR_CACHE_PATH = 'off'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [make_scanned_pdf(os.path.join(tmp, f'op_{i}.pdf'), pages=args.pages, seed=i)
+                 for i in range(args.pdfs)]
+        total_pages = args.pages * args.pdfs
+        print(f"{args.pdfs} PDFs x {args.pages} pages = {total_pages} pages")
+        print(f"{'workers':>8} {'seconds':>9} {'pages/s':>8} {'speedup':>8}  output")
+
+        baseline = None
+        base_time = None
+        for workers in args.workers:
+            ffcr.OCR_WORKERS = workers
+            try:
+                if ffcr.get_ocr_pool():
+                    # Warm the pool so process start-up is not billed to OCR.
+                    list(ffcr.get_ocr_pool().map(abs, range(workers)))
+                start = time.perf_counter()
+                texts = ffcr.ocr_pdfs(paths)
+                elapsed = time.perf_counter() - start
+            finally:
+                ffcr.shutdown_ocr_pool()
+            if baseline is None:
+                baseline, base_time = texts, elapsed
+            same = 'identical' if texts == baseline else 'DIFFERS'
+            print(f"{workers:>8} {elapsed:>9.2f} {total_pages / elapsed:>8.2f} "
+                  f"{base_time / elapsed:>7.2f}x  {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Benchmark the gray OCR render paths against the old RGB -> PIL -> pytesseract path.
+
+The gray paths pipe PGM to `tesseract stdin` and, when tesserocr is installed,
+hand the samples to an in-process engine.
+
+For every page of a synthetic scanned PDF this measures, per path:
+  - render + hand-off time
+  - peak RSS growth while handing off every page, in a fresh process per path
+    so MuPDF and PIL buffers count too (elsewhere than Linux, growth over the
+    process's earlier peak, which can hide small buffers)
+  - full render + OCR time per page
+and reports how closely each path's OCR text agrees with the old path.
+
+    python benchmarks/bench_render_path.py [--pages 10] [--dpi 300]
+"""
+
+import argparse
+import difflib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # noqa: E402
+import pytesseract  # noqa: E402
+
+import run_ffcr_local as ffcr  # noqa: E402
+from bench_ocr_suite import peak_rss_mb  # noqa: E402
+from synthetic_fixtures import make_scanned_pdf  # noqa: E402
+
+
+def legacy_handoff(page, dpi):
+    return ffcr._render(page, dpi)
+
+
+def legacy_ocr(page, dpi):
+    return pytesseract.image_to_string(ffcr._render(page, dpi))
+
+
+def gray_handoff(page, dpi):
+    return ffcr._render_pgm(page, dpi)
+
+
+def gray_ocr(page, dpi):
+    return ffcr._tesseract_stdin(ffcr._render_pgm(page, dpi), dpi)
+
+
+def api_ocr(page, dpi):
+    return ffcr._api_recognize(page, dpi).GetUTF8Text()
+
+
+PATHS = [
+    ('rgb+PIL+tempfile', legacy_handoff, legacy_ocr),
+    ('gray+stdin', gray_handoff, gray_ocr),
+]
+if ffcr.tesserocr is not None:
+    # Same gray render; the engine stays loaded between pages.
+    PATHS.append(('gray+tesserocr', gray_handoff, api_ocr))
+
+
+def _proc_status_mb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 2**10
+    raise OSError(f"no {field} in /proc/self/status")
+
+
+def handoff_rss(path, dpi, index, out):
+    """Child process: hand off every page with PATHS[index]; puts the peak RSS growth in MB on out."""
+    handoff = PATHS[index][1]
+    with fitz.open(path) as doc:
+        try:
+            # Linux: restart the high-water mark here, so the imports' peak cannot hide the pages'.
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            before, peak = _proc_status_mb('VmRSS'), lambda: _proc_status_mb('VmHWM')
+        except OSError:
+            before, peak = peak_rss_mb(), peak_rss_mb
+        for page in doc:
+            buf = handoff(page, dpi)
+            del buf
+        after = peak()
+    out.put(None if before is None else round(after - before, 1))
+
+
+def measure_rss(path, dpi, index):
+    ctx = multiprocessing.get_context('spawn')
+    out = ctx.Queue()
+    proc = ctx.Process(target=handoff_rss, args=(path, dpi, index, out))
+    proc.start()
+    try:
+        grown = out.get()
+    except KeyboardInterrupt:
+        proc.terminate()
+        raise
+    proc.join()
+    return grown
+
+
+def measure(doc, dpi, handoff, ocr):
+    start = time.perf_counter()
+    for page in doc:
+        buf = handoff(page, dpi)
+        del buf
+    render_s = time.perf_counter() - start
+
+    texts = []
+    start = time.perf_counter()
+    for page in doc:
+        texts.append(ocr(page, dpi))
+    ocr_s = time.perf_counter() - start
+    return render_s, ocr_s, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--dpi', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_scanned_pdf(os.path.join(tmp, 'scan.pdf'), pages=args.pages)
+        with fitz.open(path) as doc:
+            print(f"{args.pages} scanned pages at {args.dpi} dpi")
+            print(f"{'path':>18} {'handoff ms/pg':>14} {'peak RSS +MB':>13} {'ocr s/pg':>9} {'pages/s':>8}")
+            results = {}
+            for index, (name, handoff, ocr) in enumerate(PATHS):
+                grown = measure_rss(path, args.dpi, index)
+                render_s, ocr_s, texts = measure(doc, args.dpi, handoff, ocr)
+                results[name] = texts
+                print(f"{name:>18} {render_s / args.pages * 1000:>14.1f} "
+                      f"{'n/a' if grown is None else f'{grown:.1f}':>13} "
+                      f"{ocr_s / args.pages:>9.3f} {args.pages / ocr_s:>8.2f}")
+
+    old = ''.join(results[PATHS[0][0]])
+    for name, _, _ in PATHS[1:]:
+        ratio = difflib.SequenceMatcher(None, old, ''.join(results[name])).ratio()
+        print(f"text agreement with {PATHS[0][0]}: {name} {ratio:.4f}")
+
+
+if __name__ == '__main__':
+    main()
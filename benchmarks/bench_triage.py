@@ -0,0 +1,65 @@
+"""Benchmark header triage (FFCR_TRIAGE=1) against full extraction in run_ffcr_local.py.
+
+Builds synthetic scanned cases, then for each case times triage_case(), which
+OCRs only the header block of each PDF's first page, and a full
+extract_pdf_pages() + extract_fields() pass. It also checks that triage reads
+the same MRN / DOB / procedure date / side as the full pass.
+
+    python benchmarks/bench_triage.py [--cases 5] [--pages 10] [--pdfs 2] [--dpi 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import run_ffcr_local as ffcr  # noqa: E402
+from synthetic_fixtures import make_scanned_pdf  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=10, help='pages per PDF')
+    parser.add_argument('--pdfs', type=int, default=2, help='PDFs per case')
+    parser.add_argument('--dpi', type=int, default=200, help='scan resolution of the fixtures')
+    args = parser.parse_args()
+    ffcr.OCR_CACHE_PATH = 'off'
+
+    triage_s = full_s = 0.0
+    agree = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.cases} cases x {args.pdfs} PDFs x {args.pages} pages, scanned at {args.dpi} DPI")
+        print(f"{'case':>5} {'triage s':>9} {'full s':>8} {'speedup':>8}  header fields")
+        try:
+            for case in range(args.cases):
+                paths = [make_scanned_pdf(os.path.join(tmp, f'case{case}_{i}.pdf'), pages=args.pages,
+                                          seed=case * args.pdfs + i, scan_dpi=args.dpi)
+                         for i in range(args.pdfs)]
+                start = time.perf_counter()
+                header, _, _, deferred = ffcr.triage_case(paths)
+                t = time.perf_counter() - start
+
+                start = time.perf_counter()
+                text = ''.join(ffcr.pages_to_text(pages) for pages in ffcr.extract_pdf_pages(paths))
+                fields, _ = ffcr.extract_fields(text, [])
+                full = time.perf_counter() - start
+
+                same = all(header[label] == fields[label] for label in ffcr.TRIAGE_FIELDS)
+                agree += same
+                triage_s += t
+                full_s += full
+                print(f"{case:>5} {t:>9.2f} {full:>8.2f} {full / t:>7.1f}x  "
+                      f"{'same as full pass' if same else 'DIFFERENT'}"
+                      f"{f' (would defer: {deferred})' if deferred else ''}")
+        finally:
+            ffcr.shutdown_ocr_pool()
+    print(f"\ntotal {triage_s:.2f}s triage vs {full_s:.2f}s full ({full_s / triage_s:.1f}x); "
+          f"header fields match the full pass in {agree}/{args.cases} cases")
+
+
+if __name__ == '__main__':
+    main()
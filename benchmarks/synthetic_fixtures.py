@@ -0,0 +1,138 @@
+"""Deterministic synthetic op-report PDFs for the FFCR benchmarks.
+
+Nothing here touches patient data: every chart is generated from a seed, so
+the same arguments always produce the same text and, for a given PyMuPDF
+version, the same PDF bytes.
+"""
+
+import random
+
+import fitz  # PyMuPDF
+
+SIDES = ['left', 'right', 'bilateral']
+SIZES = ['small', 'medium', 'large']
+DIAGNOSES = [
+    'Chronic tympanic membrane perforation',
+    'Chronic otitis media with cholesteatoma',
+    'Conductive hearing loss',
+    'Retraction pocket, pars tensa',
+]
+FILLER = [
+    'The patient was brought to the operating room and placed supine.',
+    'General endotracheal anesthesia was induced without difficulty.',
+    'The ear was prepped and draped in the usual sterile fashion.',
+    'A postauricular incision was made and temporalis fascia harvested.',
+    'The tympanomeatal flap was elevated and the middle ear inspected.',
+    'The ossicular chain was intact and mobile.',
+    'The graft was placed in an underlay fashion beneath the remnant.',
+    'Hemostasis was obtained and the incision closed in layers.',
+    'The patient tolerated the procedure well and was taken to recovery.',
+]
+FIXED_PDF_DATE = "D:20240101000000Z"
+
+
+def op_report_pages(pages, seed=0):
+    """Return a list of page texts for one synthetic operative report."""
+    rng = random.Random(seed)
+    side = rng.choice(SIDES)
+    mrn = rng.randint(100000, 9999999)
+    month, day = rng.randint(1, 12), rng.randint(1, 28)
+    header = [
+        'OPERATIVE REPORT',
+        f'Patient MRN: {mrn}',
+        f'DOB: {rng.randint(1, 12)}/{rng.randint(1, 28)}/{rng.randint(1940, 2015)}',
+        f'Date of Surgery: {month}/{day}/{rng.randint(2016, 2025)}',
+        f'Procedure: {side} tympanoplasty',
+        f'Pre-operative Diagnosis: {rng.choice(DIAGNOSES)}',
+        f'Post-operative Diagnosis: {rng.choice(DIAGNOSES)}',
+        f'Findings: {rng.choice(SIZES)} central perforation',
+        'Fibrin foam was placed medial and lateral to the graft.',
+        f'Audiogram 500 Hz: {rng.randint(10, 60)} dB',
+    ]
+    texts = []
+    for page_num in range(pages):
+        lines = list(header) if page_num == 0 else [f'Page {page_num + 1}']
+        lines += [rng.choice(FILLER) for _ in range(30 - len(lines))]
+        if page_num == pages - 1 and pages > 1:
+            lines.append(f'Postoperative audiogram 500 Hz: {rng.randint(5, 40)} dB')
+        texts.append('\n'.join(lines))
+    return texts
+
+
+def case_full_text(pdfs=2, pages=20, seed=0, drop=0.3):
+    """Return text laid out like a case's full_text.txt.
+
+    Header lines are dropped at random (probability drop) so that some fields
+    are never found and an extractor has to read the whole case.
+    """
+    rng = random.Random(seed)
+    chunks = []
+    for pdf in range(pdfs):
+        chunks.append(f"\n--- op_{seed}_{pdf}.pdf ---\n")
+        for text in op_report_pages(pages, seed * 100 + pdf):
+            lines = [line for line in text.split('\n') if rng.random() >= drop]
+            chunks.append('\n'.join(lines) + '\n\f\n')
+    return ''.join(chunks)
+
+
+def _draw_text_page(doc, text):
+    page = doc.new_page(width=612, height=792)
+    page.insert_textbox(fitz.Rect(54, 54, 558, 738), text, fontsize=11, fontname='helv')
+    return page
+
+
+def _save(doc, path):
+    # Fixed dates and no fresh /ID, so regenerated fixtures are byte-identical.
+    doc.set_metadata({'producer': 'FFCR synthetic fixtures', 'creationDate': FIXED_PDF_DATE,
+                      'modDate': FIXED_PDF_DATE})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+
+
+def make_digital_pdf(path, pages=10, seed=0):
+    """Write a PDF with a real text layer (like an EMA export)."""
+    doc = fitz.open()
+    for text in op_report_pages(pages, seed):
+        _draw_text_page(doc, text)
+    _save(doc, path)
+    doc.close()
+    return path
+
+
+def _scan_page(out, page, scan_dpi, skew=0.0, shade=0.0):
+    """Rasterize page into out. skew tilts the scan (degrees); shade darkens the
+    lower half of the page to that gray level, like an uneven photocopy."""
+    if shade:
+        half = fitz.Rect(0, page.rect.height / 2, page.rect.width, page.rect.height)
+        page.draw_rect(half, color=None, fill=(1 - shade,) * 3, overlay=False)
+    matrix = fitz.Matrix(scan_dpi / 72, scan_dpi / 72).prerotate(skew)
+    pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False)
+    scan = out.new_page(width=page.rect.width, height=page.rect.height)
+    scan.insert_image(scan.rect, stream=pix.tobytes('png'))
+
+
+def make_scanned_pdf(path, pages=10, seed=0, scan_dpi=200, skew=0.0, shade=0.0):
+    """Write an image-only PDF: each page is a raster of the rendered text."""
+    src = fitz.open()
+    out = fitz.open()
+    for n, text in enumerate(op_report_pages(pages, seed)):
+        # Alternate the tilt direction so deskewing has to estimate each page.
+        _scan_page(out, _draw_text_page(src, text), scan_dpi, skew if n % 2 else -skew, shade)
+    _save(out, path)
+    out.close()
+    src.close()
+    return path
+
+
+def make_mixed_pdf(path, pages=10, seed=0, scan_dpi=200):
+    """Write a PDF alternating text-layer pages (1, 3, ...) and scanned pages (2, 4, ...)."""
+    src = fitz.open()
+    out = fitz.open()
+    for page_num, text in enumerate(op_report_pages(pages, seed)):
+        if page_num % 2:
+            _scan_page(out, _draw_text_page(src, text), scan_dpi)
+        else:
+            _draw_text_page(out, text)
+    _save(out, path)
+    out.close()
+    src.close()
+    return path
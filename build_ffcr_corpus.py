@@ -0,0 +1,206 @@
+"""Build and search a local full-text corpus of processed FFCR / Fibrin cases.
+
+Loads the page-level text of every full_text.txt found under the given roots
+into an SQLite FTS5 database, with case, MRN, file and page for each page.
+Reviewers can then run ranked searches with snippets against a local copy
+instead of opening case folders on the shared drive.
+
+    python build_ffcr_corpus.py build "H:/Shared drives/FFCR/Processed Results" [more roots...]
+    python build_ffcr_corpus.py search 'thrombin AND "cartilage graft"' [--limit 20] [--mrn 1234567]
+
+Re-running build only reads case folders whose full_text.txt changed, and only
+rewrites the pages whose text changed. Searches open the database read-only
+and memory-mapped (--mmap MB, 0 turns it off).
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+CORPUS_PATH = os.environ.get('FFCR_CORPUS') or os.path.join(os.path.expanduser('~'), '.ffcr', 'ffcr_corpus.sqlite')
+FILE_HEADER_RE = re.compile(r'^--- (.+) ---$', re.MULTILINE)
+MRN_RE = re.compile(r'MRN[:\s]*?(\d{6,})')
+
+
+def open_corpus(path=CORPUS_PATH, read_only=False, mmap_mb=0):
+    if read_only:
+        db = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path)
+        # One row per full_text.txt; the same case name can turn up under several roots.
+        db.execute('CREATE TABLE IF NOT EXISTS cases (id INTEGER PRIMARY KEY, source TEXT UNIQUE NOT NULL, '
+                   'name TEXT NOT NULL, mrn TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)')
+        db.execute('CREATE TABLE IF NOT EXISTS pages (id INTEGER PRIMARY KEY, case_id INTEGER NOT NULL, '
+                   'file TEXT NOT NULL, page INTEGER NOT NULL, digest TEXT NOT NULL, '
+                   'UNIQUE (case_id, file, page))')
+        # rowid = pages.id; porter stemming so "perforated" finds "perforation".
+        db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(text, tokenize='porter unicode61')")
+    if mmap_mb:
+        db.execute(f'PRAGMA mmap_size={int(mmap_mb) << 20}')
+    return db
+
+
+def split_pages(full_text):
+    """[(file, page number, text)] from a full_text.txt.
+
+    Files start at '--- name ---' header lines and pages end with a form feed,
+    in both FFCR and Fibrin reviewer output. Text before the first header
+    (Fibrin output from before v8.3 wrote those markers) is filed under ''.
+    Blank pages keep their number but are not returned.
+    """
+    pages = []
+    headers = list(FILE_HEADER_RE.finditer(full_text))
+    sections = [('', full_text[:headers[0].start()] if headers else full_text)]
+    for n, header in enumerate(headers):
+        end = headers[n + 1].start() if n + 1 < len(headers) else len(full_text)
+        sections.append((header.group(1), full_text[header.end():end]))
+    for file, body in sections:
+        for number, text in enumerate(body.split('\f'), 1):
+            text = text.strip()
+            if text:
+                pages.append((file, number, text))
+    return pages
+
+
+def case_mrn(case_dir, full_text):
+    """MRN from the case's case_summary.txt if it has one, else the first MRN in the text."""
+    try:
+        with open(os.path.join(case_dir, 'case_summary.txt'), encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('MRN:'):
+                    value = line[4:].strip()
+                    if value:
+                        return value
+    except OSError:
+        pass
+    match = MRN_RE.search(full_text)
+    return match.group(1) if match else ''
+
+
+def index_case(db, case_id, pages):
+    """Bring one case's pages up to date; returns (pages written, pages removed)."""
+    existing = {(file, page): (page_id, digest) for page_id, file, page, digest in db.execute(
+        'SELECT id, file, page, digest FROM pages WHERE case_id = ?', (case_id,))}
+    written = 0
+    for file, page, text in pages:
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        old = existing.pop((file, page), None)
+        if old is not None:
+            if old[1] == digest:
+                continue
+            db.execute('DELETE FROM page_text WHERE rowid = ?', (old[0],))
+            db.execute('UPDATE pages SET digest = ? WHERE id = ?', (digest, old[0]))
+            page_id = old[0]
+        else:
+            page_id = db.execute('INSERT INTO pages (case_id, file, page, digest) VALUES (?, ?, ?, ?)',
+                                 (case_id, file, page, digest)).lastrowid
+        db.execute('INSERT INTO page_text (rowid, text) VALUES (?, ?)', (page_id, text))
+        written += 1
+    for page_id, _ in existing.values():
+        db.execute('DELETE FROM page_text WHERE rowid = ?', (page_id,))
+        db.execute('DELETE FROM pages WHERE id = ?', (page_id,))
+    return written, len(existing)
+
+
+def find_cases(roots):
+    """(case name, case folder, full_text.txt path) for every case under roots."""
+    for root in roots:
+        for folder, dirs, files in os.walk(root):
+            dirs.sort()
+            if 'full_text.txt' in files:
+                yield os.path.basename(folder), folder, os.path.join(folder, 'full_text.txt')
+
+
+def build(db, roots):
+    started = time.perf_counter()
+    seen = changed = written = removed = 0
+    for name, folder, path in find_cases(roots):
+        seen += 1
+        st = os.stat(path)
+        row = db.execute('SELECT id, size, mtime_ns FROM cases WHERE source = ?', (path,)).fetchone()
+        if row is not None and row[1:] == (st.st_size, st.st_mtime_ns):
+            continue
+        with open(path, encoding='utf-8', errors='replace') as f:
+            full_text = f.read()
+        mrn = case_mrn(folder, full_text)
+        with db:
+            if row is None:
+                case_id = db.execute('INSERT INTO cases (source, name, mrn, size, mtime_ns) VALUES (?, ?, ?, ?, ?)',
+                                     (path, name, mrn, st.st_size, st.st_mtime_ns)).lastrowid
+            else:
+                case_id = row[0]
+                db.execute('UPDATE cases SET mrn = ?, size = ?, mtime_ns = ? WHERE id = ?',
+                           (mrn, st.st_size, st.st_mtime_ns, case_id))
+            w, r = index_case(db, case_id, split_pages(full_text))
+        changed += 1
+        written += w
+        removed += r
+    print(f"{seen} cases found, {changed} read, {written} pages written, {removed} removed "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+def search(db, query, limit=20, mrn=None, case=None):
+    """Best-ranked pages for an FTS5 query: [(case, mrn, file, page, snippet)]."""
+    sql = ("SELECT c.name, c.mrn, p.file, p.page, "
+           "snippet(page_text, 0, '[', ']', ' ... ', 16) "
+           "FROM page_text JOIN pages p ON p.id = page_text.rowid "
+           "JOIN cases c ON c.id = p.case_id WHERE page_text MATCH ?")
+    args = [query]
+    if mrn:
+        sql += ' AND c.mrn = ?'
+        args.append(mrn)
+    if case:
+        sql += ' AND c.name = ?'
+        args.append(case)
+    sql += ' ORDER BY rank LIMIT ?'
+    args.append(limit)
+    return db.execute(sql, args).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FFCR full-text corpus (SQLite FTS5)')
+    parser.add_argument('--db', default=CORPUS_PATH, help=f'corpus database (default {CORPUS_PATH})')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_cmd = sub.add_parser('build', help='add new and changed cases under the given folders')
+    build_cmd.add_argument('roots', nargs='+')
+    search_cmd = sub.add_parser('search', help='ranked search, FTS5 query syntax')
+    search_cmd.add_argument('query')
+    search_cmd.add_argument('--limit', type=int, default=20)
+    search_cmd.add_argument('--mrn')
+    search_cmd.add_argument('--case')
+    search_cmd.add_argument('--mmap', type=int, default=256, metavar='MB',
+                            help='memory-map up to this much of the database (default 256, 0 = off)')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        db = open_corpus(args.db)
+        try:
+            build(db, args.roots)
+        finally:
+            db.close()
+        return
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"No corpus at {args.db}; create it with: python build_ffcr_corpus.py build ROOT [...]")
+    db = open_corpus(args.db, read_only=True, mmap_mb=args.mmap)
+    try:
+        started = time.perf_counter()
+        rows = search(db, args.query, args.limit, args.mrn, args.case)
+        elapsed = (time.perf_counter() - started) * 1000
+    except sqlite3.OperationalError as e:
+        # FTS5 syntax errors ("fts5: syntax error near ...") or a database that is not a corpus.
+        raise SystemExit(f"Search failed: {e}")
+    finally:
+        db.close()
+    for case, mrn, file, page, snippet in rows:
+        where = f"{file} p.{page}" if file else f"p.{page}"
+        print(f"{case}  MRN {mrn or '?'}  {where}\n    {' '.join(snippet.split())}")
+    print(f"{len(rows)} page(s) ({elapsed:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
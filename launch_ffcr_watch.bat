@@ -0,0 +1,3 @@
+@echo off
+python run_ffcr_local.py --watch
+pause
@@ -4,74 +4,1267 @@ from PIL import Image
 import fitz  # PyMuPDF
 import csv
 import re
+import shutil
+import argparse
+import hashlib
+import json
+import queue
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+try:
+    import tesserocr  # optional: in-process Tesseract API (FFCR_OCR_BACKEND=tesserocr)
+except ImportError:
+    tesserocr = None
+
+try:
+    import numpy as np  # optional: page image preprocessing (FFCR_OCR_PREPROCESS=1)
+except ImportError:
+    np = None
+
+try:
+    # optional: filesystem events for --watch (polling is used without it)
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
 
 INCOMING_DIR = 'H:/Shared drives/FFCR/Incoming Cases'
 RESULTS_DIR = 'H:/Shared drives/FFCR/Processed Results'
 SPREADSHEET = os.path.join(RESULTS_DIR, 'FFCR_master_spreadsheet.csv')
+FIELDS = [
+    'MRN', 'DOB', 'Procedure Date', 'Side', 'Pre-op Diagnosis', 'Post-op Diagnosis',
+    'Audiometry Pre', 'Audiometry Post', 'Perforation Size', 'Foam Mention', 'Images Present'
+]
 
-def ocr_pdf(path):
-    text = ''
-    doc = fitz.open(path)
-    for page_num in range(len(doc)):
-        pix = doc.load_page(page_num).get_pixmap(dpi=300)
-        img = Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
-        text += pytesseract.image_to_string(img) + '\n'
-    return text
-
-def extract_fields(text, image_files):
-    lines = text.splitlines()
-    audit_log = {}
-    def find(pattern, label, flags=0):
-        for line in lines:
-            if re.search(pattern, line, flags):
-                audit_log[label] = line.strip()
-                match = re.search(pattern, line, flags)
-                return match.group(1).strip() if match else ''
-        audit_log[label] = ''
-        return ''
-
-    mrn = find(r'MRN[:\s]*?(\d{6,})', 'MRN')
-    dob = find(r'DOB[:\s]*?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 'DOB')
-    procedure_date = find(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 'Procedure Date')
-    side = find(r'\b(left|right|bilateral)\b', 'Side', re.IGNORECASE)
-    pre_dx = find(r'Pre[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', 'Pre-op Diagnosis', re.IGNORECASE)
-    post_dx = find(r'Post[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', 'Post-op Diagnosis', re.IGNORECASE)
-    perforation_size = find(r'\b(small|medium|large)\b(?=.*perforation)', 'Perforation Size', re.IGNORECASE)
-
-    foam_line = ''
-    for line in lines:
-        if 'fibrin' in line.lower() or 'foam' in line.lower():
-            foam_line = line.strip()
-            audit_log['Foam Mention'] = foam_line
+# ========= OCR ENGINE START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+
+# Number of OCR worker processes. FFCR_OCR_WORKERS=1 keeps everything in-process.
+OCR_WORKERS = int(os.environ.get('FFCR_OCR_WORKERS') or os.cpu_count() or 1)
+OCR_DPI = 300
+# 'hybrid' reads each page's text layer and OCRs only pages without enough text;
+# 'ocr' rasterizes and OCRs every page (the pre-hybrid behaviour).
+OCR_MODE = os.environ.get('FFCR_OCR_MODE', 'hybrid').lower()
+# Fewer non-blank characters than this in the text layer means the page gets OCRed.
+TEXT_LAYER_MIN_CHARS = int(os.environ.get('FFCR_TEXT_LAYER_MIN_CHARS') or 40)
+# Adaptive DPI: OCR at OCR_BASE_DPI first and re-render at the escalation DPIs
+# only when the mean Tesseract word confidence is below OCR_MIN_CONF.
+OCR_ADAPTIVE = os.environ.get('FFCR_OCR_ADAPTIVE', '0') == '1'
+OCR_BASE_DPI = int(os.environ.get('FFCR_OCR_BASE_DPI') or 150)
+OCR_ESCALATE_DPIS = [int(d) for d in (os.environ.get('FFCR_OCR_ESCALATE_DPI') or '300,400').split(',')]
+OCR_MIN_CONF = float(os.environ.get('FFCR_OCR_MIN_CONF') or 80)
+# Render single-channel pixmaps and pipe them to `tesseract stdin` as PGM instead of
+# RGB -> PIL image -> temp file via pytesseract. FFCR_OCR_FAST_RENDER=0 restores the old path.
+OCR_FAST_RENDER = os.environ.get('FFCR_OCR_FAST_RENDER', '1') != '0'
+# 'cli' runs the tesseract executable per page; 'tesserocr' keeps one Tesseract engine
+# alive in each worker and reuses it for every page (falls back to 'cli' if not installed).
+OCR_BACKEND = os.environ.get('FFCR_OCR_BACKEND', 'cli').lower()
+OCR_LANG = os.environ.get('FFCR_OCR_LANG', 'eng')
+# Clean up gray page renders before OCR: adaptive binarization, deskew, margin
+# crop and squeezing of tall blank bands. Needs numpy; applies to the gray
+# render paths (FFCR_OCR_FAST_RENDER=1 and the tesserocr backend).
+OCR_PREPROCESS = os.environ.get('FFCR_OCR_PREPROCESS', '0') == '1'
+# Page-result cache keyed by PDF SHA-256 + page + engine settings. FFCR_OCR_CACHE=off disables it.
+OCR_CACHE_PATH = os.environ.get('FFCR_OCR_CACHE') or os.path.join(
+    os.path.expanduser('~'), '.ffcr', 'ocr_cache.sqlite')
+OCR_CACHE_MAX_MB = float(os.environ.get('FFCR_OCR_CACHE_MB') or 512)
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+# Per-thread open document (see _get_doc) and Tesseract engine (one thread per pool worker).
+_ocr_local = threading.local()
+# PyMuPDF is not thread-safe; serializes in-process use when cases run on threads.
+# Held for MuPDF calls only (open, load, text layer, render), never while Tesseract runs.
+_fitz_lock = threading.RLock()
+_ocr_cache_db = None
+_ocr_cache_lock = threading.Lock()
+_tesseract_version = None
+ocr_cache_stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+
+def _ocr_settings():
+    return {'OCR_DPI': OCR_DPI, 'OCR_MODE': OCR_MODE,
+            'TEXT_LAYER_MIN_CHARS': TEXT_LAYER_MIN_CHARS,
+            'OCR_ADAPTIVE': OCR_ADAPTIVE, 'OCR_BASE_DPI': OCR_BASE_DPI,
+            'OCR_ESCALATE_DPIS': OCR_ESCALATE_DPIS, 'OCR_MIN_CONF': OCR_MIN_CONF,
+            'OCR_FAST_RENDER': OCR_FAST_RENDER, 'OCR_BACKEND': OCR_BACKEND,
+            'OCR_LANG': OCR_LANG, 'OCR_PREPROCESS': OCR_PREPROCESS}
+
+def _init_ocr_worker(settings):
+    global _fitz_lock
+    # Spawned workers re-import this module, so carry over the parent's settings.
+    globals().update(settings)
+    # A forked worker may inherit the lock mid-acquire from a case thread.
+    _fitz_lock = threading.RLock()
+    # One Tesseract thread per worker; the pool supplies the parallelism.
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+def _get_doc(path):
+    """This thread's open document for path, reopened if the file was replaced
+    (keyed on path, mtime and size). Close it with _release_doc()."""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    if getattr(_ocr_local, 'doc_key', None) != key:
+        _release_doc()
+        _ocr_local.doc = fitz.open(path)
+        _ocr_local.doc_key = key
+    return _ocr_local.doc
+
+def _release_doc():
+    doc = getattr(_ocr_local, 'doc', None)
+    _ocr_local.doc = _ocr_local.doc_key = None
+    if doc is not None:
+        doc.close()
+
+def _pooled(func, arg):
+    # Pool workers close the document after every task, so no worker keeps a
+    # case's PDFs open (and locked on Windows) once the case is done.
+    try:
+        return func(arg)
+    finally:
+        _release_doc()
+
+def _has_text_layer(text):
+    return len(''.join(text.split())) >= TEXT_LAYER_MIN_CHARS
+
+def _render(page, dpi, clip=None):
+    with _fitz_lock:
+        pix = page.get_pixmap(dpi=dpi, clip=clip)
+        return Image.frombytes('RGB', [pix.width, pix.height], pix.samples)
+
+def _render_pgm(page, dpi, clip=None):
+    """Render a gray, alpha-free page (or the clip rect of it) as binary PGM: a
+    few header bytes in front of the raw samples, which tesseract reads
+    straight from stdin."""
+    if OCR_PREPROCESS and np is not None:
+        samples, width, height = _preprocess(page, dpi, clip)
+        return b'P5\n%d %d\n255\n' % (width, height) + samples
+    with _fitz_lock:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+        return b'P5\n%d %d\n255\n' % (pix.width, pix.height) + pix.samples_mv
+
+# Preprocessing knobs, in inches where they depend on resolution.
+DESKEW_MAX_DEGREES = 5.0
+DESKEW_STEP_DEGREES = 0.25
+DESKEW_MIN_DEGREES = 0.3
+BINARIZE_WINDOW_INCHES = 0.12
+BINARIZE_OFFSET = 0.15
+INK_MAX_GRAY = 140
+CROP_PAD_INCHES = 0.1
+BLANK_GAP_INCHES = 0.25
+
+def _gray_array(pix):
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+
+def _estimate_skew(gray):
+    """Skew angle in degrees from the row profile of a downsampled page.
+
+    Text lines give the sharpest row profile when sheared level, so each
+    candidate angle shears the dark pixels and scores the profile by the sum
+    of squared differences between neighbouring rows.
+    """
+    step = max(1, gray.shape[1] // 600)
+    small = gray[::step, ::step]
+    ys, xs = np.nonzero(small < 128)
+    if len(ys) < 100:
+        return 0.0
+    angles = np.arange(-DESKEW_MAX_DEGREES, DESKEW_MAX_DEGREES + 1e-9, DESKEW_STEP_DEGREES)
+    best_angle, best_score = 0.0, -1.0
+    for angle in angles:
+        rows = np.round(ys + xs * np.tan(np.radians(angle))).astype(np.int64)
+        profile = np.bincount(rows - rows.min())
+        score = float(np.sum(np.diff(profile).astype(np.float64) ** 2))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+def _box_mean(a, half):
+    """Mean over the (2*half+1)-square window around each cell, edges clamped."""
+    padded = np.pad(a, half, mode='edge')
+    size = 2 * half + 1
+    for axis in (0, 1):
+        c = np.cumsum(padded, axis=axis, dtype=np.float64)
+        c = np.insert(c, 0, 0, axis=axis)
+        if axis == 0:
+            padded = c[size:] - c[:-size]
+        else:
+            padded = c[:, size:] - c[:, :-size]
+    return padded / (size * size)
+
+def _binarize(gray, dpi):
+    """Bradley-Roth adaptive threshold: a pixel is ink when it is darker than its
+    local mean by BINARIZE_OFFSET and darker than INK_MAX_GRAY, so the edge of a
+    shaded band on the page does not turn into a line of ink. Local means are
+    taken over 4x4 blocks, which is plenty for a window a tenth of an inch wide."""
+    block = 4
+    h, w = gray.shape
+    hb, wb = -(-h // block), -(-w // block)
+    padded = np.pad(gray, ((0, hb * block - h), (0, wb * block - w)), mode='edge')
+    blocks = padded.reshape(hb, block, wb, block).sum(axis=(1, 3), dtype=np.uint16) / (block * block)
+    half = max(1, int(dpi * BINARIZE_WINDOW_INCHES) // (2 * block))
+    threshold = (_box_mean(blocks, half) * (1 - BINARIZE_OFFSET)).astype(np.uint8)
+    threshold = threshold.repeat(block, 0).repeat(block, 1)[:h, :w]
+    return (gray < threshold) & (gray < INK_MAX_GRAY)
+
+def _preprocess(page, dpi, clip=None):
+    with _fitz_lock:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+        gray = _gray_array(pix)
+    angle = _estimate_skew(gray)
+    if abs(angle) >= DESKEW_MIN_DEGREES:
+        # Re-render rotated rather than rotating our raster: one resampling pass, done by MuPDF.
+        matrix = fitz.Matrix(dpi / 72, dpi / 72).prerotate(angle)
+        with _fitz_lock:
+            pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+            gray = _gray_array(pix)
+    ink = _binarize(gray, dpi)
+    # Margin crop: keep the box around rows/columns holding ink, plus a little padding.
+    rows = np.flatnonzero(ink.sum(1) > 1)
+    cols = np.flatnonzero(ink.sum(0) > 1)
+    if len(rows) == 0 or len(cols) == 0:
+        blank = np.full((dpi // 4, dpi // 4), 255, dtype=np.uint8)
+        return blank.tobytes(), blank.shape[1], blank.shape[0]
+    pad = int(dpi * CROP_PAD_INCHES)
+    ink = ink[max(0, rows[0] - pad):rows[-1] + pad + 1, max(0, cols[0] - pad):cols[-1] + pad + 1]
+    # Squeeze blank bands taller than BLANK_GAP_INCHES down to that height.
+    gap = int(dpi * BLANK_GAP_INCHES)
+    blank_rows = ~ink.any(1)
+    run_start = np.maximum.accumulate(np.where(blank_rows, 0, np.arange(1, len(blank_rows) + 1)))
+    keep = ~blank_rows | (np.arange(len(blank_rows)) - run_start < gap)
+    out = np.where(ink[keep], 0, 255).astype(np.uint8)
+    return out.tobytes(), out.shape[1], out.shape[0]
+
+def _tesseract_stdin(image, dpi, *args):
+    cmd = [pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout', '-l', OCR_LANG, '--dpi', str(dpi), *args]
+    proc = subprocess.run(cmd, input=image, capture_output=True,
+                          creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    if proc.returncode:
+        raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode('utf-8', 'replace'))
+    return proc.stdout.decode('utf-8')
+
+def ocr_backend():
+    return 'tesserocr' if OCR_BACKEND == 'tesserocr' and tesserocr is not None else 'cli'
+
+def ocr_backend_note():
+    note = f"OCR backend: {ocr_backend()}"
+    if OCR_BACKEND == 'tesserocr' and tesserocr is None:
+        note += ' (tesserocr not installed, using the tesseract CLI)'
+    return note
+
+def _api_recognize(page, dpi, clip=None):
+    """Run the worker's long-lived Tesseract engine over a gray render of page."""
+    api = getattr(_ocr_local, 'tess_api', None)
+    if api is None:
+        api = _ocr_local.tess_api = tesserocr.PyTessBaseAPI(lang=OCR_LANG)
+    if OCR_PREPROCESS and np is not None:
+        samples, width, height = _preprocess(page, dpi, clip)
+        api.SetImageBytes(samples, width, height, 1, width)
+    else:
+        with _fitz_lock:
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+            api.SetImageBytes(pix.samples, pix.width, pix.height, 1, pix.stride)
+    api.SetSourceResolution(dpi)
+    api.Recognize()
+    return api
+
+# GetTSVText() returns rows only; the tesseract CLI adds this header itself.
+TSV_HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext'
+
+def _tsv_to_data(tsv):
+    """Parse tesseract TSV output into the dict shape of image_to_data(Output.DICT)."""
+    rows = [line.split('\t') for line in tsv.splitlines() if line]
+    header = rows[0]
+    data = {column: [] for column in header}
+    for row in rows[1:]:
+        row += [''] * (len(header) - len(row))
+        for column, value in zip(header, row):
+            data[column].append(value)
+    return data
+
+def _image_to_string(page, dpi, clip=None):
+    if ocr_backend() == 'tesserocr':
+        return _api_recognize(page, dpi, clip).GetUTF8Text()
+    if OCR_FAST_RENDER:
+        return _tesseract_stdin(_render_pgm(page, dpi, clip), dpi)
+    return pytesseract.image_to_string(_render(page, dpi, clip), lang=OCR_LANG)
+
+def _image_to_data(page, dpi):
+    if ocr_backend() == 'tesserocr':
+        return _tsv_to_data(TSV_HEADER + '\n' + _api_recognize(page, dpi).GetTSVText(0))
+    if OCR_FAST_RENDER:
+        return _tsv_to_data(_tesseract_stdin(_render_pgm(page, dpi), dpi, 'tsv'))
+    return pytesseract.image_to_data(_render(page, dpi), lang=OCR_LANG, output_type=pytesseract.Output.DICT)
+
+def _mean_conf(data):
+    confs = [float(c) for c, word in zip(data['conf'], data['text'])
+             if float(c) >= 0 and word.strip()]
+    return sum(confs) / len(confs) if confs else 0.0
+
+def _data_to_text(data):
+    """Rebuild page text from image_to_data words: one line per OCR line,
+    a blank line between paragraphs."""
+    lines = []
+    last_line = last_par = None
+    for i, word in enumerate(data['text']):
+        if not word.strip():
+            continue
+        par = (data['block_num'][i], data['par_num'][i])
+        line = par + (data['line_num'][i],)
+        if line != last_line:
+            if last_par is not None and par != last_par:
+                lines.append('')
+            lines.append(word)
+        else:
+            lines[-1] += ' ' + word
+        last_line, last_par = line, par
+    return '\n'.join(lines) + '\n'
+
+def _ocr_adaptive(page):
+    best = None
+    tried = []
+    for dpi in [OCR_BASE_DPI] + [d for d in OCR_ESCALATE_DPIS if d > OCR_BASE_DPI]:
+        data = _image_to_data(page, dpi)
+        conf = _mean_conf(data)
+        tried.append(f"{dpi}:{conf:.1f}")
+        if best is None or conf > best[1]:
+            best = (dpi, conf, data)
+        if conf >= OCR_MIN_CONF:
+            break
+    dpi, conf, data = best
+    return {'text': _data_to_text(data), 'dpi': dpi, 'conf': round(conf, 1),
+            'tried': ','.join(tried)}
+
+def _ocr_page(task):
+    """Extract one page; returns {'page', 'source', 'text'}.
+
+    source is 'text' when the PDF's own text layer was used, 'ocr' otherwise.
+    Adaptive OCR also reports the chosen dpi, its mean confidence and every
+    dpi:confidence attempt.
+    """
+    path, page_num = task
+    with _fitz_lock:
+        page = _get_doc(path).load_page(page_num)
+        if OCR_MODE == 'hybrid':
+            text = page.get_text()
+            if _has_text_layer(text):
+                return {'page': page_num, 'source': 'text', 'text': text}
+    # The renders take _fitz_lock themselves; Tesseract runs without it.
+    if OCR_ADAPTIVE:
+        return dict(_ocr_adaptive(page), page=page_num, source='ocr')
+    text = _image_to_string(page, OCR_DPI)
+    return {'page': page_num, 'source': 'ocr', 'text': text}
+
+# Header block for triage OCR: the first TRIAGE_HEADER_LINES lines of text,
+# found in a cheap low-resolution render, never more than TRIAGE_MAX_FRACTION of the page.
+TRIAGE_HEADER_LINES = int(os.environ.get('FFCR_TRIAGE_LINES') or 12)
+TRIAGE_MAX_FRACTION = 0.4
+TRIAGE_PROBE_DPI = 72
+
+def _header_clip(page):
+    with _fitz_lock:
+        pix = page.get_pixmap(dpi=TRIAGE_PROBE_DPI, colorspace=fitz.csGRAY, alpha=False)
+        samples = pix.samples
+    limit = int(pix.height * TRIAGE_MAX_FRACTION)
+    bottom = limit
+    lines = 0
+    inked_before = False
+    for row in range(limit):
+        start = row * pix.stride
+        inked = min(samples[start:start + pix.width]) < 160
+        if inked and not inked_before:
+            lines += 1
+        elif not inked and inked_before and lines >= TRIAGE_HEADER_LINES:
+            bottom = row
             break
-    if not foam_line:
-        audit_log['Foam Mention'] = ''
+        inked_before = inked
+    rect = page.rect
+    height = min(rect.height, (bottom + 4) * 72 / TRIAGE_PROBE_DPI)
+    return fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y0 + height)
 
-    pre_audio = ''
-    post_audio = ''
+def _ocr_header(path):
+    """Text of the header block of a PDF's first page: {'source', 'text', 'clip'}.
+
+    A page with a text layer (in hybrid mode) gives its whole text for free;
+    otherwise only the header block is OCRed, and clip is its height in points.
+    """
+    with _fitz_lock:
+        doc = _get_doc(path)
+        if len(doc) == 0:
+            return {'source': 'empty', 'text': '', 'clip': 0}
+        page = doc.load_page(0)
+        if OCR_MODE == 'hybrid':
+            text = page.get_text()
+            if _has_text_layer(text):
+                return {'source': 'text', 'text': text, 'clip': round(page.rect.height)}
+        clip = _header_clip(page)
+    return {'source': 'ocr', 'text': _image_to_string(page, OCR_DPI, clip),
+            'clip': round(clip.height)}
+
+def ocr_headers(paths):
+    """_ocr_header() for each path, in order, spread over the OCR pool."""
+    pool = get_ocr_pool()
+    if pool:
+        return list(pool.map(_pooled, [_ocr_header] * len(paths), paths))
+    try:
+        return [_ocr_header(path) for path in paths]
+    finally:
+        _release_doc()
+
+def get_ocr_pool():
+    global _ocr_pool
+    # Case threads ask for the pool concurrently; only one of them may create it.
+    with _ocr_pool_lock:
+        if _ocr_pool is None and OCR_WORKERS > 1:
+            _ocr_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS,
+                                            initializer=_init_ocr_worker,
+                                            initargs=(_ocr_settings(),))
+        return _ocr_pool
+
+def start_ocr_engine():
+    """Look up the engine version and launch the OCR worker processes from the
+    main thread, before any case thread exists. The workers are forked on
+    Linux; one forked while a case thread is starting tesseract keeps that
+    subprocess's exec pipe open, and the case thread then waits on it forever."""
+    _engine_signature()
+    pool = get_ocr_pool()
+    if pool is not None:
+        # With fork, the first submit launches every worker at once.
+        pool.submit(os.getpid).result()
+
+def shutdown_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        pool, _ocr_pool = _ocr_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _ocr_cache():
+    global _ocr_cache_db
+    with _ocr_cache_lock:
+        if _ocr_cache_db is None and OCR_CACHE_PATH.lower() != 'off':
+            os.makedirs(os.path.dirname(os.path.abspath(OCR_CACHE_PATH)), exist_ok=True)
+            # Opened by whichever thread runs the first case (see watch_incoming).
+            db = sqlite3.connect(OCR_CACHE_PATH, check_same_thread=False)
+            db.execute('CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, record TEXT NOT NULL, '
+                       'size INTEGER NOT NULL, used REAL NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS pages_used ON pages (used)')
+            _ocr_cache_db = db
+        return _ocr_cache_db
+
+def _engine_signature():
+    global _tesseract_version
+    if _tesseract_version is None:
+        try:
+            if ocr_backend() == 'tesserocr':
+                _tesseract_version = tesserocr.tesseract_version().split('\n')[0]
+            else:
+                _tesseract_version = str(pytesseract.get_tesseract_version())
+        except Exception:
+            _tesseract_version = 'unknown'
+    return f"{ocr_backend()}={_tesseract_version};" + json.dumps(_ocr_settings(), sort_keys=True)
+
+def _cache_lookup(db, key):
+    with _ocr_cache_lock:
+        row = db.execute('SELECT record FROM pages WHERE key = ?', (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def _cache_flush(db, hits, fresh):
+    """Mark hit keys as recently used, store fresh (key, record) pairs and
+    evict least-recently-used pages down to 90% of the size limit."""
+    with _ocr_cache_lock:
+        _cache_flush_locked(db, hits, fresh)
+
+def _cache_flush_locked(db, hits, fresh):
+    now = time.time()
+    db.executemany('UPDATE pages SET used = ? WHERE key = ?', [(now, key) for key in hits])
+    rows = []
+    for key, record in fresh:
+        blob = json.dumps(record)
+        rows.append((key, blob, len(blob.encode('utf-8')), now))
+    db.executemany('INSERT OR REPLACE INTO pages (key, record, size, used) VALUES (?, ?, ?, ?)', rows)
+    ocr_cache_stats['hits'] += len(hits)
+    ocr_cache_stats['misses'] += len(fresh)
+    limit = int(OCR_CACHE_MAX_MB * 1024 * 1024)
+    total = db.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+    if total > limit:
+        doomed = []
+        for key, size in db.execute('SELECT key, size FROM pages ORDER BY used'):
+            if total <= limit * 0.9:
+                break
+            doomed.append((key,))
+            total -= size
+        db.executemany('DELETE FROM pages WHERE key = ?', doomed)
+        ocr_cache_stats['evicted'] += len(doomed)
+    db.commit()
+    hits.clear()
+    fresh.clear()
+
+def ocr_cache_summary():
+    stats = ocr_cache_stats
+    return f"OCR cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evicted']} evicted"
+
+def close_ocr_cache():
+    global _ocr_cache_db
+    with _ocr_cache_lock:
+        if _ocr_cache_db is not None:
+            _ocr_cache_db.close()
+            _ocr_cache_db = None
+
+def _page_tasks(paths, db):
+    for index, path in enumerate(paths):
+        digest = file_sha256(path) if db else None
+        with _fitz_lock, fitz.open(path) as doc:
+            page_count = len(doc)
+        for page_num in range(page_count):
+            key = f"{digest}:{page_num}:{_engine_signature()}" if db else None
+            yield index, (path, page_num), key
+
+def iter_pdf_pages(paths):
+    """Yield (index into paths, page record) in file/page order.
+
+    Pages of every PDF are spread over the worker pool, but at most
+    OCR_WORKERS * 2 are in flight at once, so memory stays at a handful of
+    pages however large the case is. Pages already in the OCR cache are
+    served from it (marked cache=hit) without touching the pool.
+    """
+    db = _ocr_cache()
+    pool = get_ocr_pool()
+    limit = OCR_WORKERS * 2 if pool else 0
+    pending = deque()
+    hits = []
+    fresh = []
+
+    def finish():
+        index, key, item, cached = pending.popleft()
+        record = item.result() if isinstance(item, Future) else item
+        if db and not cached:
+            fresh.append((key, record))
+        return index, record
+
+    try:
+        for index, task, key in _page_tasks(paths, db):
+            record = _cache_lookup(db, key) if db else None
+            if record is not None:
+                hits.append(key)
+                pending.append((index, key, dict(record, cache='hit'), True))
+            elif pool:
+                pending.append((index, key, pool.submit(_pooled, _ocr_page, task), False))
+            else:
+                pending.append((index, key, _ocr_page(task), False))
+            while len(pending) > limit:
+                yield finish()
+                if db and len(hits) + len(fresh) >= 32:
+                    _cache_flush(db, hits, fresh)
+        while pending:
+            yield finish()
+    finally:
+        _release_doc()
+        if db:
+            _cache_flush(db, hits, fresh)
+
+def extract_pdf_pages(paths):
+    """Return one list of page records (see _ocr_page) per path, in order."""
+    pages = [[] for _ in paths]
+    for index, record in iter_pdf_pages(paths):
+        pages[index].append(record)
+    return pages
+
+def iter_case_text(paths, page_audit, on_page=None):
+    """Yield a case's full_text.txt as chunks: a '--- file ---' header per PDF
+    followed by its pages, each ending with a form feed line (Tesseract output
+    already ends in one). Each chunk ends with a newline. One audit line per
+    page is appended to page_audit as the pages arrive, and on_page(file,
+    page number, text) is called for each page if given."""
+    files = [os.path.basename(path) for path in paths]
+    started = 0
+    for index, record in iter_pdf_pages(paths):
+        while started <= index:
+            yield f"\n--- {files[started]} ---\n"
+            started += 1
+        page_audit.extend(page_audit_lines(files[index], [record]))
+        if on_page is not None:
+            on_page(files[index], record['page'] + 1, record['text'])
+        text = record['text']
+        yield (text if text.endswith('\f') else text + '\f') + '\n'
+    for file in files[started:]:
+        yield f"\n--- {file} ---\n"
+
+def iter_lines(chunks, out=None):
+    """Split newline-terminated chunks into lines, writing each chunk to out."""
+    for chunk in chunks:
+        if out is not None:
+            out.write(chunk)
+        yield from chunk.splitlines()
+
+def pages_to_text(pages):
+    return ''.join(record['text'] + '\n' for record in pages)
+
+def page_audit_lines(file, pages):
+    """One audit line per page saying how its text was obtained."""
+    lines = []
+    for record in pages:
+        extra = ''.join(f" {k}={v}" for k, v in record.items()
+                        if k not in ('page', 'source', 'text'))
+        lines.append(f"Page {record['page'] + 1} [{file}]: {record['source']}{extra}")
+    return lines
+
+def ocr_pdfs(paths):
+    return [pages_to_text(pages) for pages in extract_pdf_pages(paths)]
+
+def ocr_pdf(path):
+    return ocr_pdfs([path])[0]
+
+# ========= OCR ENGINE END =========
+
+# ========= FIELD SCAN START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+
+FIELD_PATTERNS = [
+    ('MRN', r'MRN[:\s]*?(\d{6,})', 0),
+    ('DOB', r'DOB[:\s]*?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 0),
+    ('Procedure Date', r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})', 0),
+    ('Side', r'\b(left|right|bilateral)\b', re.IGNORECASE),
+    ('Pre-op Diagnosis', r'Pre[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', re.IGNORECASE),
+    ('Post-op Diagnosis', r'Post[- ]?op(?:erative)? Diagnosis[:\s]*([^\n]+)', re.IGNORECASE),
+    ('Perforation Size', r'\b(small|medium|large)\b(?=.*perforation)', re.IGNORECASE),
+]
+SCAN_LABELS = [label for label, _, _ in FIELD_PATTERNS] + [
+    'Foam Mention', 'Audiometry Pre', 'Audiometry Post']
+
+# (tokens, lower_tokens) a line must contain before a field's pattern can match: tokens are
+# checked as-is, lower_tokens against line.lower(). Lowercasing agrees with the
+# patterns' IGNORECASE only for ASCII, so other lines skip the prefilter.
+_FIELD_PREFILTERS = {
+    'MRN': (('MRN',), ()),
+    'DOB': (('DOB',), ()),
+    'Procedure Date': (('/', '-'), ()),
+    'Side': ((), ('left', 'right', 'bilateral')),
+    'Pre-op Diagnosis': ((), ('diagnosis',)),
+    'Post-op Diagnosis': ((), ('diagnosis',)),
+    'Perforation Size': ((), ('perforation',)),
+}
+_FIELD_RULES = [(label, re.compile(pattern, flags).search) + _FIELD_PREFILTERS[label]
+                for label, pattern, flags in FIELD_PATTERNS]
+
+def _may_match(rule, line, low):
+    if low is None:
+        return True
+    for token in rule[2]:
+        if token in line:
+            return True
+    for token in rule[3]:
+        if token in low:
+            return True
+    return False
+
+def scan_fields(lines):
+    """Walk the case text once, line by line, without holding it in memory.
+
+    Returns (values, hits), both keyed by SCAN_LABELS: the extracted value and
+    the stripped line it came from ('' when nothing matched). Each pattern
+    takes its first matching line, Foam Mention the first fibrin/foam line,
+    and Audiometry Pre/Post the first two lines with both '500' and 'dB'.
+    Once every field is filled the rest of lines is drained unread, so a tee
+    like iter_lines() still sees the whole text.
+    """
+    values = dict.fromkeys(SCAN_LABELS, '')
+    hits = dict.fromkeys(SCAN_LABELS, '')
+    pending = list(_FIELD_RULES)
+    foam = False
+    audio = 0
+    lines = iter(lines)
     for line in lines:
-        if '500' in line and 'dB' in line:
-            if not pre_audio:
-                pre_audio = line.strip()
-            elif not post_audio:
-                post_audio = line.strip()
-    audit_log['Audiometry Pre'] = pre_audio
-    audit_log['Audiometry Post'] = post_audio
+        low = line.lower()
+        if pending:
+            prefilter_low = low if line.isascii() else None
+            matched = None
+            for rule in pending:
+                if not _may_match(rule, line, prefilter_low):
+                    continue
+                match = rule[1](line)
+                if match:
+                    hits[rule[0]] = line.strip()
+                    values[rule[0]] = match.group(1).strip()
+                    matched = matched or []
+                    matched.append(rule)
+            if matched:
+                pending = [rule for rule in pending if rule not in matched]
+        if not foam and ('fibrin' in low or 'foam' in low):
+            foam = True
+            hits['Foam Mention'] = values['Foam Mention'] = line.strip()
+        if audio < 2 and '500' in line and 'dB' in line:
+            label = 'Audiometry Post' if audio else 'Audiometry Pre'
+            audio += 1
+            hits[label] = values[label] = line.strip()
+        if not pending and foam and audio == 2:
+            deque(lines, maxlen=0)
+    return values, hits
+
+# ========= FIELD SCAN END =========
+
+# ========= TRIAGE START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+# FFCR_TRIAGE=1: before any full OCR, read only the header block of each PDF's
+# first page, where MRN, DOB, procedure date and side sit. Full extraction runs
+# only for cases whose headers give every FFCR_TRIAGE_REQUIRE field, and only
+# for the PDFs whose header mentions one of FFCR_TRIAGE_KEYWORDS (all PDFs when
+# unset). Other cases are deferred and left for a later run. triage_deferred.csv
+# gets a row when a case's triage status changes, not on every run.
+TRIAGE = os.environ.get('FFCR_TRIAGE', '0') == '1'
+TRIAGE_FIELDS = ['MRN', 'DOB', 'Procedure Date', 'Side']
+TRIAGE_REQUIRE = [f.strip() for f in (os.environ.get('FFCR_TRIAGE_REQUIRE') or 'MRN').split(',') if f.strip()]
+TRIAGE_KEYWORDS = [k.strip().lower() for k in (os.environ.get('FFCR_TRIAGE_KEYWORDS') or '').split(',') if k.strip()]
+TRIAGE_LOG = os.path.join(RESULTS_DIR, 'triage_deferred.csv')
+
+TRIAGE_PASSED = 'passed triage'
+
+_triage_log_lock = threading.Lock()
+# {case: (reason, header field values)} of each case's latest TRIAGE_LOG row.
+_triage_status = None
+
+def triage_case(paths):
+    """Header-only pass over a case's PDFs.
+
+    Returns (fields, relevant, audit, deferred): the TRIAGE_FIELDS values read
+    from the headers, the paths worth a full extraction, one audit line per
+    PDF, and the reason to defer the case ('' when it passes).
+    """
+    headers = ocr_headers(paths)
+    values, _ = scan_fields(line for header in headers for line in header['text'].splitlines())
+    fields = {label: values[label] for label in TRIAGE_FIELDS}
+    relevant = []
+    audit = []
+    for path, header in zip(paths, headers):
+        low = header['text'].lower()
+        keep = not TRIAGE_KEYWORDS or any(keyword in low for keyword in TRIAGE_KEYWORDS)
+        if keep:
+            relevant.append(path)
+        audit.append(f"Triage [{os.path.basename(path)}]: header {header['source']} "
+                     f"{header['clip']}pt, {'full extraction' if keep else 'skipped, no keyword in header'}")
+    missing = [label for label in TRIAGE_REQUIRE if not values.get(label)]
+    if missing:
+        deferred = f"no {', '.join(missing)} in page 1 headers"
+    elif paths and not relevant:
+        deferred = 'no PDF header mentions a triage keyword'
+    else:
+        deferred = ''
+    return fields, relevant, audit, deferred
+
+def _last_triage_status():
+    global _triage_status
+    if _triage_status is None:
+        _triage_status = {}
+        if os.path.exists(TRIAGE_LOG):
+            with open(TRIAGE_LOG, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    _triage_status[row['Case']] = (row['Reason'],
+                                                   tuple(row.get(label) or '' for label in TRIAGE_FIELDS))
+    return _triage_status
+
+def record_deferred(case, fields, reason):
+    """Log a case's triage outcome to TRIAGE_LOG if it changed; returns True if logged.
+
+    A deferral is logged the first time and again only when its reason or
+    header fields differ from the case's last row. A pass (reason '') is
+    logged only for a case whose last row was a deferral.
+    """
+    status = (reason or TRIAGE_PASSED, tuple(fields.get(label, '') for label in TRIAGE_FIELDS))
+    with _triage_log_lock:
+        last = _last_triage_status().get(case)
+        if last == status or (not reason and (last is None or last[0] == TRIAGE_PASSED)):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(TRIAGE_LOG)), exist_ok=True)
+        new = not os.path.exists(TRIAGE_LOG)
+        with open(TRIAGE_LOG, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new:
+                writer.writerow(['When', 'Case', 'Reason'] + TRIAGE_FIELDS)
+            writer.writerow([time.strftime('%Y-%m-%d %H:%M:%S'), case, status[0]] + list(status[1]))
+        _triage_status[case] = status
+    return True
+
+# ========= TRIAGE END =========
+
+# ========= RE-EXTRACT START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+# --reextract reruns the field scan over page text that is already on disk, so a
+# change to FIELD_PATTERNS reaches every case summary and the spreadsheet
+# without OCRing anything. Page text comes from the case's full_text.txt, else
+# from the OCR cache (entries made under any OCR settings, current ones first).
+REEXTRACT_WORKERS = int(os.environ.get('FFCR_REEXTRACT_WORKERS') or os.cpu_count() or 1)
+
+def cached_pdf_pages(path):
+    """Page records of a PDF from the OCR cache, or None unless every page is there."""
+    db = _ocr_cache()
+    if db is None:
+        return None
+    digest = file_sha256(path)
+    with _fitz_lock, fitz.open(path) as doc:
+        page_count = len(doc)
+    current = _engine_signature()
+    with _ocr_cache_lock:
+        # Keys are "<sha256>:<page>:<engine signature>"; ';' sorts right after ':'.
+        rows = db.execute('SELECT key, record FROM pages WHERE key > ? AND key < ? ORDER BY used DESC',
+                          (digest + ':', digest + ';')).fetchall()
+    pages = {}
+    preferred = set()
+    for key, record in rows:
+        _, page, signature = key.split(':', 2)
+        page = int(page)
+        if page in preferred or (page in pages and signature != current):
+            continue
+        pages[page] = json.loads(record)
+        if signature == current:
+            preferred.add(page)
+    if any(page not in pages for page in range(page_count)):
+        return None
+    return [pages[page] for page in range(page_count)]
+
+def stored_case_text(folder_path, pdf_files):
+    """(text, source) of a case without OCR: its full_text.txt, else its PDFs'
+    pages from the OCR cache in full_text.txt layout. (None, reason) if neither
+    has all of it."""
+    fulltext_path = os.path.join(folder_path, 'full_text.txt')
+    if os.path.exists(fulltext_path):
+        with open(fulltext_path, encoding='utf-8', errors='replace') as f:
+            return f.read(), 'full_text.txt'
+    chunks = []
+    for file in pdf_files:
+        records = cached_pdf_pages(os.path.join(folder_path, file))
+        if records is None:
+            return None, f"{file} is not fully in the OCR cache"
+        chunks.append(f"\n--- {file} ---\n")
+        for record in records:
+            text = record['text']
+            chunks.append((text if text.endswith('\f') else text + '\f') + '\n')
+    return ''.join(chunks), 'OCR cache'
+
+def kept_audit_lines(lines):
+    """Audit lines the field scan did not write (page sources, triage notes)."""
+    labels = tuple(f"{label}:" for label in SCAN_LABELS + ['Images Present'])
+    return [line for line in lines if line.strip() and not line.startswith(labels)]
+
+def read_summary(path):
+    """A case_summary.txt as {field: value}; {} if there is none."""
+    fields = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                key, sep, value = line.rstrip('\n').partition(': ')
+                if sep:
+                    fields[key] = value
+    except OSError:
+        pass
+    return fields
+
+def read_rows(path):
+    """A CSV file's rows as dicts; [] if there is none."""
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    except OSError:
+        return []
+
+def backup_file(path):
+    """Copy path to '<path>.<time>.bak' before it is rewritten; returns the copy, or None."""
+    if not os.path.exists(path):
+        return None
+    backup = f"{path}.{time.strftime('%Y%m%d-%H%M%S')}.bak"
+    shutil.copy2(path, backup)
+    return backup
+
+def write_rows_atomic(path, fieldnames, rows):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+def run_reextract(work, tasks):
+    """Yield work(task) for each task, in order, spread over REEXTRACT_WORKERS processes."""
+    if REEXTRACT_WORKERS <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield work(task)
+        return
+    with ProcessPoolExecutor(max_workers=REEXTRACT_WORKERS, initializer=_init_ocr_worker,
+                             initargs=(_ocr_settings(),)) as pool:
+        yield from pool.map(work, tasks, chunksize=4)
+
+# ========= RE-EXTRACT END =========
+
+# ========= WATCH FOLDER START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+
+# A case folder is queued once its files have not changed for this long.
+WATCH_SETTLE_SECONDS = float(os.environ.get('FFCR_WATCH_SETTLE') or 30)
+WATCH_POLL_SECONDS = float(os.environ.get('FFCR_WATCH_POLL') or 5)
+# Files the parsers write into a case folder themselves; they never make a case look changed.
+WATCH_IGNORE = {'case_summary.txt', 'full_text.txt', 'raw_hits_audit.txt', 'desktop.ini'}
+
+def folder_signature(folder_path):
+    """Sorted (relative path, size, mtime) of every input file in a case folder."""
+    entries = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            if file in WATCH_IGNORE:
+                continue
+            full_path = os.path.join(root, file)
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                continue  # vanished mid-scan; the next poll catches up
+            entries.append((os.path.relpath(full_path, folder_path), st.st_size, st.st_mtime_ns))
+    return tuple(sorted(entries))
+
+def _start_change_events(incoming_dir, wake):
+    """Cut the poll wait short on filesystem events when watchdog is installed."""
+    if Observer is None:
+        return None
+    handler = FileSystemEventHandler()
+    handler.on_any_event = lambda event: wake.set()
+    observer = Observer()
+    try:
+        observer.schedule(handler, incoming_dir, recursive=True)
+        observer.start()
+    except Exception:
+        return None  # e.g. a network drive without change notifications
+    return observer
+
+def watch_incoming(process, report=print, incoming_dir=INCOMING_DIR, workers=1):
+    """Feed new or changed case folders under incoming_dir to process(path) until Ctrl+C.
+
+    A folder is queued once its files have been stable for WATCH_SETTLE_SECONDS,
+    and queued again only if its files change after it was processed. Folders
+    that are queued or being processed are not rescanned, so a case is never
+    handled twice at once, however many worker threads drain the queue.
+    Ctrl+C drops the queue and waits for the cases in progress to finish.
+    """
+    work = queue.Queue()
+    lock = threading.Lock()
+    busy = set()
+    done = {}
+
+    def worker():
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            folder, signature = item
+            try:
+                process(os.path.join(incoming_dir, folder))
+            except Exception as e:
+                report(f"[WATCH] {folder} failed: {e}")
+            with lock:
+                done[folder] = signature
+                busy.discard(folder)
+
+    threads = [threading.Thread(target=worker, name=f'ffcr-watch-worker-{n}', daemon=True)
+               for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    wake = threading.Event()
+    observer = _start_change_events(incoming_dir, wake)
+    report(f"[WATCH] Watching {incoming_dir} (settle {WATCH_SETTLE_SECONDS:g}s, "
+           f"poll {WATCH_POLL_SECONDS:g}s, {'filesystem events' if observer else 'polling only'})")
+    seen = {}
+    try:
+        while True:
+            now = time.time()
+            present = {f for f in os.listdir(incoming_dir) if os.path.isdir(os.path.join(incoming_dir, f))}
+            with lock:
+                skip = set(busy)
+            for folder in sorted(present - skip):
+                signature = folder_signature(os.path.join(incoming_dir, folder))
+                if not signature:
+                    continue
+                if folder not in seen or seen[folder][0] != signature:
+                    seen[folder] = (signature, now)
+                    continue
+                with lock:
+                    if now - seen[folder][1] >= WATCH_SETTLE_SECONDS and done.get(folder) != signature:
+                        busy.add(folder)
+                        work.put((folder, signature))
+                        report(f"[WATCH] Queued {folder}")
+            with lock:
+                for folder in set(seen) - present:
+                    del seen[folder]
+                for folder in set(done) - present - busy:
+                    del done[folder]
+            wake.wait(WATCH_POLL_SECONDS)
+            wake.clear()
+    except KeyboardInterrupt:
+        report("[WATCH] Stopping after the cases in progress...")
+    finally:
+        if observer:
+            observer.stop()
+        while True:
+            try:
+                work.get_nowait()
+            except queue.Empty:
+                break
+        for thread in threads:
+            work.put(None)
+        for thread in threads:
+            thread.join()
+
+# ========= WATCH FOLDER END =========
+
+# ========= TEXT INDEX START =========
+# Shared with run_ffcr_v8.7_hdrive.py -- keep both copies identical.
+# Cross-case inverted index: term -> (case, file, page, line, position), built
+# from the page text as cases are processed. A case's postings are replaced only
+# when its page text changed. Query it with --search. FFCR_TEXT_INDEX=off disables it.
+TEXT_INDEX_PATH = os.environ.get('FFCR_TEXT_INDEX') or os.path.join(RESULTS_DIR, 'ffcr_text_index.sqlite')
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+QUERY_RE = re.compile(r'"([^"]*)"|(\()|(\))|([^\s()"]+)')
+
+_text_index_db = None
+_text_index_lock = threading.Lock()
+
+def _text_index():
+    global _text_index_db
+    with _text_index_lock:
+        if _text_index_db is None and TEXT_INDEX_PATH.lower() != 'off':
+            os.makedirs(os.path.dirname(os.path.abspath(TEXT_INDEX_PATH)), exist_ok=True)
+            db = sqlite3.connect(TEXT_INDEX_PATH, check_same_thread=False)
+            db.execute('CREATE TABLE IF NOT EXISTS cases (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, '
+                       'fingerprint TEXT NOT NULL, indexed TEXT NOT NULL)')
+            # hits: space-separated "line,position" pairs; positions count tokens through the page.
+            db.execute('CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, case_id INTEGER NOT NULL, '
+                       'file TEXT NOT NULL, page INTEGER NOT NULL, hits TEXT NOT NULL, '
+                       'PRIMARY KEY (term, case_id, file, page)) WITHOUT ROWID')
+            db.execute('CREATE INDEX IF NOT EXISTS postings_case ON postings (case_id)')
+            _text_index_db = db
+        return _text_index_db
+
+def close_text_index():
+    global _text_index_db
+    with _text_index_lock:
+        if _text_index_db is not None:
+            _text_index_db.close()
+            _text_index_db = None
+
+def case_index_entry():
+    """Collects one case's postings as its pages arrive; see index_page()."""
+    return {'digest': hashlib.sha256(), 'postings': {}}
+
+def index_page(entry, file, page, text):
+    entry['digest'].update(f"{file}\0{page}\0{text}\0".encode('utf-8'))
+    postings = entry['postings']
+    position = 0
+    for line_no, line in enumerate(text.splitlines(), 1):
+        for term in TOKEN_RE.findall(line.lower()):
+            postings.setdefault((term, file, page), []).append(f"{line_no},{position}")
+            position += 1
+
+def commit_case_index(case, entry):
+    """Store a case's postings unless its page text is unchanged; returns True if written."""
+    db = _text_index()
+    if db is None:
+        return False
+    fingerprint = entry['digest'].hexdigest()
+    with _text_index_lock:
+        row = db.execute('SELECT id, fingerprint FROM cases WHERE name = ?', (case,)).fetchone()
+        if row is not None and row[1] == fingerprint:
+            return False
+        with db:
+            if row is None:
+                case_id = db.execute('INSERT INTO cases (name, fingerprint, indexed) VALUES (?, ?, ?)',
+                                     (case, fingerprint, time.strftime('%Y-%m-%d %H:%M:%S'))).lastrowid
+            else:
+                case_id = row[0]
+                db.execute('DELETE FROM postings WHERE case_id = ?', (case_id,))
+                db.execute('UPDATE cases SET fingerprint = ?, indexed = ? WHERE id = ?',
+                           (fingerprint, time.strftime('%Y-%m-%d %H:%M:%S'), case_id))
+            db.executemany('INSERT INTO postings (term, case_id, file, page, hits) VALUES (?, ?, ?, ?, ?)',
+                           [(term, case_id, file, page, ' '.join(hits))
+                            for (term, file, page), hits in entry['postings'].items()])
+    return True
+
+def _parse_query(query):
+    """Parse 'thrombin AND "cartilage graft" OR (foam NOT fibrin)' into a tree.
+
+    Terms and "quoted phrases" are leaves ('phrase', [terms]); AND (also
+    implied between neighbours), OR and NOT combine them, NOT binding
+    tightest and OR loosest. Parentheses group.
+    """
+    if query.count('"') % 2:
+        raise ValueError(f"unbalanced quote in {query!r}")
+    tokens = []
+    for phrase, lparen, rparen, word in QUERY_RE.findall(query):
+        if lparen or rparen:
+            tokens.append(lparen or rparen)
+        elif word in ('AND', 'OR', 'NOT'):
+            tokens.append(word)
+        else:
+            terms = TOKEN_RE.findall((phrase or word).lower())
+            if terms:
+                tokens.append(('phrase', terms))
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or():
+        node = parse_and()
+        while peek() == 'OR':
+            take()
+            node = ('or', node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() not in (None, 'OR', ')'):
+            if peek() == 'AND':
+                take()
+            node = ('and', node, parse_not())
+        return node
+
+    def parse_not():
+        if peek() == 'NOT':
+            take()
+            return ('not', parse_not())
+        if peek() == '(':
+            take()
+            node = parse_or()
+            if peek() == ')':
+                take()
+            return node
+        token = take() if peek() is not None else None
+        if not isinstance(token, tuple):
+            raise ValueError(f"unexpected {token or 'end of query'!r} in {query!r}")
+        return token
+
+    if not tokens:
+        raise ValueError(f"empty query: {query!r}")
+    tree = parse_or()
+    if peek() is not None:
+        raise ValueError(f"unexpected {peek()!r} in {query!r}")
+    return tree
+
+def _parse_hits(hits):
+    return [tuple(map(int, hit.split(','))) for hit in hits.split()]
+
+def _phrase_matches(db, terms):
+    """{case_id: [(file, page, line), ...]} where the terms appear consecutively."""
+    rows = {}
+    for term in dict.fromkeys(terms):
+        found = {}
+        for case_id, file, page, hits in db.execute(
+                'SELECT case_id, file, page, hits FROM postings WHERE term = ?', (term,)):
+            found[(case_id, file, page)] = hits
+        rows[term] = found
+    pages = set(rows[terms[0]])
+    for term in terms[1:]:
+        pages &= rows[term].keys()
+    matches = {}
+    for key in sorted(pages):
+        case_id, file, page = key
+        first = _parse_hits(rows[terms[0]][key])
+        later = [{p for _, p in _parse_hits(rows[term][key])} for term in terms[1:]]
+        for line, position in first:
+            if all(position + n + 1 in positions for n, positions in enumerate(later)):
+                matches.setdefault(case_id, []).append((file, page, line))
+    return matches
+
+def _evaluate(db, node, all_cases):
+    kind = node[0]
+    if kind == 'phrase':
+        return _phrase_matches(db, node[1])
+    if kind == 'not':
+        excluded = _evaluate(db, node[1], all_cases)
+        return {case_id: [] for case_id in all_cases if case_id not in excluded}
+    left = _evaluate(db, node[1], all_cases)
+    right = _evaluate(db, node[2], all_cases)
+    if kind == 'and':
+        return {case_id: left[case_id] + right[case_id] for case_id in left if case_id in right}
+    merged = dict(left)
+    for case_id, locations in right.items():
+        merged[case_id] = merged.get(case_id, []) + locations
+    return merged
+
+def search_text_index(query):
+    """[(case, [(file, page, line), ...]), ...] for the cases matching query, by case name.
+
+    Raises ValueError for a malformed query. The index is opened read-only;
+    without one there are no matches.
+    """
+    tree = _parse_query(query)
+    if TEXT_INDEX_PATH.lower() == 'off' or not os.path.exists(TEXT_INDEX_PATH):
+        return []
+    db = sqlite3.connect(f"file:{os.path.abspath(TEXT_INDEX_PATH)}?mode=ro", uri=True)
+    try:
+        names = dict(db.execute('SELECT id, name FROM cases'))
+        matches = _evaluate(db, tree, names)
+    finally:
+        db.close()
+    return sorted((names[case_id], sorted(set(locations))) for case_id, locations in matches.items())
+
+SEARCH_USAGE = ('Terms next to each other must all match; AND, OR, NOT, parentheses and '
+                '"quoted phrases" also work, e.g. thrombin AND "cartilage graft" OR (foam NOT fibrin)')
+
+def print_search(query):
+    """Print the matches for query; returns False for a malformed query, else True."""
+    try:
+        _parse_query(query)
+    except ValueError as e:
+        print(f"Bad query: {e}\n{SEARCH_USAGE}")
+        return False
+    if TEXT_INDEX_PATH.lower() == 'off':
+        print("The text index is turned off (FFCR_TEXT_INDEX=off).")
+        return True
+    if not os.path.exists(TEXT_INDEX_PATH):
+        print(f"No text index at {TEXT_INDEX_PATH} yet; it is built as cases are processed.")
+        return True
+    started = time.perf_counter()
+    results = search_text_index(query)
+    elapsed = (time.perf_counter() - started) * 1000
+    for case, locations in results:
+        print(case)
+        for file, page, line in locations:
+            print(f"    {file}  page {page}  line {line}")
+    print(f"{len(results)} case(s) match {query!r} ({elapsed:.1f} ms)")
+    return True
+
+# ========= TEXT INDEX END =========
+
+def extract_fields(lines, image_files):
+    """lines is any iterable of text lines; a whole text string also works."""
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    values, audit_log = scan_fields(lines)
 
     image_presence = 'Yes' if image_files else 'No'
     audit_log['Images Present'] = ', '.join(image_files) if image_files else ''
 
     return {
-        'MRN': mrn,
-        'DOB': dob,
-        'Procedure Date': procedure_date,
-        'Side': side,
-        'Pre-op Diagnosis': pre_dx,
-        'Post-op Diagnosis': post_dx,
-        'Audiometry Pre': pre_audio,
-        'Audiometry Post': post_audio,
-        'Perforation Size': perforation_size,
-        'Foam Mention': foam_line,
+        'MRN': values['MRN'],
+        'DOB': values['DOB'],
+        'Procedure Date': values['Procedure Date'],
+        'Side': values['Side'],
+        'Pre-op Diagnosis': values['Pre-op Diagnosis'],
+        'Post-op Diagnosis': values['Post-op Diagnosis'],
+        'Audiometry Pre': values['Audiometry Pre'],
+        'Audiometry Post': values['Audiometry Post'],
+        'Perforation Size': values['Perforation Size'],
+        'Foam Mention': values['Foam Mention'],
         'Images Present': image_presence
     }, audit_log
 
@@ -79,21 +1272,32 @@ def process_case_folder(folder_path):
     summary_path = os.path.join(folder_path, 'case_summary.txt')
     fulltext_path = os.path.join(folder_path, 'full_text.txt')
     audit_path = os.path.join(folder_path, 'raw_hits_audit.txt')
-    all_text = ''
     image_files = []
+    pdf_files = []
+    page_audit = []
+    index_entry = case_index_entry()
 
     for file in os.listdir(folder_path):
-        full_path = os.path.join(folder_path, file)
         if file.lower().endswith('.pdf'):
-            text = ocr_pdf(full_path)
-            all_text += f"\n--- {file} ---\n" + text
+            pdf_files.append(file)
         elif file.lower().endswith(('.jpg', '.jpeg', '.png')):
             image_files.append(file)
 
-    with open(fulltext_path, 'w', encoding='utf-8') as f:
-        f.write(all_text)
+    pdf_paths = [os.path.join(folder_path, file) for file in pdf_files]
+    if TRIAGE:
+        header_fields, pdf_paths, triage_audit, deferred = triage_case(pdf_paths)
+        if record_deferred(os.path.basename(folder_path), header_fields, deferred) and deferred:
+            print(f"Deferred {os.path.basename(folder_path)}: {deferred}")
+        if deferred:
+            return
+        page_audit.extend(triage_audit)
 
-    fields, audit = extract_fields(all_text, image_files)
+    # Pages stream into full_text.txt and the field scan as they are extracted.
+    chunks = iter_case_text(pdf_paths, page_audit,
+                            lambda file, page, text: index_page(index_entry, file, page, text))
+    with open(fulltext_path, 'w', encoding='utf-8') as f:
+        fields, audit = extract_fields(iter_lines(chunks, f), image_files)
+    commit_case_index(os.path.basename(folder_path), index_entry)
 
     with open(summary_path, 'w', encoding='utf-8') as f:
         for k, v in fields.items():
@@ -102,6 +1306,8 @@ def process_case_folder(folder_path):
     with open(audit_path, 'w', encoding='utf-8') as f:
         for k, v in audit.items():
             f.write(f"{k}: {v}\n")
+        for line in page_audit:
+            f.write(f"{line}\n")
 
     if not os.path.exists(SPREADSHEET):
         with open(SPREADSHEET, 'w', newline='', encoding='utf-8') as f:
@@ -112,9 +1318,105 @@ def process_case_folder(folder_path):
         writer = csv.DictWriter(f, fieldnames=fields.keys())
         writer.writerow(fields)
 
+def reextract_case(folder_path):
+    """Rerun extract_fields over a case's stored text and rewrite its summary and
+    audit. Returns (folder, re-extracted?, fields for the spreadsheet or None, note)."""
+    summary_path = os.path.join(folder_path, 'case_summary.txt')
+    audit_path = os.path.join(folder_path, 'raw_hits_audit.txt')
+    image_files = []
+    pdf_files = []
+    for file in os.listdir(folder_path):
+        if file.lower().endswith('.pdf'):
+            pdf_files.append(file)
+        elif file.lower().endswith(('.jpg', '.jpeg', '.png')):
+            image_files.append(file)
+
+    text, source = stored_case_text(folder_path, pdf_files)
+    if text is None:
+        # Keep the last summary's row in the rebuilt spreadsheet.
+        return folder_path, False, read_summary(summary_path) or None, f"skipped, {source}"
+    fields, audit = extract_fields(text, image_files)
+
+    page_audit = []
+    if os.path.exists(audit_path):
+        with open(audit_path, encoding='utf-8') as f:
+            page_audit = kept_audit_lines(f.read().splitlines())
+
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        for k, v in fields.items():
+            f.write(f"{k}: {v}\n")
+
+    with open(audit_path, 'w', encoding='utf-8') as f:
+        for k, v in audit.items():
+            f.write(f"{k}: {v}\n")
+        for line in page_audit:
+            f.write(f"{line}\n")
+    return folder_path, True, fields, f"from {source}"
+
+def reextract_all():
+    """--reextract: every case in INCOMING_DIR, then the spreadsheet rewritten with one row per case.
+
+    Spreadsheet rows have no case column, so a row is taken to belong to a case
+    being re-extracted when it equals that case's previous summary. Every
+    other row (cases no longer in INCOMING_DIR) is carried over unchanged, and
+    the old spreadsheet is backed up first.
+    """
+    started = time.perf_counter()
+    folders = sorted(os.path.join(INCOMING_DIR, folder) for folder in os.listdir(INCOMING_DIR)
+                     if os.path.isdir(os.path.join(INCOMING_DIR, folder)))
+    previous = set()
+    for folder_path in folders:
+        summary = read_summary(os.path.join(folder_path, 'case_summary.txt'))
+        previous.add(tuple(summary.get(k, '') for k in FIELDS))
+    rows = [{k: row.get(k) or '' for k in FIELDS} for row in read_rows(SPREADSHEET)]
+    rows = [row for row in rows if tuple(row.values()) not in previous]
+    carried = len(rows)
+    done = 0
+    for folder_path, ok, fields, note in run_reextract(reextract_case, folders):
+        print(f"{os.path.basename(folder_path)}: {note}")
+        done += ok
+        if fields:
+            rows.append({k: fields.get(k, '') for k in FIELDS})
+    if rows:
+        backup = backup_file(SPREADSHEET)
+        write_rows_atomic(SPREADSHEET, FIELDS, rows)
+        if backup:
+            print(f"Previous spreadsheet saved as {backup}")
+    print(f"Re-extracted {done} of {len(folders)} cases in {time.perf_counter() - started:.1f}s; "
+          f"{SPREADSHEET} rewritten with {len(rows)} rows ({carried} carried over from other cases)")
+
 if __name__ == '__main__':
-    for folder in os.listdir(INCOMING_DIR):
-        case_path = os.path.join(INCOMING_DIR, folder)
-        if os.path.isdir(case_path):
-            print(f"Processing {folder}...")
-            process_case_folder(case_path)
+    parser = argparse.ArgumentParser(description='FFCR legacy OCR parser')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and process case folders as they arrive in INCOMING_DIR')
+    parser.add_argument('--search', metavar='QUERY',
+                        help='search the text index, e.g. \'thrombin AND "cartilage graft"\', and exit')
+    parser.add_argument('--reextract', action='store_true',
+                        help='rerun field extraction over stored page text (no OCR), rewrite outputs and exit')
+    args = parser.parse_args()
+
+    if args.search:
+        raise SystemExit(0 if print_search(args.search) else 2)
+    if args.reextract:
+        try:
+            reextract_all()
+        finally:
+            close_ocr_cache()
+        raise SystemExit(0)
+
+    print(ocr_backend_note())
+    try:
+        start_ocr_engine()
+        if args.watch:
+            watch_incoming(process_case_folder)
+        else:
+            for folder in os.listdir(INCOMING_DIR):
+                case_path = os.path.join(INCOMING_DIR, folder)
+                if os.path.isdir(case_path):
+                    print(f"Processing {folder}...")
+                    process_case_folder(case_path)
+    finally:
+        shutdown_ocr_pool()
+        close_ocr_cache()
+        close_text_index()
+    print(ocr_cache_summary())
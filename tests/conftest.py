@@ -0,0 +1,58 @@
+"""Shared helpers for the FFCR script tests.
+
+The scripts are single files with their paths set at import time, so tests
+import them fresh with importlib (see load_script) or run them as
+subprocesses from a temporary working directory. The hard-coded
+'H:/Shared drives/...' paths of the v8.7 script are relative on Linux and
+land inside that directory.
+"""
+
+import importlib.util
+import os
+import stat
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCAL_SCRIPT = os.path.join(ROOT, 'run_ffcr_local.py')
+HDRIVE_SCRIPT = os.path.join(ROOT, 'Fibrin Tool 8.7', 'run_ffcr_v8.7_hdrive.py')
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+# Stands in for the tesseract CLI: a version line, or a fixed page of text.
+FAKE_TESSERACT = '''#!{python}
+import sys
+args = sys.argv[1:]
+if '--version' in args:
+    print('tesseract 5.3.0')
+    sys.exit(0)
+data = sys.stdin.buffer.read() if args and args[0] == 'stdin' else b''
+if 'tsv' in args:
+    print('level\\tpage_num\\tblock_num\\tpar_num\\tline_num\\tword_num\\tleft\\ttop\\twidth\\theight\\tconf\\ttext')
+    print('5\\t1\\t1\\t1\\t1\\t1\\t0\\t0\\t1\\t1\\t95\\tMRN:')
+    print('5\\t1\\t1\\t1\\t1\\t2\\t0\\t0\\t1\\t1\\t95\\t7654321')
+else:
+    sys.stdout.write('Operative report\\nMRN: 7654321\\n\\f')
+'''
+
+
+@pytest.fixture
+def fake_tesseract(tmp_path, monkeypatch):
+    """Put a fake tesseract first on PATH; returns the environment to run scripts with."""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    exe = bin_dir / 'tesseract'
+    exe.write_text(FAKE_TESSERACT.format(python=sys.executable))
+    exe.chmod(exe.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return dict(os.environ)
+
+
+def load_script(path, name):
+    """Import a script as module `name`, reading its FFCR_* settings from the current environment."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,31 @@
+import csv
+import io
+import os
+
+import fitz
+
+from conftest import ROOT, load_script
+
+FIBRIN_SCRIPT = os.path.join(ROOT, 'Fibrin Tool 8.3', 'fibrin_review_chunked_v8_3.py')
+
+
+def test_fields_come_from_page_text_not_file_names(tmp_path):
+    fibrin = load_script(FIBRIN_SCRIPT, 'fibrin_review_8_3')
+    case = tmp_path / 'case-1'
+    case.mkdir()
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), 'Operative report\nMRN: 7654321\nPTA Right ear 25 dB')
+        doc.save(str(case / 'MRN 11111 PTA Right 99.pdf'))
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=['Case', 'MRN', 'DOB', 'Name', 'PTA Right', 'PTA Left'])
+    fibrin.start_mirrors()
+    try:
+        fibrin.process_case(str(case), str(tmp_path / 'out'), str(tmp_path / 'backup'), writer)
+    finally:
+        fibrin.finish_mirrors()
+
+    row = next(csv.DictReader(io.StringIO(out.getvalue()), fieldnames=writer.fieldnames))
+    assert row['MRN'] == '7654321'
+    assert row['PTA Right'] == '25'
+    with open(tmp_path / 'out' / 'full_text.txt', encoding='utf-8') as f:
+        assert f.read().startswith('\n--- MRN 11111 PTA Right 99.pdf ---\n')
@@ -0,0 +1,59 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import HDRIVE_SCRIPT, load_script
+from synthetic_fixtures import make_scanned_pdf
+
+INCOMING = os.path.join('H:/Shared drives/FFCR', 'Incoming Cases')
+PROCESSING_LOG = os.path.join('H:/Shared drives/FFCR', 'Processed Results', 'ffcr_processing_log.txt')
+
+
+def test_ocr_workers_are_forked_before_case_threads(tmp_path, monkeypatch, fake_tesseract):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('FFCR_OCR_WORKERS', '2')
+    h = load_script(HDRIVE_SCRIPT, 'ffcr_hdrive_pool')
+    forked_from = []
+    fork = os.fork
+
+    def recording_fork():
+        forked_from.append(threading.current_thread() is threading.main_thread())
+        return fork()
+
+    monkeypatch.setattr(os, 'fork', recording_fork)
+    try:
+        h.start_ocr_engine()
+        with ThreadPoolExecutor(max_workers=2) as cases:
+            pids = list(cases.map(lambda _: h.get_ocr_pool().submit(os.getpid).result(), range(4)))
+    finally:
+        h.shutdown_ocr_pool()
+    assert len(forked_from) == 2 and all(forked_from)
+    assert os.getpid() not in pids
+
+
+def test_two_cases_sharing_a_pdf_with_ocr_workers(tmp_path, fake_tesseract):
+    # Two case threads, two OCR workers and the OCR cache on: the settings
+    # under which a lazily forked pool could deadlock a case thread.
+    pdf = tmp_path / 'op.pdf'
+    make_scanned_pdf(str(pdf), pages=3)
+    for case in ('c1', 'c2'):
+        os.makedirs(tmp_path / INCOMING / case)
+        shutil.copy(pdf, tmp_path / INCOMING / case / 'op.pdf')
+    env = dict(fake_tesseract, FFCR_CASE_WORKERS='2', FFCR_OCR_WORKERS='2',
+               FFCR_OCR_CACHE=str(tmp_path / 'ocr_cache.sqlite'))
+    for run in range(3):
+        proc = subprocess.run([sys.executable, HDRIVE_SCRIPT], cwd=tmp_path, env=env,
+                              capture_output=True, text=True, timeout=120)
+        assert proc.returncode == 0, proc.stderr
+        with open(tmp_path / PROCESSING_LOG, encoding='utf-8') as f:
+            processing_log = f.read()
+        assert 'Processed and archived case: c1' in processing_log
+        assert 'Processed and archived case: c2' in processing_log
+        # Put the cases back (and keep the cache) for the next run.
+        shutil.rmtree(tmp_path / 'H:')
+        for case in ('c1', 'c2'):
+            os.makedirs(tmp_path / INCOMING / case)
+            shutil.copy(pdf, tmp_path / INCOMING / case / 'op.pdf')
@@ -0,0 +1,64 @@
+import csv
+import os
+import subprocess
+import sys
+
+import fitz
+
+from conftest import HDRIVE_SCRIPT, load_script
+from synthetic_fixtures import make_scanned_pdf
+
+FFCR = 'H:/Shared drives/FFCR'
+PROCESSING_LOG = os.path.join(FFCR, 'Processed Results', 'ffcr_processing_log.txt')
+
+
+def run(tmp_path, env, *args):
+    proc = subprocess.run([sys.executable, HDRIVE_SCRIPT, *args], cwd=tmp_path, env=env,
+                          capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    with open(tmp_path / PROCESSING_LOG, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_reextract_uses_only_the_pdfs_triage_kept(tmp_path, fake_tesseract):
+    case = tmp_path / FFCR / 'Incoming Cases' / 'c1'
+    os.makedirs(case)
+    make_scanned_pdf(str(case / 'op.pdf'), pages=2)
+    # A text-layer PDF whose header has no triage keyword: never OCRed, never cached.
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), 'Billing statement\nAccount 99812, balance due on receipt\n'
+                                             'Payments received after the statement date are not shown')
+        doc.save(str(case / 'billing.pdf'))
+    env = dict(fake_tesseract, FFCR_TRIAGE='1', FFCR_TRIAGE_KEYWORDS='operative', FFCR_OCR_WORKERS='1',
+               FFCR_OCR_CACHE=str(tmp_path / 'ocr_cache.sqlite'))
+
+    assert 'Processed and archived case: c1' in run(tmp_path, env)
+    assert 'Re-extract c1: from OCR cache' in run(tmp_path, env, '--reextract')
+
+
+def test_reextract_carries_over_rows_it_cannot_pair(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('FFCR_OCR_CACHE', 'off')
+    h = load_script(HDRIVE_SCRIPT, 'ffcr_hdrive_reextract')
+    os.makedirs(h.RESULTS_DIR)
+    archived = tmp_path / 'archive' / 'c2'
+    os.makedirs(archived)
+    (archived / 'case_summary.txt').write_text('MRN: 222\n', encoding='utf-8')
+    h.record_processed('c2', 'fingerprint', str(archived))
+    # Three rows but two audit blocks: a row was written without its block.
+    with open(h.SPREADSHEET, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=h.FIELDS)
+        writer.writeheader()
+        for mrn in ('111', '222', '333'):
+            writer.writerow({'MRN': mrn})
+    with open(h.AUDIT_LOG, 'w', encoding='utf-8') as f:
+        f.write('--- c1 ---\nMRN: NOT FOUND\n\n--- c2 ---\nMRN: 222\n\n')
+    try:
+        h.reextract_archive()
+    finally:
+        h.close_processed_index()
+
+    # 111 and 333 are carried over; 222 is c2's old row, replaced by its re-extraction.
+    assert [row['MRN'] for row in h.read_rows(h.SPREADSHEET)] == ['111', '333', '']
+    with open(h.AUDIT_LOG, encoding='utf-8') as f:
+        assert f.read().startswith('--- c1 ---\n')
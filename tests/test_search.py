@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import HDRIVE_SCRIPT, LOCAL_SCRIPT, load_script
+
+
+@pytest.mark.parametrize('script', [LOCAL_SCRIPT, HDRIVE_SCRIPT])
+def test_search_exit_status(tmp_path, monkeypatch, script):
+    index_path = str(tmp_path / 'text_index.sqlite')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('FFCR_TEXT_INDEX', index_path)
+    ffcr = load_script(script, 'ffcr_search')
+    entry = ffcr.case_index_entry()
+    ffcr.index_page(entry, 'op.pdf', 1, 'Tympanoplasty with thrombin foam\nMRN: 7654321')
+    ffcr.commit_case_index('case-1', entry)
+    ffcr.close_text_index()
+
+    def search(query):
+        return subprocess.run([sys.executable, script, '--search', query], cwd=tmp_path,
+                              capture_output=True, text=True, timeout=60)
+
+    found = search('thrombin')
+    assert found.returncode == 0, found.stdout + found.stderr
+    assert 'case-1' in found.stdout and '1 case(s) match' in found.stdout
+    missing = search('cartilage')
+    assert missing.returncode == 0 and '0 case(s) match' in missing.stdout
+    bad = search('thrombin AND')
+    assert bad.returncode == 2 and 'Bad query' in bad.stdout